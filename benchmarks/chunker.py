@@ -0,0 +1,72 @@
+# benchmarks/chunker.py
+"""Chunking 10 MB of text: the single-pass chunker against the old one.
+
+The old chunker is copied below as it was (code points, 3500 per message,
+long lines hard-split with repeated slicing). Besides the time, the table
+shows how many chunks each produced and how many of them Telegram would
+reject for being over 4096 UTF-16 units. Run from the repository root:
+python -m benchmarks.chunker
+"""
+import time
+from typing import List
+
+from core.chunker import TELEGRAM_MAX_UNITS, iter_telegram_chunks, utf16_len
+
+SIZE = 10_000_000   # characters per input
+
+
+def old_chunk_text_for_telegram(text: str, max_len: int = 3500) -> List[str]:
+    if not text:
+        return ["[no text returned]"]
+    chunks = []
+    buffer = []
+    current_len = 0
+    for line in text.splitlines(keepends=True):
+        line_len = len(line)
+        if current_len + line_len <= max_len:
+            buffer.append(line)
+            current_len += line_len
+            continue
+        if buffer:
+            chunks.append(''.join(buffer).rstrip())
+            buffer = []
+            current_len = 0
+        while line_len > max_len:
+            chunks.append(line[:max_len])
+            line = line[max_len:]
+            line_len = len(line)
+        if line:
+            buffer.append(line)
+            current_len = len(line)
+    if buffer:
+        chunks.append(''.join(buffer).rstrip())
+    return chunks or [text[:max_len]]
+
+
+def inputs():
+    yield 'single line', 'x' * SIZE
+    yield 'words, one line', ('lorem ipsum ' * (SIZE // 12 + 1))[:SIZE]
+    yield 'short lines', ('eth0: rx 1.2G tx 300M\n' * (SIZE // 22 + 1))[:SIZE]
+    yield 'paragraphs', (('a sentence of text. ' * 30 + '\n\n') * (SIZE // 602 + 1))[:SIZE]
+    yield 'emoji line', '😀' * SIZE
+    yield 'html entities', ('&amp;&lt;b&gt; ' * (SIZE // 15 + 1))[:SIZE]
+
+
+def measure(chunker, text):
+    start = time.perf_counter()
+    chunks = list(chunker(text))
+    elapsed = time.perf_counter() - start
+    too_long = sum(1 for chunk in chunks if utf16_len(chunk) > TELEGRAM_MAX_UNITS)
+    return elapsed, len(chunks), too_long
+
+
+def main():
+    print(f"{'input (10M chars)':<18} {'new s':>7} {'chunks':>7} {'over':>5}   {'old s':>7} {'chunks':>7} {'over':>5}")
+    for name, text in inputs():
+        new = measure(iter_telegram_chunks, text)
+        old = measure(old_chunk_text_for_telegram, text)
+        print(f"{name:<18} {new[0]:>7.3f} {new[1]:>7} {new[2]:>5}   {old[0]:>7.3f} {old[1]:>7} {old[2]:>5}")
+
+
+if __name__ == '__main__':
+    main()
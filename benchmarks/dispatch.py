@@ -0,0 +1,82 @@
+# benchmarks/dispatch.py
+"""Dispatch cost with 10, 100 and 1000 registered commands.
+
+Compares the compiled DispatchTable with the linear can_handle() scan it
+replaced. A third of the handlers declare an exact command, a third a
+prefix and a third a regex; each lookup hits the last one registered, so
+the scan has to ask every handler before it. Run from the repository
+root: python -m benchmarks.dispatch
+"""
+import asyncio
+import re
+import time
+
+from core.command_loader import CommandTriggers
+from core.dispatch import DispatchTable
+
+SIZES = (10, 100, 1000)
+LOOKUPS = 2000
+
+
+class BenchHandler:
+    def __init__(self, kind: str, i: int):
+        self.kind = kind
+        self.word = f"{kind}{i:04d}"
+        self.regex = re.compile(rf"(?i:{self.word} \d+)")
+
+    def get_triggers(self) -> CommandTriggers:
+        if self.kind == 'exact':
+            return CommandTriggers(exact=(self.word,))
+        if self.kind == 'prefix':
+            return CommandTriggers(prefixes=(self.word + ' ',))
+        return CommandTriggers(patterns=(self.regex.pattern,))
+
+    async def can_handle(self, command: str) -> bool:
+        if self.kind == 'exact':
+            return command == self.word
+        if self.kind == 'prefix':
+            return command.startswith(self.word + ' ')
+        return bool(self.regex.match(command))
+
+
+def build(size: int):
+    kinds = ('exact', 'prefix', 'regex')
+    return {f"h{i}": BenchHandler(kinds[i % 3], i) for i in range(size)}
+
+
+async def linear_scan(handlers: dict, command: str):
+    for category, handler in handlers.items():
+        if await handler.can_handle(command):
+            return category
+    return None
+
+
+async def time_lookups(resolve, command: str) -> float:
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        await resolve(command)
+    return (time.perf_counter() - start) / LOOKUPS * 1e6
+
+
+async def main():
+    print(f"{'commands':>8} {'lookup':<7} {'table µs':>9} {'scan µs':>9} {'speedup':>8}")
+    for size in SIZES:
+        handlers = build(size)
+        table = DispatchTable.build(handlers)
+        last = {h.kind: h for h in handlers.values()}
+        commands = {
+            'exact': last['exact'].word,
+            'prefix': f"{last['prefix'].word} now",
+            'regex': f"{last['regex'].word} 42",
+            'miss': 'no such command',
+        }
+        for name, command in commands.items():
+            expected = await linear_scan(handlers, command)
+            assert (await table.resolve(command))[0] == expected, command
+            fast = await time_lookups(table.resolve, command)
+            slow = await time_lookups(lambda c: linear_scan(handlers, c), command)
+            print(f"{size:>8} {name:<7} {fast:>9.2f} {slow:>9.2f} {slow / fast:>7.0f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
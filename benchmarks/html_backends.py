@@ -0,0 +1,63 @@
+# benchmarks/html_backends.py
+"""Throughput and output parity of the bs4, lxml and stream backends.
+
+Uses the pages in tests/html_corpus, each on its own and with its body
+repeated to about 1 MB (a long page). Parity is checked against bs4, the
+reference: same text once whitespace is ignored. Run from the repository
+root: python -m benchmarks.html_backends
+"""
+import os
+import re
+import time
+
+from core.html_text import PARSERS, html_to_text, lxml_html, BeautifulSoup
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'html_corpus')
+LARGE_BYTES = 1_000_000
+MIN_SECONDS = 0.5   # each measurement repeats the conversion at least this long
+
+_BODY_RE = re.compile(r'(?is)(<body[^>]*>)(.*?)(</body>|$)')
+
+
+def enlarge(html: str, size: int = LARGE_BYTES) -> str:
+    match = _BODY_RE.search(html)
+    body = match.group(2) if match else html
+    copies = max(1, size // max(len(body), 1))
+    if not match:
+        return body * copies
+    return html[:match.start(2)] + body * copies + html[match.end(2):]
+
+
+def throughput(parser: str, html: str) -> float:
+    """MB of markup converted per second"""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        html_to_text(html, parser=parser)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return runs * len(html.encode('utf-8')) / elapsed / 1e6
+
+
+def main():
+    parsers = [p for p in sorted(PARSERS)
+               if not (p == 'lxml' and lxml_html is None) and not (p == 'bs4' and BeautifulSoup is None)]
+    print(f"{'page':<16} {'size':>8} " + ' '.join(f"{p + ' MB/s':>12}" for p in parsers) + '  parity')
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if not name.endswith('.html'):
+            continue
+        with open(os.path.join(CORPUS_DIR, name), encoding='utf-8') as f:
+            page = f.read()
+        for label, html in ((name, page), (f"{name} x large", enlarge(page))):
+            outputs = {p: ''.join(html_to_text(html, parser=p).split()) for p in parsers}
+            reference = outputs.get('bs4')
+            parity = ' '.join(p for p in parsers if reference is not None and outputs[p] != reference) or 'ok'
+            if parity != 'ok':
+                parity = 'differs: ' + parity
+            rates = ' '.join(f"{throughput(p, html):>12.1f}" for p in parsers)
+            print(f"{label[:16]:<16} {len(html) // 1024:>6}KB {rates}  {parity}")
+
+
+if __name__ == '__main__':
+    main()
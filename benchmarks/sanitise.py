@@ -0,0 +1,62 @@
+# benchmarks/sanitise.py
+"""Clean-up of fetched page text: text_sanitise against the old code.
+
+The old code is copied below as it was: a generator calling
+unicodedata.category() for every character, then normalise_newlines()
+with its separate passes. Each input is about 1 MB, ten times the
+largest page the bot sends (url_fetch max_chars). Run from the
+repository root: python -m benchmarks.sanitise
+"""
+import re
+import time
+import unicodedata
+
+from core.text_sanitise import sanitise_text
+
+SIZE = 1_000_000
+MIN_SECONDS = 0.5
+
+
+def old_normalise_newlines(text: str) -> str:
+    text = re.sub(r'\r\n?', '\n', text)
+    lines = [ln.strip() for ln in text.splitlines()]
+    text = "\n".join(lines)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def old_sanitise(text: str) -> str:
+    text = old_normalise_newlines(text)   # done by the fetch script
+    return ''.join(c for c in text if unicodedata.category(c)[0] != 'C' or c in '\n\t')   # by the handler
+
+
+def inputs():
+    article = ("The firmware update fixes Wi-Fi drop-outs on the Raspberry Pi 4.   \r\n"
+               "Upgrade with sudo apt full-upgrade, then reboot.\r\n\r\n\r\n\t\n")
+    yield 'ascii article', (article * (SIZE // len(article) + 1))[:SIZE]
+    mixed = "Café 3 € · 東京 — «quotes» 😀 zero​width ctrl\x07 bell\n\n\n"
+    yield 'non-ascii', (mixed * (SIZE // len(mixed) + 1))[:SIZE]
+    yield 'control heavy', ('log line \x1b[0m\x00\x08 ok\n' * (SIZE // 24 + 1))[:SIZE]
+
+
+def per_call(function, text) -> float:
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        function(text)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return elapsed / runs * 1000
+
+
+def main():
+    print(f"{'input (1M chars)':<16} {'new ms':>8} {'old ms':>8} {'speedup':>8}")
+    for name, text in inputs():
+        new = per_call(sanitise_text, text)
+        old = per_call(old_sanitise, text)
+        print(f"{name:<16} {new:>8.1f} {old:>8.1f} {old / new:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
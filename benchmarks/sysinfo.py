@@ -0,0 +1,74 @@
+# benchmarks/sysinfo.py
+"""uptime, df and last read in-process, against forking the commands.
+
+Each view is called the way SystemCommandHandler calls it: the in-process
+one through asyncio.to_thread, the fallback through ShellExecutor, which
+forks uptime, df -h or last into their own process group. last reads
+generated wtmp files of 50 to 2000 sessions (last -f for the command) so
+the timing does not depend on this machine's login history; the Python
+parser costs a few µs per record, so past LAST_INPROCESS_MAX_RECORDS the
+handler forks last(1) instead. Reports wall time and CPU time (this process plus its children) per
+call. Run from the repository root: python -m benchmarks.sysinfo
+"""
+import asyncio
+import os
+import resource
+import tempfile
+import time
+
+from core import sysinfo
+from core.shell_utils import ShellExecutor
+from core.sysinfo import BOOT_TIME, DEAD_PROCESS, USER_PROCESS, UTMP_STRUCT
+
+CALLS = 200
+SESSIONS = (50, 150, 500, 2000)
+
+
+def write_wtmp(path: str, sessions: int):
+    start = int(time.time()) - sessions * 3600
+    records = [UTMP_STRUCT.pack(BOOT_TIME, 0, b'~', b'', b'reboot', b'6.1.0', 0, 0, 0, start, 0, 0, 0, 0, 0, b'')]
+    for i in range(sessions):
+        tty = f'pts/{i % 8}'.encode()
+        login = start + i * 3600
+        records.append(UTMP_STRUCT.pack(USER_PROCESS, 1000 + i, tty, b'', f'user{i % 5}'.encode(),
+                                        b'10.0.0.1', 0, 0, 0, login, 0, 0, 0, 0, 0, b''))
+        records.append(UTMP_STRUCT.pack(DEAD_PROCESS, 1000 + i, tty, b'', b'', b'', 0, 0, 0, login + 1800,
+                                        0, 0, 0, 0, 0, b''))
+    with open(path, 'wb') as f:
+        f.write(b''.join(records))
+
+
+def cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+async def per_call(call) -> tuple:
+    await call()
+    wall, cpu = time.perf_counter(), cpu_seconds()
+    for _ in range(CALLS):
+        await call()
+    return (time.perf_counter() - wall) / CALLS * 1000, (cpu_seconds() - cpu) / CALLS * 1000
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = {
+            'uptime': (sysinfo.uptime, ['uptime']),
+            'df': (sysinfo.df, ['df', '-h']),
+        }
+        for sessions in SESSIONS:
+            wtmp = os.path.join(tmp, f'wtmp.{sessions}')
+            write_wtmp(wtmp, sessions)
+            cases[f'last {sessions}'] = (lambda path=wtmp: sysinfo.last(path), ['last', '-f', wtmp])
+        print(f"{'view':<9} {'in-process ms':>13} {'cpu ms':>7} {'fork ms':>8} {'cpu ms':>7} {'speedup':>8}")
+        for name, (view, command) in cases.items():
+            inproc_wall, inproc_cpu = await per_call(lambda: asyncio.to_thread(view))
+            fork_wall, fork_cpu = await per_call(lambda: ShellExecutor.run_command(command))
+            print(f"{name:<9} {inproc_wall:>13.3f} {inproc_cpu:>7.3f} {fork_wall:>8.3f} {fork_cpu:>7.3f} "
+                  f"{fork_wall / inproc_wall:>7.1f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+# benchmarks/url_download.py
+"""Peak memory while downloading large pages from a local HTTP server.
+
+Each case runs in a fresh process (peak RSS only ever grows) that serves
+an HTML body of the given size from a thread and reads it either through
+decode_body(), which stops at DEFAULT_MAX_BYTES, or as resp.text, the way
+the fetcher read bodies before. Run from the repository root:
+python -m benchmarks.url_download
+"""
+import resource
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from core.url_fetcher import decode_body, fetch, DEFAULT_MAX_BYTES
+
+SIZES_MB = (10, 50, 200)   # MiB
+BLOCK = b'<p>' + b'lorem ipsum ' * 5000 + b'</p>\n'
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        size = int(self.path.strip('/')) * 1024 * 1024
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        try:
+            for _ in range(size // len(BLOCK)):
+                self.wfile.write(BLOCK)
+            self.wfile.write(BLOCK[:size % len(BLOCK)])
+        except OSError:
+            pass
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # KiB on Linux
+
+
+def child(mode: str, size_mb: int):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/{size_mb}"
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with requests.Session() as session:
+        resp = fetch(url, session=session)
+        text = decode_body(resp) if mode == 'capped' else resp.text
+    elapsed = time.perf_counter() - start
+    print(f"{size_mb:>6} {mode:<7} {len(text) / 1e6:>9.1f} {peak_rss_mb() - baseline:>10.1f} {elapsed:>7.2f}")
+
+
+def main():
+    print(f"body cap (decode_body): {DEFAULT_MAX_BYTES / 1e6:.0f} MB")
+    print(f"{'MiB':>6} {'read':<7} {'chars (M)':>9} {'+peak MiB':>10} {'secs':>7}")
+    for size_mb in SIZES_MB:
+        for mode in ('capped', 'full'):
+            subprocess.run([sys.executable, '-m', 'benchmarks.url_download', mode, str(size_mb)], check=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        child(sys.argv[1], int(sys.argv[2]))
+    else:
+        main()
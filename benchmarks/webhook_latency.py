@@ -0,0 +1,159 @@
+# benchmarks/webhook_latency.py
+"""Update-to-handler latency, long polling against the webhook listener.
+
+A local stand-in for the Bot API answers getMe and deleteWebhook and holds
+getUpdates open until an update is injected, the way Telegram's long poll
+does. In polling mode the Application's updater fetches from it; in webhook
+mode the stand-in POSTs each update to a WebhookServer instead. Latency is
+measured from the moment an update is injected to the moment the
+MessageHandler sees it, for updates arriving a few ms apart and for bursts,
+with no added network delay and with a simulated one-way delay to
+Telegram. Both paths open a new connection per request here, so the
+numbers compare the delivery model rather than connection reuse. Run from
+the repository root: python -m benchmarks.webhook_latency
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+from urllib.parse import parse_qs
+
+import httpx
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+
+from core.http_server import HttpServer
+from core.webhook import WebhookServer
+
+TOKEN = '123456:benchmark'
+SECRET = 'benchmark-secret'
+UPDATES = 200
+BURST = 20
+DELAYS = (0.0, 0.02)     # simulated one-way delay between the bot and Telegram
+ME = {'id': 123456, 'is_bot': True, 'first_name': 'bench', 'username': 'bench_bot'}
+
+
+def ok(result):
+    return 200, 'application/json', json.dumps({'ok': True, 'result': result}).encode()
+
+
+class FakeBotApi:
+    """Just enough of the Bot API for Application.initialize() and the updater"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.pending = asyncio.Queue()
+        prefix = f'/bot{TOKEN}/'
+        self.server = HttpServer('127.0.0.1', 0, {
+            prefix + 'getMe': self.get_me,
+            prefix + 'deleteWebhook': self.delete_webhook,
+            prefix + 'getUpdates': self.get_updates,
+        })
+
+    @property
+    def base_url(self) -> str:
+        port = self.server.server.sockets[0].getsockname()[1]
+        return f'http://127.0.0.1:{port}/bot'
+
+    async def get_me(self, request):
+        return ok(ME)
+
+    async def delete_webhook(self, request):
+        return ok(True)
+
+    async def get_updates(self, request):
+        await asyncio.sleep(self.delay)          # the request on its way to Telegram
+        params = parse_qs(request.body.decode())
+        timeout = float(params.get('timeout', ['10'])[0])
+        try:
+            updates = [await asyncio.wait_for(self.pending.get(), timeout)]
+        except asyncio.TimeoutError:
+            updates = []
+        while not self.pending.empty():
+            updates.append(self.pending.get_nowait())
+        await asyncio.sleep(self.delay)          # and the answer on its way back
+        return ok(updates)
+
+
+def make_update(n: int) -> dict:
+    return {'update_id': n, 'message': {
+        'message_id': n, 'date': int(time.time()), 'text': str(n),
+        'chat': {'id': 1, 'type': 'private'}, 'from': {'id': 1, 'is_bot': False, 'first_name': 'u'}}}
+
+
+def arrivals(pattern: str):
+    """Gaps to wait before each update: spread out, or in bursts of BURST"""
+    rng = random.Random(1)
+    for n in range(UPDATES):
+        if pattern == 'spread':
+            yield rng.uniform(0.002, 0.01)
+        else:
+            yield 0.05 if n % BURST == 0 else 0.0
+
+
+async def measure(mode: str, pattern: str, delay: float):
+    api = FakeBotApi(delay)
+    await api.server.start()
+    sent, seen = {}, {}
+    done = asyncio.Event()
+
+    async def on_message(update, context):
+        seen[update.message.text] = time.perf_counter()
+        if len(seen) == UPDATES:
+            done.set()
+
+    app = (ApplicationBuilder().token(TOKEN).base_url(api.base_url)
+           .concurrent_updates(True).build())
+    app.add_handler(MessageHandler(filters.TEXT, on_message))
+    async with app:
+        await app.start()
+        webhook = client = None
+        if mode == 'polling':
+            await app.updater.start_polling(poll_interval=0)
+        else:
+            webhook = WebhookServer(app, SECRET, port=0)
+            await webhook.start()
+            url = f"http://127.0.0.1:{webhook.server.server.sockets[0].getsockname()[1]}/telegram"
+            client = httpx.AsyncClient()
+
+        async def push(update: dict):
+            await asyncio.sleep(delay)
+            response = await client.post(url, json=update, headers={'X-Telegram-Bot-Api-Secret-Token': SECRET})
+            response.raise_for_status()
+
+        await asyncio.sleep(0.1)                 # let the first getUpdates reach the stand-in
+        pushes = []
+        for n, gap in enumerate(arrivals(pattern), 1):
+            await asyncio.sleep(gap)
+            update = make_update(n)
+            sent[str(n)] = time.perf_counter()
+            if mode == 'polling':
+                api.pending.put_nowait(update)
+            else:
+                pushes.append(asyncio.create_task(push(update)))
+        await asyncio.wait_for(done.wait(), 30)
+        await asyncio.gather(*pushes)
+
+        if mode == 'polling':
+            await app.updater.stop()
+        else:
+            await client.aclose()
+            await webhook.stop()
+        await app.stop()
+    await api.server.stop()
+
+    latencies = sorted((seen[k] - sent[k]) * 1000 for k in sent)
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1], latencies[-1]
+
+
+async def main():
+    print(f"{'delay ms':>8} {'arrivals':<8} {'mode':<8} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7}")
+    for delay in DELAYS:
+        for pattern in ('spread', 'burst'):
+            for mode in ('polling', 'webhook'):
+                p50, p95, worst = await measure(mode, pattern, delay)
+                print(f"{delay * 1000:>8.0f} {pattern:<8} {mode:<8} {p50:>7.1f} {p95:>7.1f} {worst:>7.1f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
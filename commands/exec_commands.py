@@ -1,24 +1,44 @@
 # commands/exec_commands.py
 """Secure command execution with email verification"""
-import os
-import random
-import string
-import smtplib
-from datetime import datetime
-from email.mime.text import MIMEText
+import hashlib
+import logging
 
 from core.command_loader import BaseCommandHandler
 from core.shell_utils import ShellExecutor
+from core.message_utils import LiveMessage, reply, LIVE_MAX_MESSAGES
+from core.exec_sessions import ExecSessionStore, SESSION_TTL, MAX_ATTEMPTS, hash_password
+from core.mailer import Mailer
+import config
 from config import recipient_email, email_address, email_password, smtp_server, smtp_port
 
+logger = logging.getLogger(__name__)
+
+# Root-owned wrapper from extras/ that runs the script piped to it (see README)
+DEFAULT_EXEC_RUNNER = ['sudo', '/usr/local/bin/telegrambot-exec']
+
+MANIFEST = {
+    'prefixes': ['exec', 'PASSWORD'],
+    'help': "Exec: exec <custom shell command - use at your own risk>",
+}
+
 class ExecCommandHandler(BaseCommandHandler):
     def __init__(self):
-        self.password_file = '/tmp/exec_password.txt'
-        self.attempt_file = '/tmp/exec_attempts.txt'
-        self.temp_command_file = '/tmp/temp_command.txt'
-        self.temp_script_path = '/tmp/temp-telegram-script.sh'
-        self.max_attempts = 3
+        self.sessions = ExecSessionStore(
+            ttl=getattr(config, 'exec_session_ttl', SESSION_TTL),
+            max_attempts=MAX_ATTEMPTS,
+            journal_path=getattr(config, 'exec_journal', None),
+        )
+        self.mailer = Mailer(smtp_server, smtp_port, email_address, email_password)
+        self.timeout = 300
+        self.runner = list(getattr(config, 'exec_runner', DEFAULT_EXEC_RUNNER))
     
+    def take_over(self, previous: 'ExecCommandHandler'):
+        # Keep pending exec requests (and their mail callbacks) across a reload
+        self.sessions = previous.sessions
+
+    async def close(self):
+        self.mailer.close()
+
     async def can_handle(self, command: str) -> bool:
         return command.startswith('exec') or command.startswith('PASSWORD')
     
@@ -30,105 +50,62 @@ class ExecCommandHandler(BaseCommandHandler):
     
     async def _handle_exec_request(self, message, command: str):
         """Handle initial exec command request"""
-        password = self._generate_password()
-        
-        # Store password and reset attempts
-        with open(self.password_file, 'w') as f:
-            f.write(password)
-        with open(self.attempt_file, 'w') as f:
-            f.write('0')
-        
-        # Store command to execute
         cmd_to_store = ' '.join(command.split(' ')[1:])
-        with open(self.temp_command_file, 'w') as f:
-            f.write(cmd_to_store)
+        password = self.sessions.create(message.chat_id, message.from_user.id, cmd_to_store)
+        await self.sessions.save()
         
-        # Send password via email
-        self._send_email('Your exec Command Password', f'PASSWORD: {password}', recipient_email)
-        await message.reply_text('A temporary password has been sent to your email. Please reply with PASSWORD: yourpassword to execute the command.')
+        # Send password via email in the background; report how that went later
+        chat_id, user_id = message.chat_id, message.from_user.id
+
+        async def delivered(ok: bool, detail: str):
+            if ok:
+                await reply(message, 'Password email delivered.')
+            else:
+                self.sessions.cancel(chat_id, user_id, hash_password(password))
+                await self.sessions.save()
+                await reply(message, f'Could not email the password ({detail}). The exec request was cancelled.')
+
+        self.mailer.submit(recipient_email, 'Your exec Command Password', f'PASSWORD: {password}', delivered)
+        await reply(message, 'A temporary password is being sent to your email. Please reply with PASSWORD: yourpassword to execute the command.')
     
     async def _handle_password_verification(self, message, command: str):
         """Handle password verification and command execution"""
-        if not os.path.exists(self.password_file):
-            await message.reply_text('Password has expired or is invalid. Please generate a new exec command.')
-            return
-
         parts = command.split(' ', 1)
-        if len(parts) < 2:
-            await message.reply_text('Invalid password format. Please reply with PASSWORD: yourpassword.')
+        if self.sessions.get(message.chat_id, message.from_user.id) is None:
+            await reply(message, 'Password has expired or is invalid. Please generate a new exec command.')
             return
-
-        input_password = parts[1].strip()
-
-        # Verify password
-        with open(self.password_file, 'r') as f:
-            stored_password = f.read().strip()
-
-        if input_password != stored_password:
-            await self._handle_failed_attempt(message)
+        if len(parts) < 2:
+            await reply(message, 'Invalid password format. Please reply with PASSWORD: yourpassword.')
             return
 
-        # Execute command
-        await self._execute_stored_command(message)
-    
-    async def _handle_failed_attempt(self, message):
-        """Handle failed password attempt"""
-        with open(self.attempt_file, 'r') as f:
-            attempts = int(f.read().strip())
-        attempts += 1
-        with open(self.attempt_file, 'w') as f:
-            f.write(str(attempts))
+        outcome, session = self.sessions.verify(message.chat_id, message.from_user.id, parts[1].strip())
+        await self.sessions.save()
 
-        if attempts >= self.max_attempts:
-            await message.reply_text('Too many failed attempts. The password has expired.')
-            self._cleanup_files()
+        if outcome == 'missing':
+            await reply(message, 'Password has expired or is invalid. Please generate a new exec command.')
+        elif outcome == 'locked':
+            await reply(message, 'Too many failed attempts. The password has expired.')
+        elif outcome == 'wrong':
+            await reply(message, f'Unauthorised access attempt! {self.sessions.max_attempts - session.attempts} attempts left.')
         else:
-            await message.reply_text(f'Unauthorised access attempt! {self.max_attempts - attempts} attempts left.')
-    
-    async def _execute_stored_command(self, message):
-        """Execute the stored command"""
-        with open(self.temp_command_file, 'r') as f:
-            command_to_execute = f.read().strip()
-
-        # Create temporary script
-        with open(self.temp_script_path, 'w') as f:
-            f.write(f'#!/bin/bash\n\n')
-            f.write(f'# Script generated by Telegram bot at {datetime.now()}\n')
-            f.write(f'# Command to execute: {command_to_execute}\n')
-            f.write(f'{command_to_execute}\n')
-
-        os.chmod(self.temp_script_path, 0o755)
-
-        # Execute
-        result = ShellExecutor.execute_command(['sudo', self.temp_script_path])
-        await message.reply_text(f'Command execution result:\n\n{result}')
-
-        # Clean up
-        self._cleanup_files()
-    
-    def _generate_password(self, length: int = 12) -> str:
-        """Generate a random password"""
-        characters = string.ascii_letters + string.digits + string.punctuation
-        return ''.join(random.choice(characters) for _ in range(length))
+            await self._execute_stored_command(message, session.command)
     
-    def _send_email(self, subject: str, body: str, to: str):
-        """Send email notification"""
-        msg = MIMEText(body)
-        msg['Subject'] = subject
-        msg['From'] = email_address
-        msg['To'] = to
+    async def _execute_stored_command(self, message, command_to_execute: str):
+        """Execute the verified command"""
+        # Like telegrambot-exec (same bytes, same hash), log size and hash only:
+        # the script may contain secrets
+        script = f'{command_to_execute}\n'.encode('utf-8')
+        logger.info(f"exec by user {message.from_user.id} in chat {message.chat_id}: {len(script)} bytes, "
+                    f"sha256 {hashlib.sha256(script).hexdigest()}")
 
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(email_address, email_password)
-            server.sendmail(email_address, to, msg.as_string())
-    
-    def _cleanup_files(self):
-        """Clean up temporary files"""
-        files = [self.password_file, self.attempt_file, self.temp_command_file, self.temp_script_path]
-        for file_path in files:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+        # The script goes to the runner on stdin: nothing is written to disk
+        live = LiveMessage(message, header='Command execution result:\n\n', max_messages=LIVE_MAX_MESSAGES,
+                           filename='exec-output.txt')
+        result = await ShellExecutor.run_command(self.runner, timeout=self.timeout,
+                                                 input_data=script,
+                                                 on_output=live.write)
+        await live.write(result.output)
+        await live.close()
     
     async def get_help(self) -> str:
         return "Exec: exec <custom shell command - use at your own risk>"
\ No newline at end of file
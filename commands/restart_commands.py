@@ -2,6 +2,12 @@
 """Device restart commands"""
 from core.command_loader import BaseCommandHandler
 from core.shell_utils import ShellExecutor
+from core.message_utils import reply, send_output
+
+MANIFEST = {
+    'prefixes': ['restart '],
+    'help': "Restart: restart (router|raspberrino|raspbxino)",
+}
 
 class RestartCommandHandler(BaseCommandHandler):
     def __init__(self):
@@ -14,6 +20,10 @@ class RestartCommandHandler(BaseCommandHandler):
     async def can_handle(self, command: str) -> bool:
         return command.startswith('restart ')
     
+    def get_concurrency_key(self, command: str):
+        # Only one restart per device at a time, whoever asks
+        return f"restart:{command.split('restart', 1)[1].strip()}"
+    
     async def execute(self, message, command: str):
         if not command.startswith('restart '):
             return
@@ -21,10 +31,10 @@ class RestartCommandHandler(BaseCommandHandler):
         device = command.split('restart', 1)[1].strip()
         
         if device in self.devices:
-            result = ShellExecutor.execute_command(self.devices[device])
-            await message.reply_text(result)
+            result = await ShellExecutor.execute_command(self.devices[device], timeout=120)
+            await send_output(message, result, filename=f"restart-{device}.txt")
         else:
-            await message.reply_text('Usage: restart (router|raspberrino|raspbxino)')
+            await reply(message, 'Usage: restart (router|raspberrino|raspbxino)')
     
     async def get_help(self) -> str:
         devices = "|".join(self.devices.keys())
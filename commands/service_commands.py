@@ -1,7 +1,13 @@
 # commands/service_commands.py
 """Service management commands"""
 from core.command_loader import BaseCommandHandler
-from core.shell_utils import ShellExecutor
+from core.shell_utils import ShellExecutor, DEFAULT_TIMEOUT
+from core.message_utils import LiveMessage, send_output, LIVE_MAX_MESSAGES
+
+MANIFEST = {
+    'exact': ['vpn-restart', 'kodi stop', 'kodi start', 'upgrade raspbxino', 'tunnel-ssh'],
+    'help': "Services: vpn-restart, kodi stop, kodi start, upgrade raspbxino, tunnel-ssh",
+}
 
 class ServiceCommandHandler(BaseCommandHandler):
     def __init__(self):
@@ -12,14 +18,35 @@ class ServiceCommandHandler(BaseCommandHandler):
             'upgrade raspbxino': ['sudo', 'upgrade_raspbxino'],
             'tunnel-ssh': ['/usr/local/bin/ssh-port-forward.sh'],
         }
+        # Per-command timeouts in seconds (default: 30)
+        self.timeouts = {
+            'upgrade raspbxino': 1800,
+            'vpn-restart': 60,
+        }
+        # Long-running commands whose output is streamed as it arrives
+        self.streaming = {'upgrade raspbxino'}
     
     async def can_handle(self, command: str) -> bool:
         return command in self.commands
     
+    def get_concurrency_key(self, command: str):
+        return f"service:{command}"
+    
     async def execute(self, message, command: str):
-        if command in self.commands:
-            result = ShellExecutor.execute_command(self.commands[command])
-            await message.reply_text(result)
+        if command not in self.commands:
+            return
+
+        timeout = self.timeouts.get(command, DEFAULT_TIMEOUT)
+        if command in self.streaming:
+            filename = f"{command.replace(' ', '-')}.txt"
+            live = LiveMessage(message, max_messages=LIVE_MAX_MESSAGES, filename=filename)
+            result = await ShellExecutor.run_command(self.commands[command], timeout=timeout,
+                                                     on_output=live.write)
+            await live.write(result.output)
+            await live.close()
+        else:
+            result = await ShellExecutor.execute_command(self.commands[command], timeout=timeout)
+            await send_output(message, result, filename=f"{command.replace(' ', '-')}.txt")
     
     async def get_help(self) -> str:
         return "Services: " + ", ".join(self.commands.keys())
\ No newline at end of file
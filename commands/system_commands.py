@@ -1,23 +1,82 @@
 # commands/system_commands.py
 """Basic system commands"""
+import asyncio
+import logging
+
+from core import sysinfo
 from core.command_loader import BaseCommandHandler
 from core.shell_utils import ShellExecutor
+from core.message_utils import send_output
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = {
+    'exact': ['uptime', 'df', 'last', 'mem', 'cpu', 'temp', 'net'],
+    'help': "System: uptime, df, last, mem, cpu, temp, net",
+}
 
 class SystemCommandHandler(BaseCommandHandler):
+    # Nothing here changes the system, so identical requests share results
+    read_only = True
+
     def __init__(self):
-        self.commands = {
+        # Read in-process from /proc, /sys and wtmp (run in a worker thread)
+        self.views = {
+            'uptime': sysinfo.uptime,
+            'df': sysinfo.df,
+            'last': sysinfo.last,
+            'mem': sysinfo.memory,
+            'cpu': sysinfo.cpu,
+            'temp': sysinfo.temperature,
+            'net': sysinfo.network,
+        }
+        # External commands used when those files cannot be read
+        self.fallbacks = {
             'uptime': ['uptime'],
             'df': ['df', '-h'],
             'last': ['last'],
         }
-    
+        # Seconds a result is reused by identical requests
+        self.cache_ttls = {
+            'uptime': 5,
+            'df': 10,
+            'last': 30,
+            'mem': 5,
+            'cpu': 2,
+            'temp': 5,
+            'net': 2,
+        }
+
     async def can_handle(self, command: str) -> bool:
-        return command in self.commands
-    
+        return command in self.views
+
+    def get_cache_ttl(self, command: str):
+        return self.cache_ttls.get(command)
+
     async def execute(self, message, command: str):
-        if command in self.commands:
-            result = ShellExecutor.execute_command(self.commands[command])
-            await message.reply_text(result)
-    
+        if command in self.views:
+            result, age = await self.run_cached(command, lambda: self._collect(command))
+            if age >= 1:
+                result = f"{result}\n\n(cached, {age:.0f}s old)"
+            await send_output(message, result, filename=f"{command}.txt")
+
+    async def _collect(self, command: str) -> str:
+        if command == 'last' and self._wtmp_is_large():
+            return await ShellExecutor.execute_command(self.fallbacks['last'])
+        try:
+            return await asyncio.to_thread(self.views[command])
+        except OSError as e:
+            if command not in self.fallbacks:
+                return f"{command} is not available on this system: {e}"
+            logger.warning(f"Reading {command} directly failed ({e}), running {self.fallbacks[command][0]}")
+            return await ShellExecutor.execute_command(self.fallbacks[command])
+
+    @staticmethod
+    def _wtmp_is_large() -> bool:
+        try:
+            return sysinfo.wtmp_records() > sysinfo.LAST_INPROCESS_MAX_RECORDS
+        except OSError:
+            return False   # sysinfo.last() fails the same way and falls back
+
     async def get_help(self) -> str:
-        return "System: " + ", ".join(self.commands.keys())
\ No newline at end of file
+        return "System: " + ", ".join(self.views.keys())
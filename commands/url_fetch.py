@@ -1,55 +1,97 @@
 # commands/url_fetch.py
-import os
-import sys
 from core.command_loader import BaseCommandHandler
-from core.shell_utils import ShellExecutor
-from core.message_utils import send_chunked_text, is_url_like
+from core.message_utils import send_output, extract_urls, reply
+from core.url_fetcher import UrlFetchService, FetchError, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST
+from core.html_text import DEFAULT_PARSER
+from core.text_sanitise import sanitise_text
+from core.url_cache import UrlCache, DEFAULT_CACHE_DIR, DEFAULT_TTL, DEFAULT_MEMORY_BYTES, DEFAULT_DISK_BYTES
+from urllib.parse import urlsplit
+import config
+
+MANIFEST = {
+    # Any message containing a link, e.g. a forwarded post with several URLs
+    'patterns': [r'(?i:url |fetch )', r'(?is:.*?https?://)'],
+    'help': "URL: url <http[s]://...>, fetch <http[s]://...>, or just paste/forward text with one or more URLs",
+}
 
 class UrlFetchHandler(BaseCommandHandler):
     def __init__(self):
-        script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        self.fetch_script = os.path.join(script_dir, 'utils', 'fetch_clean_url.py')
+        cache = UrlCache(
+            cache_dir=getattr(config, 'url_cache_dir', DEFAULT_CACHE_DIR),
+            ttl=getattr(config, 'url_cache_ttl', DEFAULT_TTL),
+            max_memory_bytes=getattr(config, 'url_cache_memory_bytes', DEFAULT_MEMORY_BYTES),
+            max_disk_bytes=getattr(config, 'url_cache_disk_bytes', DEFAULT_DISK_BYTES),
+        )
+        # Shared across requests so connections are kept alive and reused
+        self.fetcher = UrlFetchService(
+            cache=cache,
+            parser=getattr(config, 'url_fetch_parser', DEFAULT_PARSER),
+            concurrency=getattr(config, 'url_fetch_concurrency', DEFAULT_CONCURRENCY),
+            per_host=getattr(config, 'url_fetch_per_host', DEFAULT_PER_HOST),
+        )
+        self.running = 0       # execute() calls in progress
+        self.closing = False   # replaced by a reload: close the fetcher once idle
     
     async def can_handle(self, command: str) -> bool:
         lower_cmd = command.lower()
         return (lower_cmd.startswith('url ') or 
                 lower_cmd.startswith('fetch ') or 
-                is_url_like(command))
+                bool(extract_urls(command)))
     
     async def execute(self, message, command: str):
+        self.running += 1
+        try:
+            await self._execute(message, command)
+        finally:
+            self.running -= 1
+            if self.closing and not self.running:
+                self.fetcher.close()
+
+    async def _execute(self, message, command: str):
         lower_cmd = command.lower()
-        url = None
-        if lower_cmd.startswith('url '):
-            url = command.split(' ', 1)[1].strip()
-        elif lower_cmd.startswith('fetch '):
-            url = command.split(' ', 1)[1].strip()
-        elif is_url_like(command):
-            url = command.strip()
-        if not url:
-            await message.reply_text('No URL provided')
-            return
+        text = command
+        if lower_cmd.startswith('url ') or lower_cmd.startswith('fetch '):
+            text = command.split(' ', 1)[1].strip()
 
-        if not os.path.exists(self.fetch_script) or not os.access(self.fetch_script, os.X_OK):
-            await message.reply_text(f'Fetch script not found or not executable at {self.fetch_script}')
+        urls = extract_urls(text)
+        if not urls and text != command and text:
+            # Let the fetcher explain what is wrong with it
+            urls = [text]
+        if not urls:
+            await reply(message, 'No URL provided')
             return
 
-        await message.reply_text('Fetching URL, please wait...')
+        if len(urls) == 1:
+            await reply(message, 'Fetching URL, please wait...')
+            try:
+                result = await self.fetcher.fetch_clean_text(urls[0])
+            except FetchError as e:
+                result = f'ERROR: {e}'
+            await send_output(message, self._clean(result), filename=self._filename(urls[0]))
+            return
 
-        #result = ShellExecutor.execute_command(['python3', self.fetch_script, url, '--accept-cookies', '--full'])
-        result = ShellExecutor.execute_command(['python3', self.fetch_script, url])
+        # Batch: fetch concurrently and send each page as soon as it is ready
+        await reply(message, f'Fetching {len(urls)} URLs, please wait...')
+        async for url, result, ok in self.fetcher.fetch_many(urls):
+            if not ok:
+                result = f'ERROR: {result}'
+            await send_output(message, self._clean(f'🔗 {url}\n\n{result}'), filename=self._filename(url))
 
-        # Only decode once safely
-        if isinstance(result, bytes):
-            try:
-                result = result.decode('utf-8')
-            except UnicodeDecodeError:
-                result = result.decode('utf-8', errors='replace')
+    async def close(self):
+        # Fetches still running keep the pools and session until they finish
+        self.closing = True
+        if not self.running:
+            self.fetcher.close()
 
-        # Remove control characters Telegram dislikes
-        import unicodedata
-        result = ''.join(c for c in result if unicodedata.category(c)[0] != 'C' or c in '\n\t')
+    @staticmethod
+    def _filename(url: str) -> str:
+        host = urlsplit(url).hostname or 'page'
+        return f"{host}.txt"
 
-        await send_chunked_text(message, result)
+    @staticmethod
+    def _clean(result: str) -> str:
+        # Remove control characters Telegram dislikes, tidy line breaks
+        return sanitise_text(result)
     
     async def get_help(self) -> str:
-        return "URL: url <http[s]://...>, fetch <http[s]://...>, or just paste a URL"
+        return "URL: url <http[s]://...>, fetch <http[s]://...>, or just paste/forward text with one or more URLs"
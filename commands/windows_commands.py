@@ -2,6 +2,12 @@
 """Windows machine management commands"""
 from core.command_loader import BaseCommandHandler
 from core.shell_utils import ShellExecutor
+from core.message_utils import reply, send_output
+
+MANIFEST = {
+    'exact': ['shutdown-nuky'],
+    'help': "Windows: shutdown-nuky",
+}
 
 class WindowsCommandHandler(BaseCommandHandler):
     def __init__(self):
@@ -15,19 +21,22 @@ class WindowsCommandHandler(BaseCommandHandler):
     async def can_handle(self, command: str) -> bool:
         return command in self.commands
     
+    def get_concurrency_key(self, command: str):
+        return f"windows:{command}"
+    
     async def execute(self, message, command: str):
         if command in self.commands:
             # Add a confirmation message for destructive actions
             if 'shutdown' in command:
-                await message.reply_text(f"🔄 Initiating {command}...")
+                await reply(message, f"🔄 Initiating {command}...")
             
-            result = ShellExecutor.execute_command(self.commands[command])
+            result = await ShellExecutor.execute_command(self.commands[command])
             
             # Provide more informative feedback
             if result.strip():
-                await message.reply_text(f"Result: {result}")
+                await send_output(message, f"Result: {result}", filename=f"{command}.txt")
             else:
-                await message.reply_text(f"✅ {command} completed successfully")
+                await reply(message, f"✅ {command} completed successfully")
     
     async def get_help(self) -> str:
         return "Windows: " + ", ".join(self.commands.keys())
\ No newline at end of file
@@ -0,0 +1,180 @@
+# core/admin_commands.py
+"""Built-in commands for inspecting and controlling the bot itself"""
+import time
+import sqlite3
+
+from core.command_loader import BaseCommandHandler, CommandTriggers
+from core.message_utils import send_chunked_text, reply
+from core.metrics import (PROCESS_START, MESSAGES, HANDLER_SECONDS, HANDLER_ERRORS, SUBPROCESS_SECONDS,
+                          SUBPROCESS_EXITS, TELEGRAM_API_SECONDS, TELEGRAM_API_ERRORS, URL_FETCH_BYTES,
+                          OUTBOX_WAIT_SECONDS, OUTBOX_RETRIES, OUTBOX_COALESCED,
+                          URL_PARSE_SECONDS, URL_CACHE_LOOKUPS, RESULT_CACHE_LOOKUPS, LOOP_LAG_SECONDS,
+                          LOOP_LAG_HISTOGRAM, HEALTH_TRANSITIONS, AUDIT_RECORDS)
+from core.result_cache import RESULT_CACHE
+
+STATUS_TRAIL = 20   # recent health results shown per check
+DEFAULT_HISTORY = 20
+
+
+def format_age(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+class AdminCommandHandler(BaseCommandHandler):
+    inline = True
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def can_handle(self, command: str) -> bool:
+        return (command in ('jobs', 'stats', 'status', 'reload', 'history')
+                or command.startswith(('cancel ', 'reload ', 'history ')))
+
+    def get_triggers(self) -> CommandTriggers:
+        return CommandTriggers(exact=('jobs', 'stats', 'status', 'reload', 'history'),
+                               prefixes=('cancel ', 'reload ', 'history '))
+
+    async def execute(self, message, command: str):
+        if command == 'jobs':
+            await self._show_jobs(message)
+        elif command == 'stats':
+            await self._show_stats(message)
+        elif command == 'status':
+            await self._show_status(message)
+        elif command.startswith('cancel '):
+            await self._cancel_job(message, command.split(' ', 1)[1].strip().lstrip('#'))
+        elif command == 'history' or command.startswith('history '):
+            await self._show_history(message, command.split(' ', 1)[1].strip() if ' ' in command else '')
+        elif command == 'reload' or command.startswith('reload '):
+            await self._reload_plugins(message, command.split()[1:])
+
+    async def _show_jobs(self, message):
+        jobs = self.bot.scheduler.list_jobs()
+        if not jobs:
+            await reply(message, 'No jobs.')
+            return
+
+        now = time.time()
+        lines = []
+        for job in jobs:
+            since = job.started_at or job.created_at
+            if job.finished_at:
+                age = f"took {format_age(job.finished_at - since)}"
+            else:
+                age = f"{format_age(now - since)}"
+            lines.append(f"#{job.id} {job.state:<9} {age:<12} @{job.user}: {job.command}")
+        await send_chunked_text(message, "Jobs (active first, then recent):\n" + "\n".join(lines))
+
+    async def _cancel_job(self, message, job_id: str):
+        if not job_id.isdigit():
+            await reply(message, 'Usage: cancel <job id>')
+            return
+        job = self.bot.scheduler.cancel(int(job_id))
+        if job is None:
+            await reply(message, f'No queued or running job #{job_id}')
+        else:
+            await reply(message, f'Cancelled job #{job.id}: {job.command}')
+
+    async def _reload_plugins(self, message, modules):
+        results = await self.bot.command_loader.reload_changed(force=tuple(modules))
+        unknown = [name for name in modules if name not in results]
+        lines = [f"{name}: {outcome}" for name, outcome in sorted(results.items())]
+        lines += [f"{name}: no such plugin" for name in unknown]
+        await reply(message, "\n".join(lines) if lines else 'No plugin changed.')
+
+    async def _show_history(self, message, args: str):
+        if not self.bot.audit_log.enabled:
+            await reply(message, 'Command history is off (see audit_db in config.py).')
+            return
+        limit, text = DEFAULT_HISTORY, args
+        first, _, rest = args.partition(' ')
+        if first.isdigit():
+            limit, text = max(int(first), 1), rest.strip()
+
+        start = time.monotonic()
+        try:
+            entries = await self.bot.audit_log.history(limit, text)
+        except sqlite3.Error as e:
+            await reply(message, f'Command history is not available: {e}')
+            return
+        took = (time.monotonic() - start) * 1000
+        if not entries:
+            await reply(message, 'No matching commands in the history.')
+            return
+
+        lines = []
+        for entry in entries:
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.started_at))
+            outcome = entry.state if entry.exit_code is None else f"{entry.state}, exit {entry.exit_code}"
+            lines.append(f"{when} @{entry.user}: {entry.command} ({outcome}, "
+                         f"{format_age(entry.finished_at - entry.started_at)}, {entry.output_bytes} bytes)")
+        await send_chunked_text(message, "\n".join(lines) + f"\n\n{len(entries)} shown, found in {took:.0f} ms")
+
+    async def _show_status(self, message):
+        monitor = self.bot.health_monitor
+        if not monitor.checks:
+            await reply(message, 'No health checks configured (see health_checks in config.py).')
+            return
+
+        now = time.time()
+        lines = [f"Health, checked every {format_age(monitor.interval)} (oldest to newest result on the right):"]
+        for check in monitor.checks:
+            if check.checked_at is None:
+                lines.append(f"{check.name}: not checked yet")
+                continue
+            state = 'unknown' if check.up is None else 'up' if check.up else 'DOWN'
+            since = f" for {format_age(now - check.since)}" if check.since else ''
+            trail = ''.join('+' if up else '-' for _, up in list(check.history)[-STATUS_TRAIL:])
+            lines.append(f"{check.name}: {state}{since}, {check.probe.describe()}: {check.detail} "
+                         f"({format_age(now - check.checked_at)} ago) {trail}")
+        await send_chunked_text(message, "\n".join(lines))
+
+    async def _show_stats(self, message):
+        def latency_lines(title, histogram):
+            rows = sorted(histogram.summary().items(), key=lambda item: -item[1][0])
+            if not rows:
+                return []
+            lines = [f"\n{title} (count, avg, p95):"]
+            for key, (count, mean, p95) in rows:
+                name = '/'.join(key) or 'all'
+                lines.append(f"  {name}: {count}, {mean * 1000:.0f} ms, <= {p95:g} s")
+            return lines
+
+        def counter_line(title, counter):
+            values = ', '.join(f"{'/'.join(k) or 'total'}={v:g}" for k, v in sorted(counter.values.items()))
+            return [f"\n{title}: {values}"] if values else []
+
+        uptime = time.time() - PROCESS_START.values[()]
+        lines = [f"Up {format_age(uptime)}, {self.bot.scheduler.max_concurrent} job slots"]
+        lines.append(f"Startup: {self.bot.startup_timeline.summary()}")
+        lines += counter_line("Messages", MESSAGES)
+        lines += latency_lines("Handlers", HANDLER_SECONDS)
+        lines += counter_line("Handler errors", HANDLER_ERRORS)
+        lines += latency_lines("Subprocesses", SUBPROCESS_SECONDS)
+        lines += counter_line("Exit codes", SUBPROCESS_EXITS)
+        lines += latency_lines("Telegram API", TELEGRAM_API_SECONDS)
+        lines += counter_line("Telegram API errors", TELEGRAM_API_ERRORS)
+        lines += latency_lines("Send queue wait", OUTBOX_WAIT_SECONDS)
+        lines += counter_line("Send retries", OUTBOX_RETRIES)
+        lines += counter_line("Replies merged", OUTBOX_COALESCED)
+        lines += counter_line("URL bytes downloaded", URL_FETCH_BYTES)
+        lines += latency_lines("URL parsing", URL_PARSE_SECONDS)
+        lines += counter_line("URL cache", URL_CACHE_LOOKUPS)
+        lines += counter_line("Result cache", RESULT_CACHE_LOOKUPS)
+        cached = RESULT_CACHE.stats()
+        if cached['entries'] or cached['in_flight']:
+            lines.append(f"  {cached['entries']} fresh, {cached['in_flight']} running")
+        lines += counter_line("Health changes", HEALTH_TRANSITIONS)
+        lines += counter_line("History records", AUDIT_RECORDS)
+        lag = LOOP_LAG_HISTOGRAM.summary().get((), (0, 0.0, 0.0))
+        lines.append(f"\nEvent loop lag: now {LOOP_LAG_SECONDS.values.get((), 0) * 1000:.1f} ms, "
+                     f"p95 <= {lag[2]:g} s")
+        await send_chunked_text(message, "\n".join(lines))
+
+    async def get_help(self) -> str:
+        return "Jobs: jobs, cancel <id>, history [N] [text|@user] | Bot: status, stats, reload [plugin]"
@@ -0,0 +1,230 @@
+# core/audit.py
+"""Persistent history of every command run, kept in SQLite"""
+import os
+import time
+import queue
+import atexit
+import asyncio
+import sqlite3
+import logging
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, NamedTuple, Optional
+
+from core.metrics import AUDIT_RECORDS, AUDIT_WRITE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUDIT_DB = '~/.local/share/telegrambot/audit.db'
+BATCH_SIZE = 200         # records written per transaction at most
+BATCH_DELAY = 0.5        # seconds the writer waits to fill a batch
+MAX_PENDING = 10000      # records queued for the writer before new ones are dropped
+MAX_HISTORY = 200        # rows one query returns at most
+SORT_LIMIT = 5000        # prefix matches sorted in memory at most (see _history_sql)
+MAX_COMMAND_LENGTH = 200 # characters of a command that are stored
+
+# Message text that must never reach the database, only its first word does
+SECRET_VERBS = ('PASSWORD',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    chat_id INTEGER,
+    user TEXT,
+    command TEXT NOT NULL,
+    verb TEXT NOT NULL,           -- first word of command
+    handler TEXT,
+    state TEXT NOT NULL,
+    exit_code INTEGER,
+    output_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS commands_started ON commands (started_at);
+CREATE INDEX IF NOT EXISTS commands_user ON commands (user, started_at);
+CREATE INDEX IF NOT EXISTS commands_verb ON commands (verb, started_at);
+CREATE INDEX IF NOT EXISTS commands_command ON commands (command, started_at);
+"""
+
+
+@dataclass
+class CommandUsage:
+    """What a command did, filled in while it runs"""
+    exit_code: Optional[int] = None   # of the last process it started
+    output_bytes: int = 0             # read from all its processes
+    error: Optional[str] = None       # set when the handler raised
+
+
+_current_usage: ContextVar[Optional[CommandUsage]] = ContextVar('command_usage', default=None)
+
+
+def track_usage() -> CommandUsage:
+    """Start collecting usage for the command running in this context (and tasks it starts)"""
+    usage = CommandUsage()
+    _current_usage.set(usage)
+    return usage
+
+
+def note_process(returncode: Optional[int], output_bytes: int):
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.exit_code = returncode
+        usage.output_bytes += output_bytes
+
+
+def note_error(error: Exception):
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.error = str(error)
+
+
+def redact_command(command: str) -> str:
+    """What of a message is stored: no one-time passwords, first line of a script, bounded length"""
+    verb = command.split(' ', 1)[0]
+    for secret in SECRET_VERBS:
+        if verb.startswith(secret):
+            return f"{secret}: ***"
+    first, *rest = command.strip().split('\n')
+    if len(first) > MAX_COMMAND_LENGTH:
+        first = first[:MAX_COMMAND_LENGTH] + '…'
+    return f"{first} (+{len(rest)} lines)" if rest else first
+
+
+class AuditEntry(NamedTuple):
+    id: int
+    started_at: float
+    finished_at: float
+    chat_id: int
+    user: str
+    command: str
+    verb: str
+    handler: str
+    state: str
+    exit_code: Optional[int]
+    output_bytes: int
+
+
+class AuditLog:
+    """Append-only command history in a SQLite database (WAL mode).
+
+    record() only puts a row on an in-memory queue, so it never waits for
+    the disk. A writer thread takes rows off the queue and inserts them in
+    batches, one transaction per batch. Queries open their own connection
+    in a worker thread; with WAL they read while the writer writes.
+    """
+
+    def __init__(self, path: str = DEFAULT_AUDIT_DB):
+        self.path = os.path.expanduser(path)
+        self._pending = queue.Queue(MAX_PENDING)
+        self._thread = None
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+        self._thread = threading.Thread(target=self._writer, name='audit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self, timeout: float = 5.0):
+        """Write what is queued and stop the writer"""
+        if self._thread is not None and self._thread.is_alive():
+            self._pending.put(None)
+            self._thread.join(timeout)
+
+    def record(self, started_at: float, finished_at: float, chat_id: int, user: str, command: str,
+               handler: str, state: str, usage: Optional[CommandUsage] = None):
+        if not self.enabled:
+            return
+        if usage is not None and usage.error is not None and state == 'done':
+            state = 'failed'
+        command = redact_command(command)
+        row = (started_at, finished_at, chat_id, user, command, command.split(' ', 1)[0], handler, state,
+               usage.exit_code if usage else None, usage.output_bytes if usage else 0)
+        try:
+            self._pending.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            AUDIT_RECORDS.inc(result='dropped')
+
+    async def history(self, limit: int = 20, text: str = '') -> List[AuditEntry]:
+        """Newest entries first; text starting with @ selects a user, anything else a command prefix"""
+        return await asyncio.to_thread(self._query, min(limit, MAX_HISTORY), text)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _query(self, limit: int, text: str) -> List[AuditEntry]:
+        connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, timeout=10)
+        try:
+            sql, params = self._history_sql(connection, text)
+            return [AuditEntry(*row) for row in connection.execute(sql, params + [limit])]
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _history_sql(connection: sqlite3.Connection, text: str):
+        """Pick the index that finds the newest matches without scanning years of rows"""
+        if text.startswith('@'):
+            return 'SELECT * FROM commands WHERE user = ? ORDER BY started_at DESC LIMIT ?', [text[1:]]
+        if text and ' ' not in text:
+            return 'SELECT * FROM commands WHERE verb = ? ORDER BY started_at DESC LIMIT ?', [text]
+        if text:
+            verb = text.split(' ', 1)[0]
+            bounds = [text, text[:-1] + chr(ord(text[-1]) + 1)]   # command starts with text
+            # Few matches: fetch them all through commands_command and sort.
+            # Many: walk the command's rows newest first, they match densely.
+            matches = connection.execute(
+                'SELECT count(*) FROM commands WHERE command >= ? AND command < ?', bounds).fetchone()[0]
+            index = 'commands_verb' if matches > SORT_LIMIT else 'commands_command'
+            return (f'SELECT * FROM commands INDEXED BY {index} WHERE verb = ? AND command >= ? AND command < ?'
+                    ' ORDER BY started_at DESC LIMIT ?', [verb] + bounds)
+        return 'SELECT * FROM commands ORDER BY started_at DESC LIMIT ?', []
+
+    def _writer(self):
+        connection = self._connect()
+        try:
+            while True:
+                row = self._pending.get()
+                if row is None:
+                    return
+                batch = [row]
+                deadline = time.monotonic() + BATCH_DELAY
+                while len(batch) < BATCH_SIZE:
+                    try:
+                        row = self._pending.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if row is None:
+                        self._write(connection, batch)
+                        return
+                    batch.append(row)
+                self._write(connection, batch)
+        finally:
+            connection.close()
+
+    def _write(self, connection: sqlite3.Connection, batch: list):
+        start = time.monotonic()
+        try:
+            with connection:
+                connection.executemany(
+                    'INSERT INTO commands (started_at, finished_at, chat_id, user, command, verb, handler, state,'
+                    ' exit_code, output_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+        except sqlite3.Error as e:
+            AUDIT_RECORDS.inc(len(batch), result='failed')
+            logger.error(f"Could not write {len(batch)} audit records to {self.path}: {e}")
+            return
+        AUDIT_WRITE_SECONDS.observe(time.monotonic() - start)
+        AUDIT_RECORDS.inc(len(batch), result='written')
@@ -1,26 +1,126 @@
 # core/auth.py
 """Authentication management"""
+import time
 import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+DECISION_TTL = 60             # seconds an allow/deny decision is reused
+MAX_CACHED_DECISIONS = 4096   # the cache is dropped when it grows past this (e.g. spam from many ids)
+REJECTION_LOG_INTERVAL = 60   # seconds between summaries of rejected messages
+MAX_TRACKED_REJECTERS = 1024  # beyond this, rejected users are only counted in aggregate
+DEFAULT_USER_RATE = 1.0       # messages per second an authorised user may sustain...
+DEFAULT_USER_BURST = 10       # ...after a burst of this many
+
+
+@dataclass
+class TokenBucket:
+    rate: float
+    capacity: float
+    tokens: float
+    updated: float = field(default_factory=time.monotonic)
+    throttled: bool = False   # the previous take() was refused
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.throttled = False
+            return True
+        return False
+
+
 class AuthManager:
-    def __init__(self, authorised_ids: list, authorised_usernames: list):
-        self.authorised_ids = authorised_ids
-        self.authorised_usernames = authorised_usernames
-    
+    def __init__(self, authorised_ids: Iterable[int], authorised_usernames: Iterable[str],
+                 user_rate: float = DEFAULT_USER_RATE, user_burst: int = DEFAULT_USER_BURST,
+                 decision_ttl: float = DECISION_TTL):
+        self.authorised_ids = frozenset(authorised_ids)
+        self.authorised_usernames = frozenset(authorised_usernames)
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.decision_ttl = decision_ttl
+        self._decisions: Dict[Tuple[int, str, bool], Tuple[bool, str, float]] = {}
+        self._buckets: Dict[int, TokenBucket] = {}
+        # Rejections since the last summary: user id -> [count, description]
+        self._rejections: Dict[int, list] = {}
+        self._untracked_rejections = 0
+        self._summary_due = time.monotonic() + REJECTION_LOG_INTERVAL
+
     def is_authorised(self, user_id: int, username: str, is_bot: bool) -> bool:
         """Check if user is authorised to use the bot"""
+        now = time.monotonic()
+        key = (user_id, username, is_bot)
+        cached = self._decisions.get(key)
+        if cached is not None and cached[2] > now:
+            allowed, reason = cached[0], cached[1]
+        else:
+            allowed, reason = self._decide(user_id, username, is_bot)
+            if len(self._decisions) >= MAX_CACHED_DECISIONS:
+                self._decisions.clear()
+            self._decisions[key] = (allowed, reason, now + self.decision_ttl)
+
+        if not allowed:
+            self._record_rejection(user_id, reason, now)
+        return allowed
+
+    def _decide(self, user_id: int, username: str, is_bot: bool) -> Tuple[bool, str]:
         if is_bot:
-            logger.warning(f"Bot user attempted access: {user_id}")
-            return False
-        
+            return False, f"bot user {user_id}"
         if user_id not in self.authorised_ids:
-            logger.warning(f"Unauthorised user ID: {user_id}")
-            return False
-            
+            return False, f"unauthorised user ID {user_id} (@{username})"
         if username not in self.authorised_usernames:
-            logger.warning(f"Unauthorised username: {username}")
+            return False, f"unauthorised username @{username} (ID {user_id})"
+        return True, ''
+
+    def _record_rejection(self, user_id: int, reason: str, now: float):
+        # Close the expired interval first, so this rejection opens the next
+        # one and first_rejection() still sees it
+        if now >= self._summary_due:
+            self.log_rejections(now)
+        entry = self._rejections.get(user_id)
+        if entry is not None:
+            entry[0] += 1
+        elif len(self._rejections) < MAX_TRACKED_REJECTERS:
+            # The first message of a user in each interval is logged straight away
+            logger.warning(f"Rejected message from {reason}")
+            self._rejections[user_id] = [1, reason]
+        else:
+            self._untracked_rejections += 1
+
+    def log_rejections(self, now: Optional[float] = None):
+        """Write one line per user rejected more than once since the last summary"""
+        now = time.monotonic() if now is None else now
+        for count, reason in self._rejections.values():
+            if count > 1:
+                logger.warning(f"{count} rejected messages from {reason} in the last "
+                               f"{REJECTION_LOG_INTERVAL} seconds")
+        if self._untracked_rejections:
+            logger.warning(f"{self._untracked_rejections} rejected messages from other users in the last "
+                           f"{REJECTION_LOG_INTERVAL} seconds")
+        self._rejections.clear()
+        self._untracked_rejections = 0
+        self._summary_due = now + REJECTION_LOG_INTERVAL
+
+    def first_rejection(self, user_id: int) -> bool:
+        """True if the user's latest rejection is their first in this interval (worth answering)"""
+        entry = self._rejections.get(user_id)
+        return entry is not None and entry[0] == 1
+
+    def allow_message(self, user_id: int) -> bool:
+        """Per-user token bucket for authorised users"""
+        now = time.monotonic()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.user_rate, self.user_burst, self.user_burst, now)
+        return bucket.take(now)
+
+    def first_throttle(self, user_id: int) -> bool:
+        """True the first time in a row a user's message is refused by allow_message()"""
+        bucket = self._buckets.get(user_id)
+        if bucket is None or bucket.throttled:
             return False
-            
+        bucket.throttled = True
         return True
@@ -0,0 +1,94 @@
+# core/chunker.py
+"""Split text into Telegram-sized messages, measured the way Telegram does"""
+import re
+from typing import Iterator
+
+TELEGRAM_MAX_UNITS = 4096   # message length limit, in UTF-16 code units
+EMPTY_TEXT = "[no text returned]"
+MIN_FILL = 0.5              # don't break at a boundary in the first half of a chunk
+
+# Things that must not be cut in half: HTML entities and tags, Markdown links and code spans
+_PROTECTED_RE = re.compile(r'&#?\w{1,32};|<[^<>\n]{1,256}>|\[[^\[\]\n]{0,256}\]\([^()\s]{0,512}\)|`[^`\n]{1,512}`')
+_PROTECT_WINDOW = 1024
+
+
+def utf16_len(text: str) -> int:
+    """Length of text in UTF-16 code units (astral characters count twice)"""
+    return len(text.encode('utf-16-le', 'surrogatepass')) // 2
+
+
+def utf16_prefix(text: str, start: int, max_units: int) -> int:
+    """End index of the longest slice text[start:end] that fits in max_units"""
+    end = min(len(text), start + max_units)
+    units = utf16_len(text[start:end])
+    while units > max_units:
+        # Each code point is one or two units: drop half the excess and re-measure
+        new_end = end - max(1, (units - max_units) // 2)
+        units -= utf16_len(text[new_end:end])
+        end = new_end
+    if start < end < len(text) and '\ud800' <= text[end - 1] <= '\udbff':
+        end -= 1    # lone high surrogate (e.g. from surrogateescape): keep the pair together
+    return end
+
+
+def utf16_suffix(text: str, max_units: int) -> int:
+    """Start index of the longest slice text[start:] that fits in max_units"""
+    start = max(0, len(text) - max_units)
+    excess = utf16_len(text[start:]) - max_units
+    while excess > 0:
+        step = max(1, excess // 2)
+        excess -= utf16_len(text[start:start + step])
+        start += step
+    if 0 < start < len(text) and '\udc00' <= text[start] <= '\udfff':
+        start += 1  # lone low surrogate: keep the pair together
+    return start
+
+
+def _protected_cut(text: str, start: int, cut: int) -> int:
+    """Move cut back to the start of an entity, tag or link it falls inside"""
+    for match in _PROTECTED_RE.finditer(text, max(start, cut - _PROTECT_WINDOW), cut + _PROTECT_WINDOW):
+        if match.start() >= cut:
+            break
+        if match.end() > cut:
+            return match.start() if match.start() > start else cut
+    return cut
+
+
+def iter_telegram_chunks(text: str, max_units: int = TELEGRAM_MAX_UNITS) -> Iterator[str]:
+    """Yield Telegram-sized chunks of text, lazily and in a single pass.
+
+    Chunks break at the last paragraph break that fits, else the last line
+    break, else the last space, else wherever the limit falls; a break
+    never lands inside a surrogate pair, an HTML entity or tag, or a
+    Markdown link or code span. Each chunk is looked at once, so the cost
+    is linear in the length of text however long its lines are.
+    """
+    n = len(text)
+    pos = 0
+    yielded = False
+    while pos < n:
+        end = max(utf16_prefix(text, pos, max_units), pos + 1)
+        if end >= n:
+            cut = next_pos = n
+        else:
+            floor = pos + int((end - pos) * MIN_FILL)
+            cut = text.rfind('\n\n', floor, end)
+            if cut != -1:
+                next_pos = cut + 2
+            else:
+                cut = text.rfind('\n', floor, end)
+                if cut != -1:
+                    next_pos = cut + 1
+                else:
+                    cut = text.rfind(' ', floor, end)
+                    cut = _protected_cut(text, pos, end if cut == -1 else cut)
+                    next_pos = cut + 1 if text[cut] == ' ' else cut
+
+        chunk = text[pos:cut].lstrip('\n').rstrip()
+        if chunk:
+            yield chunk
+            yielded = True
+        pos = next_pos
+
+    if not yielded:
+        yield EMPTY_TEXT
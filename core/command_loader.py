@@ -1,15 +1,49 @@
 # core/command_loader.py
 """Dynamic command loading system"""
 import os
+import ast
+import time
+import asyncio
 import importlib.util
 import logging
-from typing import Dict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from core.dispatch import DispatchTable
+from core.metrics import PLUGIN_RELOADS, PLUGIN_RELOAD_SECONDS
+from core.result_cache import RESULT_CACHE
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True)
+class CommandTriggers:
+    """Commands a handler answers to, used to build the dispatch table"""
+    exact: Tuple[str, ...] = ()
+    prefixes: Tuple[str, ...] = ()
+    patterns: Tuple[str, ...] = ()  # matched with re.match against the whole message
+
+    def is_empty(self) -> bool:
+        return not (self.exact or self.prefixes or self.patterns)
+
+    @classmethod
+    def from_manifest(cls, manifest: dict) -> 'CommandTriggers':
+        return cls(
+            exact=tuple(manifest.get('exact', ())),
+            prefixes=tuple(manifest.get('prefixes', ())),
+            patterns=tuple(manifest.get('patterns', ())),
+        )
+
 class BaseCommandHandler(ABC):
     """Base class for all command handlers"""
+
+    # Quick control commands set this to run immediately instead of
+    # going through the job queue
+    inline = False
+
+    # Only handlers that never change anything may set this; their results
+    # can then be shared for get_cache_ttl() seconds (see run_cached)
+    read_only = False
     
     @abstractmethod
     async def can_handle(self, command: str) -> bool:
@@ -26,48 +60,308 @@ class BaseCommandHandler(ABC):
         """Return help text for this handler's commands"""
         pass
 
+    def get_triggers(self) -> CommandTriggers:
+        """Declare exact commands, prefixes and regexes this handler serves.
+
+        Handlers that return no triggers are still reachable, but only
+        through a can_handle() scan after the dispatch table misses.
+        """
+        return CommandTriggers()
+
+    def get_concurrency_key(self, command: str) -> Optional[str]:
+        """Jobs returning the same key never run at the same time (None: no limit)"""
+        return None
+
+    def get_cache_ttl(self, command: str) -> Optional[float]:
+        """Seconds a result of command may be reused by identical requests (None: always run)"""
+        return None
+
+    async def run_cached(self, command: str, producer: Callable[[], Awaitable]) -> Tuple[object, float]:
+        """Await producer(), or share the result of an identical recent or running call.
+
+        Returns (result, age in seconds). Handlers that are not read_only
+        or give command no TTL always run producer.
+        """
+        ttl = self.get_cache_ttl(command) if self.read_only else None
+        if not ttl:
+            return await producer(), 0.0
+        return await RESULT_CACHE.get_or_run(f"{type(self).__name__}:{command}", ttl, producer)
+
+    async def load(self) -> 'BaseCommandHandler':
+        """Return the handler that does the work (see LazyCommandHandler)"""
+        return self
+
+    def take_over(self, previous: 'BaseCommandHandler'):
+        """Called on a reloaded handler with the instance it replaces, to carry state over"""
+        pass
+
+    async def close(self):
+        """Release resources once the handler has been replaced or removed by a reload"""
+        pass
+
+
+def read_manifest(module_path: str) -> Optional[dict]:
+    """Read a plugin's MANIFEST literal without importing the plugin.
+
+    This lets the loader register a plugin's commands at startup while the
+    plugin itself, and whatever it imports, is only loaded when one of
+    them is first used. A manifest is a module-level dict such as:
+
+        MANIFEST = {
+            'exact': ['uptime', 'df'],      # and/or 'prefixes', 'patterns'
+            'help': "System: uptime, df",
+        }
+    """
+    with open(module_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=module_path)
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and
+                isinstance(node.targets[0], ast.Name) and node.targets[0].id == 'MANIFEST'):
+            manifest = ast.literal_eval(node.value)
+            if not isinstance(manifest, dict):
+                raise ValueError('MANIFEST must be a dict literal')
+            return manifest
+    return None
+
+
+class LazyCommandHandler(BaseCommandHandler):
+    """Stand-in for a plugin that is imported on first use.
+
+    Triggers and help come from the plugin's MANIFEST; the first load()
+    imports the module off the event loop and every call is delegated to
+    the real handler from then on.
+    """
+
+    def __init__(self, loader: 'CommandLoader', module_name: str, manifest: dict):
+        self.loader = loader
+        self.module_name = module_name
+        self.manifest = manifest
+        self.handler: Optional[BaseCommandHandler] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.handler is not None
+
+    async def load(self) -> BaseCommandHandler:
+        if self.handler is None:
+            async with self._lock:
+                if self.handler is None:
+                    handler = await self.loader.import_handler(self.module_name)
+                    if handler is None:
+                        raise RuntimeError(f"Plugin {self.module_name} has no command handler")
+                    self.handler = handler
+                    logger.info(f"Imported command handler: {self.module_name}")
+        return self.handler
+
+    async def can_handle(self, command: str) -> bool:
+        return await (await self.load()).can_handle(command)
+
+    async def execute(self, message, command: str):
+        await (await self.load()).execute(message, command)
+
+    async def get_help(self) -> str:
+        if self.handler is not None:
+            return await self.handler.get_help()
+        return self.manifest.get('help', '')
+
+    def get_triggers(self) -> CommandTriggers:
+        return CommandTriggers.from_manifest(self.manifest)
+
+    async def close(self):
+        if self.handler is not None:
+            await self.handler.close()
+
+
 class CommandLoader:
     def __init__(self, commands_dir: str = "commands"):
         self.commands_dir = commands_dir
         self.handlers = {}
+        self.dispatch_table = DispatchTable()
+        self.version = 0   # bumped whenever the handler set changes
+        self.file_stamps: Dict[str, Tuple[int, int]] = {}   # module -> (mtime_ns, size)
+        self._reload_lock = asyncio.Lock()
     
     async def load_all_commands(self) -> Dict[str, BaseCommandHandler]:
-        """Load all command handlers from the commands directory"""
+        """Index all command handlers from the commands directory.
+
+        Plugins with a MANIFEST are registered lazily and imported on first
+        use (or by warm_up()); plugins without one are imported right away.
+        """
         if not os.path.exists(self.commands_dir):
             logger.warning(f"Commands directory {self.commands_dir} not found")
             return {}
         
         handlers = {}
+        self.file_stamps = self._scan()
         
-        for filename in os.listdir(self.commands_dir):
-            if filename.endswith('.py') and not filename.startswith('_'):
-                module_name = filename[:-3]  # Remove .py extension
-                
-                try:
-                    handler = await self._load_handler(module_name)
-                    if handler:
-                        handlers[module_name] = handler
-                        logger.info(f"Loaded command handler: {module_name}")
-                except Exception as e:
-                    logger.error(f"Failed to load handler {module_name}: {e}")
+        for module_name in sorted(self.file_stamps):
+            try:
+                handler = await self._load_handler(module_name)
+                if handler:
+                    handlers[module_name] = handler
+                    logger.info(f"Loaded command handler: {module_name}")
+            except Exception as e:
+                logger.error(f"Failed to load handler {module_name}: {e}")
         
+        self.handlers.update(handlers)
+        self.dispatch_table = DispatchTable.build(self.handlers)
+        self.version += 1
         return handlers
     
+    def add_handler(self, category: str, handler: BaseCommandHandler):
+        """Register a built-in handler that does not live in the commands directory"""
+        self.handlers[category] = handler
+        self.dispatch_table = DispatchTable.build(self.handlers)
+        self.version += 1
+
+    async def warm_up(self):
+        """Import every lazily registered plugin, one at a time"""
+        for category, handler in list(self.handlers.items()):
+            if isinstance(handler, LazyCommandHandler) and not handler.loaded:
+                try:
+                    await handler.load()
+                except Exception as e:
+                    logger.error(f"Failed to load handler {category}: {e}")
+
+    async def watch(self, interval: float):
+        """Poll the commands directory and hot-reload changed plugins, forever"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload_changed()
+            except Exception as e:
+                logger.error(f"Plugin reload check failed: {e}")
+
+    async def reload_changed(self, force: Tuple[str, ...] = ()) -> Dict[str, str]:
+        """Re-import plugins whose file changed (plus any named in force).
+
+        Each plugin is imported and instantiated before anything is swapped;
+        if that fails the previous version stays registered. Successful
+        reloads replace the handler map and dispatch table in one
+        assignment each, so a message is routed either entirely by the old
+        table or entirely by the new one. Returns {module: outcome}.
+        """
+        async with self._reload_lock:
+            stamps = self._scan()
+            changed = {name for name, stamp in stamps.items() if self.file_stamps.get(name) != stamp}
+            changed.update(name for name in force if name in stamps)
+            removed = {name for name in self.file_stamps if name not in stamps}
+
+            handlers = dict(self.handlers)
+            results = {}
+            retired = []   # previous handlers to close once nothing routes to them
+
+            for module_name in sorted(changed):
+                start = time.monotonic()
+                try:
+                    handler = await self._reload_handler(module_name)
+                except Exception as e:
+                    handler = None
+                    results[module_name] = f"failed: {e}"
+                    logger.error(f"Reload of {module_name} failed, keeping previous version: {e}")
+                else:
+                    if handler is None:
+                        results[module_name] = "failed: no command handler"
+                    else:
+                        previous = handlers.get(module_name)
+                        if previous is not None:
+                            results[module_name] = self._take_over(module_name, handler, previous)
+                            retired.append((module_name, previous))
+                        else:
+                            results[module_name] = "reloaded"
+                        handlers[module_name] = handler
+                        logger.info(f"Reloaded command handler: {module_name}")
+                outcome = 'ok' if handler is not None else 'error'
+                PLUGIN_RELOADS.inc(result=outcome)
+                PLUGIN_RELOAD_SECONDS.observe(time.monotonic() - start, module=module_name)
+                # Recorded on failure too, so a broken file is not retried every poll
+                self.file_stamps[module_name] = stamps[module_name]
+
+            for module_name in sorted(removed):
+                previous = handlers.pop(module_name, None)
+                if previous is not None:
+                    retired.append((module_name, previous))
+                self.file_stamps.pop(module_name, None)
+                results[module_name] = "removed"
+                PLUGIN_RELOADS.inc(result='removed')
+                logger.info(f"Removed command handler: {module_name}")
+
+            if any(outcome in ('reloaded', 'removed') for outcome in results.values()):
+                dispatch_table = DispatchTable.build(handlers)
+                self.handlers = handlers
+                self.version += 1
+                self.dispatch_table = dispatch_table
+            # Jobs already running keep their reference and finish normally
+            for module_name, previous in retired:
+                try:
+                    await previous.close()
+                except Exception as e:
+                    logger.error(f"Closing previous {module_name} handler failed: {e}")
+            return results
+
+    @staticmethod
+    def _take_over(module_name: str, handler: BaseCommandHandler, previous: BaseCommandHandler) -> str:
+        """Let the new instance adopt the state of the one it replaces"""
+        if isinstance(previous, LazyCommandHandler):
+            previous = previous.handler
+            if previous is None:   # never used, nothing to carry over
+                return "reloaded"
+        if isinstance(handler, LazyCommandHandler):
+            handler = handler.handler
+        try:
+            handler.take_over(previous)
+        except Exception as e:
+            logger.error(f"Reloaded {module_name} could not take over the previous state: {e}")
+            return f"reloaded (previous state discarded: {e})"
+        return "reloaded"
+
+    async def _reload_handler(self, module_name: str) -> Optional[BaseCommandHandler]:
+        """Import a fresh copy of a plugin, wrapped like at startup"""
+        module_path = os.path.join(self.commands_dir, f"{module_name}.py")
+        manifest = await asyncio.to_thread(read_manifest, module_path)
+        handler = await self.import_handler(module_name)
+        if handler is None or manifest is None:
+            return handler
+        lazy = LazyCommandHandler(self, module_name, manifest)
+        lazy.handler = handler
+        return lazy
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        stamps = {}
+        for entry in os.scandir(self.commands_dir):
+            if entry.name.endswith('.py') and not entry.name.startswith('_'):
+                stat = entry.stat()
+                stamps[entry.name[:-3]] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
     async def _load_handler(self, module_name: str) -> BaseCommandHandler:
-        """Load a specific command handler"""
+        """Register a specific command handler, lazily if it has a manifest"""
         module_path = os.path.join(self.commands_dir, f"{module_name}.py")
-        
-        spec = importlib.util.spec_from_file_location(module_name, module_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        manifest = read_manifest(module_path)
+        if manifest is not None:
+            return LazyCommandHandler(self, module_name, manifest)
+        return await self.import_handler(module_name)
+
+    async def import_handler(self, module_name: str) -> Optional[BaseCommandHandler]:
+        """Import a plugin module (off the event loop) and instantiate its handler"""
+        module = await asyncio.to_thread(self._import_module, module_name)
         
         # Look for a handler class that inherits from BaseCommandHandler
         for attr_name in dir(module):
             attr = getattr(module, attr_name)
             if (isinstance(attr, type) and 
                 issubclass(attr, BaseCommandHandler) and 
-                attr != BaseCommandHandler):
+                attr not in (BaseCommandHandler, LazyCommandHandler)):
                 return attr()
         
         logger.warning(f"No valid handler found in {module_name}")
         return None
+
+    def _import_module(self, module_name: str):
+        module_path = os.path.join(self.commands_dir, f"{module_name}.py")
+        
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
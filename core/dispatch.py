@@ -0,0 +1,121 @@
+# core/dispatch.py
+"""Command dispatch table built from handler triggers"""
+import re
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_END = ''  # trie key marking the end of a registered prefix
+
+# Group references that break when a pattern is wrapped in the combined
+# regex: numbered ones are renumbered, named ones may clash with another
+# plugin's. Escaped backslashes are matched first so they are skipped.
+_GROUP_REFERENCE_RE = re.compile(r'\\\\|(\\[1-9]|\(\?P[<=])')
+
+
+def _combinable(regex: str) -> bool:
+    """Whether regex can share one compiled alternation with others"""
+    return not any(match.group(1) for match in _GROUP_REFERENCE_RE.finditer(regex))
+
+
+class DispatchTable:
+    """Resolve a command to its handler without asking every handler.
+
+    Lookup order is deterministic: exact match, then the longest
+    registered prefix, then the regex triggers (first pattern wins),
+    and finally handlers that only implement can_handle(), in load order.
+
+    Consecutive regex triggers are compiled into one alternation. A
+    pattern with group references or named groups cannot be wrapped
+    like that, so it is matched on its own, in its place in the order.
+    """
+
+    def __init__(self):
+        self.exact: Dict[str, str] = {}
+        self.prefix_trie: dict = {}
+        # (compiled alternation or single pattern, {group name or None: category})
+        self.patterns: List[Tuple[re.Pattern, Dict[Optional[str], str]]] = []
+        self.fallback: List[str] = []
+        self.handlers: Dict[str, object] = {}
+
+    @classmethod
+    def build(cls, handlers: Dict[str, object]) -> 'DispatchTable':
+        """Compile a table from {category: handler}"""
+        table = cls()
+        combined, owners = [], {}
+
+        for category, handler in handlers.items():
+            table.handlers[category] = handler
+            triggers = handler.get_triggers()
+            if triggers.is_empty():
+                table.fallback.append(category)
+                continue
+
+            for command in triggers.exact:
+                table._claim(table.exact, command, category)
+
+            for prefix in triggers.prefixes:
+                node = table.prefix_trie
+                for char in prefix:
+                    node = node.setdefault(char, {})
+                table._claim(node, _END, category, label=prefix)
+
+            for regex in triggers.patterns:
+                compiled = re.compile(regex)  # fail on the handler's own pattern, not the combined one
+                if _combinable(regex):
+                    group = f"h{len(owners)}"
+                    combined.append(f"(?P<{group}>{regex})")
+                    owners[group] = category
+                    continue
+                table._add_combined(combined, owners)
+                combined, owners = [], {}
+                table.patterns.append((compiled, {None: category}))
+
+        table._add_combined(combined, owners)
+        return table
+
+    def _add_combined(self, combined: List[str], owners: Dict[str, str]):
+        if combined:
+            self.patterns.append((re.compile("|".join(combined)), owners))
+
+    @staticmethod
+    def _claim(mapping: dict, key: str, category: str, label: str = None):
+        if key in mapping and mapping[key] != category:
+            logger.warning(f"Trigger {label or key!r} of {category} already claimed by {mapping[key]}")
+            return
+        mapping[key] = category
+
+    def _longest_prefix(self, command: str) -> Optional[str]:
+        node = self.prefix_trie
+        match = node.get(_END)
+        for char in command:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get(_END, match)
+        return match
+
+    async def resolve(self, command: str) -> Tuple[Optional[str], Optional[object]]:
+        """Return (category, handler) for a command, or (None, None)"""
+        category = self.exact.get(command)
+
+        if category is None:
+            category = self._longest_prefix(command)
+
+        if category is None:
+            for pattern, owners in self.patterns:
+                match = pattern.match(command)
+                if match:
+                    category = owners[match.lastgroup if None not in owners else None]
+                    break
+
+        if category is None:
+            for name in self.fallback:
+                if await self.handlers[name].can_handle(command):
+                    category = name
+                    break
+
+        if category is None:
+            return None, None
+        return category, self.handlers[category]
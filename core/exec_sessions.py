@@ -0,0 +1,125 @@
+# core/exec_sessions.py
+"""Pending exec commands waiting for their one-time password"""
+import os
+import json
+import time
+import hmac
+import string
+import asyncio
+import hashlib
+import logging
+import secrets
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL = 300            # seconds a password stays valid
+MAX_ATTEMPTS = 3
+PASSWORD_LENGTH = 12
+PASSWORD_ALPHABET = string.ascii_letters + string.digits + string.punctuation
+
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class ExecSession:
+    chat_id: int
+    user_id: int
+    command: str
+    password_hash: str   # only the hash is kept, in memory and in the journal
+    expires_at: float    # wall clock, so it survives a restart through the journal
+    attempts: int = 0
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+
+class ExecSessionStore:
+    """One pending exec per (chat, user), held in memory.
+
+    If journal_path is set the sessions are also written there after every
+    change (to a temporary file that then replaces the journal, so a crash
+    leaves either the old or the new version) and read back at start-up.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_attempts: int = MAX_ATTEMPTS,
+                 journal_path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.journal_path = journal_path
+        self.sessions: Dict[Tuple[int, int], ExecSession] = {}
+        if journal_path:
+            self._load()
+
+    def create(self, chat_id: int, user_id: int, command: str) -> str:
+        """Start (or replace) the pending exec of a user; returns the new password"""
+        password = ''.join(secrets.choice(PASSWORD_ALPHABET) for _ in range(PASSWORD_LENGTH))
+        self.sessions[(chat_id, user_id)] = ExecSession(
+            chat_id, user_id, command, hash_password(password), time.time() + self.ttl)
+        return password
+
+    def get(self, chat_id: int, user_id: int) -> Optional[ExecSession]:
+        session = self.sessions.get((chat_id, user_id))
+        if session is not None and session.expired:
+            del self.sessions[(chat_id, user_id)]
+            return None
+        return session
+
+    def verify(self, chat_id: int, user_id: int, password: str) -> Tuple[str, Optional[ExecSession]]:
+        """Check a password: returns ('ok' | 'wrong' | 'locked' | 'missing', session).
+
+        'ok' and 'locked' end the session; 'wrong' counts an attempt.
+        """
+        session = self.get(chat_id, user_id)
+        if session is None:
+            return 'missing', None
+        if hmac.compare_digest(hash_password(password), session.password_hash):
+            del self.sessions[(chat_id, user_id)]
+            return 'ok', session
+        session.attempts += 1
+        if session.attempts >= self.max_attempts:
+            del self.sessions[(chat_id, user_id)]
+            return 'locked', session
+        return 'wrong', session
+
+    def cancel(self, chat_id: int, user_id: int, password_hash: Optional[str] = None):
+        """Drop the pending exec (only if it is still the one with password_hash, when given)"""
+        session = self.sessions.get((chat_id, user_id))
+        if session is not None and password_hash in (None, session.password_hash):
+            del self.sessions[(chat_id, user_id)]
+
+    async def save(self):
+        """Write the journal (if enabled) off the event loop"""
+        if self.journal_path:
+            live = [asdict(session) for session in self.sessions.values() if not session.expired]
+            await asyncio.to_thread(self._write_journal, live)
+
+    def _write_journal(self, sessions: list):
+        tmp_path = f"{self.journal_path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(sessions, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _load(self):
+        try:
+            with open(self.journal_path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable exec journal {self.journal_path}: {e}")
+            return
+        for entry in entries:
+            try:
+                session = ExecSession(**entry)
+            except TypeError:
+                continue
+            if not session.expired:
+                self.sessions[(session.chat_id, session.user_id)] = session
@@ -0,0 +1,220 @@
+# core/health_monitor.py
+"""Periodic reachability and service checks with alerts on state changes"""
+import os
+import time
+import socket
+import struct
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+from core.shell_utils import ShellExecutor
+from core.metrics import HEALTH_UP, HEALTH_TRANSITIONS, HEALTH_PROBE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 60       # seconds between rounds of checks
+DEFAULT_TIMEOUT = 3.0       # seconds each probe may take
+DEFAULT_CONFIRMATIONS = 2   # identical results in a row before a state change counts
+HISTORY_LENGTH = 60         # results kept per check
+
+ICMP_ECHO_REQUEST, ICMP_ECHO_REPLY = 8, 0
+
+ProbeResult = Tuple[bool, str]   # (up, short detail)
+
+
+class TcpProbe:
+    """Up when a TCP connection to host:port can be opened"""
+
+    def __init__(self, host: str, port: int, timeout: float = DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+
+    def describe(self) -> str:
+        return f"tcp {self.host}:{self.port}"
+
+    async def check(self) -> ProbeResult:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except asyncio.TimeoutError:
+            return False, 'timed out'
+        except OSError as e:
+            # asyncio's message is "Connect call failed (host, port)"; the errno says why
+            return False, os.strerror(e.errno) if e.errno else str(e)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True, 'open'
+
+
+class PingProbe:
+    """Up when host answers an ICMP echo request.
+
+    Uses an unprivileged ICMP socket (allowed by net.ipv4.ping_group_range,
+    the default on Raspberry Pi OS), so no process is started; where that
+    is not permitted it runs ping(8) instead.
+    """
+
+    def __init__(self, host: str, timeout: float = DEFAULT_TIMEOUT):
+        self.host = host
+        self.timeout = timeout
+        self.sequence = 0
+
+    def describe(self) -> str:
+        return f"ping {self.host}"
+
+    async def check(self) -> ProbeResult:
+        try:
+            return await self._echo()
+        except PermissionError:
+            return await self._ping_command()
+
+    async def _echo(self) -> ProbeResult:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(self.host, None, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        except socket.gaierror as e:
+            return False, f"cannot resolve: {e.strerror}"
+        address = infos[0][4][0]
+        self.sequence = (self.sequence + 1) & 0xffff
+        # The kernel fills in the identifier and checksum of a ping socket
+        packet = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, 0, self.sequence) + os.urandom(8)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP) as sock:
+            sock.setblocking(False)
+            start = time.monotonic()
+            try:
+                sock.sendto(packet, (address, 0))
+                deadline = start + self.timeout
+                while True:
+                    data = await asyncio.wait_for(loop.sock_recv(sock, 1024), max(deadline - time.monotonic(), 0))
+                    if len(data) >= 8:
+                        kind, _, _, _, sequence = struct.unpack('!BBHHH', data[:8])
+                        if kind == ICMP_ECHO_REPLY and sequence == self.sequence:
+                            return True, f"{(time.monotonic() - start) * 1000:.0f} ms"
+            except asyncio.TimeoutError:
+                return False, 'no reply'
+            except OSError as e:
+                if isinstance(e, PermissionError):
+                    raise
+                return False, e.strerror or str(e)
+
+    async def _ping_command(self) -> ProbeResult:
+        result = await ShellExecutor.run_command(
+            ['ping', '-c', '1', '-W', str(max(int(self.timeout), 1)), self.host], timeout=self.timeout + 2)
+        if result.returncode is None and not result.timed_out:
+            return False, result.output.strip()
+        return result.returncode == 0, 'reply' if result.returncode == 0 else 'no reply'
+
+
+class ServiceProbe:
+    """Up when `systemctl is-active unit` says active"""
+
+    SYSTEMCTL = 'systemctl'
+
+    def __init__(self, unit: str, timeout: float = DEFAULT_TIMEOUT):
+        self.unit = unit
+        self.timeout = timeout
+
+    def describe(self) -> str:
+        return f"service {self.unit}"
+
+    async def check(self) -> ProbeResult:
+        result = await ShellExecutor.run_command([self.SYSTEMCTL, 'is-active', self.unit], timeout=self.timeout)
+        state = result.output.strip() or ('timed out' if result.timed_out else 'unknown')
+        return result.returncode == 0, state
+
+
+PROBE_TYPES = {
+    'tcp': lambda spec, timeout: TcpProbe(spec['host'], spec['port'], timeout),
+    'ping': lambda spec, timeout: PingProbe(spec['host'], timeout),
+    'service': lambda spec, timeout: ServiceProbe(spec['unit'], timeout),
+}
+
+
+@dataclass
+class Check:
+    """One configured probe and what is known about it"""
+    name: str
+    probe: object
+    history: Deque[Tuple[float, bool]] = field(default_factory=lambda: deque(maxlen=HISTORY_LENGTH))
+    up: Optional[bool] = None      # confirmed state, None until known
+    since: Optional[float] = None  # wall clock time the confirmed state began
+    detail: str = ''
+    checked_at: Optional[float] = None
+
+
+def build_checks(specs: List[dict]) -> List[Check]:
+    """Turn the health_checks config list into checks (ValueError on a bad entry)"""
+    checks = []
+    for spec in specs:
+        factory = PROBE_TYPES.get(spec.get('type'))
+        if factory is None:
+            raise ValueError(f"Health check {spec!r}: type must be one of {', '.join(PROBE_TYPES)}")
+        try:
+            checks.append(Check(spec['name'], factory(spec, spec.get('timeout', DEFAULT_TIMEOUT))))
+        except KeyError as e:
+            raise ValueError(f"Health check {spec!r} needs {e}") from None
+    return checks
+
+
+class HealthMonitor:
+    """Runs every check concurrently each interval seconds.
+
+    A check's state only changes after `confirmations` identical results
+    in a row, so a single lost ping does not raise an alarm. The state
+    changes of one round are passed together to on_change; the first
+    result of a check is only reported if it is down.
+    """
+
+    def __init__(self, checks: List[Check], interval: float = DEFAULT_INTERVAL,
+                 confirmations: int = DEFAULT_CONFIRMATIONS):
+        self.checks = checks
+        self.interval = interval
+        self.confirmations = max(confirmations, 1)
+        self.rounds = 0
+
+    async def run(self, on_change: Callable[[List[Check]], Awaitable[None]]):
+        """Check forever, awaiting on_change with the checks that changed state"""
+        while True:
+            changed = await self.check_all()
+            if changed:
+                try:
+                    await on_change(changed)
+                except Exception as e:
+                    logger.error(f"Health alert failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def check_all(self) -> List[Check]:
+        results = await asyncio.gather(*(self._probe(check) for check in self.checks))
+        self.rounds += 1
+        return [check for check, changed in zip(self.checks, results) if changed]
+
+    async def _probe(self, check: Check) -> bool:
+        start = time.monotonic()
+        try:
+            up, detail = await check.probe.check()
+        except Exception as e:
+            up, detail = False, f"probe failed: {e}"
+        HEALTH_PROBE_SECONDS.observe(time.monotonic() - start, check=check.name)
+        now = time.time()
+        check.history.append((now, up))
+        check.detail = detail
+        check.checked_at = now
+        HEALTH_UP.set(1 if up else 0, check=check.name)
+
+        recent = [state for _, state in list(check.history)[-self.confirmations:]]
+        confirmed = len(recent) == self.confirmations and all(state == up for state in recent)
+        if check.up == up or not (confirmed or check.up is None and up):
+            return False
+        first = check.up is None
+        check.up, check.since = up, now
+        if first and up:
+            return False
+        HEALTH_TRANSITIONS.inc(check=check.name, state='up' if up else 'down')
+        logger.warning(f"Health check {check.name} is now {'up' if up else 'down'} ({detail})")
+        return True
@@ -0,0 +1,62 @@
+# core/help_index.py
+"""Pre-rendered help text and "did you mean" suggestions"""
+from collections import Counter
+from typing import Dict, List
+
+from core.message_utils import chunk_text_for_telegram
+
+MIN_SIMILARITY = 0.3    # trigram Jaccard similarity below which nothing is suggested
+MAX_SUGGESTIONS = 3
+MAX_QUERY_LEN = 40      # only the start of a long message is compared
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class HelpIndex:
+    """Everything the unknown-command path needs, computed once per handler set"""
+
+    def __init__(self, help_text: str, commands: List[str]):
+        self.help_text = help_text
+        self.chunks = chunk_text_for_telegram(help_text)
+        self.commands = commands
+        self.command_trigrams = [trigrams(command) for command in commands]
+        self.postings: Dict[str, List[int]] = {}
+        for i, grams in enumerate(self.command_trigrams):
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(i)
+
+    @classmethod
+    async def build(cls, handlers: dict) -> 'HelpIndex':
+        help_text = "Commands available:\n"
+        commands = []
+        for handler in handlers.values():
+            text = await handler.get_help()
+            if text:
+                help_text += f"\n{text}"
+            triggers = handler.get_triggers()
+            for command in triggers.exact + tuple(prefix.strip() for prefix in triggers.prefixes):
+                if command and command not in commands:
+                    commands.append(command)
+        return cls(help_text, commands)
+
+    def suggest(self, text: str, limit: int = MAX_SUGGESTIONS) -> List[str]:
+        """Registered commands that look like text, best first"""
+        text = text.strip()[:MAX_QUERY_LEN]
+        best: Dict[int, float] = {}
+        # Whole message for typos in two-word commands, first word for "restrat router"
+        for query in {text, text.split(' ', 1)[0]}:
+            grams = trigrams(query)
+            hits = Counter()
+            for gram in grams:
+                for i in self.postings.get(gram, ()):
+                    hits[i] += 1
+            for i, shared in hits.items():
+                similarity = shared / (len(grams) + len(self.command_trigrams[i]) - shared)
+                if similarity > best.get(i, 0):
+                    best[i] = similarity
+        scored = sorted((-similarity, self.commands[i]) for i, similarity in best.items()
+                        if similarity >= MIN_SIMILARITY)
+        return [command for _, command in scored[:limit]]
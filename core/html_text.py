@@ -0,0 +1,150 @@
+# core/html_text.py
+"""
+HTML to plain text backends.
+
+    bs4     BeautifulSoup tree (lxml or html.parser underneath). Reference output.
+    lxml    lxml.html tree, cruft stripped in C. Needs lxml.
+    stream  html.parser tokenizer that drops cruft subtrees without building
+            a DOM. Standard library only, lowest memory.
+"""
+import re
+import html as html_unescape
+from html.parser import HTMLParser
+
+from core.text_sanitise import normalise_lines
+
+# Optional dependencies
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+try:
+    import lxml.html as lxml_html
+    from lxml import etree as lxml_etree
+except Exception:
+    lxml_html = None
+    lxml_etree = None
+
+# Elements whose whole subtree is not content
+SKIP_TAGS = ('script', 'style', 'noscript', 'iframe', 'header', 'footer', 'nav', 'form', 'aside')
+
+# Elements that start a new line in the text output (stream backend)
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main', 'ol', 'p', 'pre', 'section',
+    'table', 'td', 'th', 'title', 'tr', 'ul',
+))
+
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                       'source', 'track', 'wbr'))
+
+DEFAULT_PARSER = 'bs4'
+
+# lxml refuses str input that starts with an encoding declaration (XHTML pages)
+_XML_DECLARATION_RE = re.compile(r'^\ufeff?\s*<\?xml[^>]*\?>')
+
+
+def normalise_newlines(text: str) -> str:
+    """Unify line endings, trim lines, collapse blank runs (see text_sanitise.normalise_lines)."""
+    return normalise_lines(text)
+
+
+def regex_strip_tags(html_text: str) -> str:
+    """Very rough fallback if bs4 not installed."""
+    no_script = re.sub(r'(?is)<(script|style|noscript|iframe).*?>.*?</\1>', ' ', html_text)
+    # remove the rest of the tags
+    txt = re.sub(r'(?s)<.*?>', ' ', no_script)
+    txt = html_unescape.unescape(txt)
+    return normalise_newlines(txt)
+
+
+def clean_with_bs4(html_text: str) -> str:
+    """Strip script/style/nav cruft and return readable text."""
+    if not BeautifulSoup:
+        # bs4 missing: fall back to tag-strip regex
+        return regex_strip_tags(html_text)
+
+    parser = 'lxml' if lxml_html is not None else 'html.parser'
+    soup = BeautifulSoup(html_text, parser)
+
+    # remove common non-content elements
+    for tag in soup(list(SKIP_TAGS)):
+        tag.decompose()
+
+    text = soup.get_text(separator='\n')
+    text = html_unescape.unescape(text)
+    return normalise_newlines(text)
+
+
+def clean_with_lxml(html_text: str) -> str:
+    """Same clean-up as bs4 but on a bare lxml tree."""
+    if lxml_html is None:
+        return clean_with_bs4(html_text)
+    if not html_text.strip():
+        return ''
+
+    # A parser per call: lxml parsers must not be shared between threads
+    parser = lxml_html.HTMLParser()
+    root = lxml_html.fromstring(_XML_DECLARATION_RE.sub('', html_text, count=1), parser=parser)
+    if any(error.type == lxml_etree.ErrorTypes.ERR_RESOURCE_LIMIT for error in parser.error_log):
+        # libxml2 drops everything nested deeper than 256 elements (e.g. a
+        # long page of unclosed <div>s); the tokenizer has no such limit
+        return clean_with_stream(html_text)
+    lxml_etree.strip_elements(root, lxml_etree.Comment, *SKIP_TAGS, with_tail=False)
+    return normalise_newlines('\n'.join(root.itertext()))
+
+
+class _StreamExtractor(HTMLParser):
+    """Collect text while skipping cruft subtrees, without building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            if tag not in VOID_TAGS:
+                self.skip_depth += 1
+        elif tag in BLOCK_TAGS and not self.skip_depth:
+            self.parts.append('\n')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS and not self.skip_depth:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self.skip_depth:
+                self.skip_depth -= 1
+        elif tag in BLOCK_TAGS and not self.skip_depth:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+
+def clean_with_stream(html_text: str) -> str:
+    """Single pass over the markup with the standard library tokenizer."""
+    extractor = _StreamExtractor()
+    extractor.feed(html_text)
+    extractor.close()
+    return normalise_newlines(''.join(extractor.parts))
+
+
+PARSERS = {
+    'bs4': clean_with_bs4,
+    'lxml': clean_with_lxml,
+    'stream': clean_with_stream,
+}
+
+
+def html_to_text(html_text: str, parser: str = DEFAULT_PARSER) -> str:
+    """Convert HTML to cleaned text with the named backend."""
+    try:
+        backend = PARSERS[parser]
+    except KeyError:
+        raise ValueError(f"Unknown parser {parser!r}, choose from: {', '.join(PARSERS)}")
+    return backend(html_text)
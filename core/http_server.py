@@ -0,0 +1,96 @@
+# core/http_server.py
+"""Minimal asyncio HTTP/1.1 server for local endpoints (metrics, health)"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1_000_000
+READ_TIMEOUT = 10
+
+REASONS = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 403: 'Forbidden', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error',
+           503: 'Service Unavailable'}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    headers: Dict[str, str] = field(default_factory=dict)   # lower-case names
+    body: bytes = b''
+
+
+Response = Tuple[int, str, bytes]                  # (status, content type, body)
+Route = Callable[[Request], Awaitable[Response]]
+
+
+class HttpServer:
+    """Serve a few exact-path routes; one request per connection."""
+
+    def __init__(self, host: str, port: int, routes: Dict[str, Route]):
+        self.host = host
+        self.port = port
+        self.routes = routes
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"HTTP server listening on {self.host}:{self.port} ({', '.join(self.routes)})")
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                request = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                request = None
+
+            if request is None:
+                status, ctype, body = 400, 'text/plain', b'bad request\n'
+            else:
+                route = self.routes.get(request.path.split('?', 1)[0])
+                if route is None:
+                    status, ctype, body = 404, 'text/plain', b'not found\n'
+                else:
+                    try:
+                        status, ctype, body = await route(request)
+                    except Exception as e:
+                        logger.error(f"Error serving {request.path}: {e}")
+                        status, ctype, body = 500, 'text/plain', b'internal error\n'
+
+            head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+                    f"Content-Type: {ctype}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: close\r\n\r\n")
+            writer.write(head.encode('latin-1') + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Request:
+        head = await reader.readuntil(b'\r\n\r\n')
+        if len(head) > MAX_HEADER_BYTES:
+            raise ValueError('headers too large')
+        lines = head.decode('latin-1').split('\r\n')
+        method, path, _ = lines[0].split(' ', 2)
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', '0') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError('body too large')
+        body = await reader.readexactly(length) if length else b''
+        return Request(method.upper(), path, headers, body)
@@ -0,0 +1,137 @@
+# core/mailer.py
+"""Background email delivery over a reused SMTP connection"""
+import asyncio
+import logging
+import smtplib
+from dataclasses import dataclass
+from email.mime.text import MIMEText
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+IDLE_TIMEOUT = 60        # seconds an unused connection is kept open
+SMTP_TIMEOUT = 30        # socket timeout for each SMTP operation
+MAX_ATTEMPTS = 4
+RETRY_BACKOFF = 2.0      # seconds before the first retry, doubled each time
+
+DeliveryCallback = Callable[[bool, str], Awaitable[None]]
+
+
+@dataclass
+class OutgoingMail:
+    to: str
+    subject: str
+    body: str
+    on_result: Optional[DeliveryCallback] = None
+
+
+class Mailer:
+    """Sends queued mail from a single background task.
+
+    submit() returns at once. The SMTP conversation runs in a worker
+    thread so a slow server never blocks the event loop; the connection
+    (STARTTLS and login done once) is reused until it has been idle for
+    idle_timeout seconds or fails. Failed sends are retried with
+    exponential backoff, and on_result is awaited with the final outcome.
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str, sender: Optional[str] = None,
+                 idle_timeout: float = IDLE_TIMEOUT, max_attempts: int = MAX_ATTEMPTS,
+                 backoff: float = RETRY_BACKOFF, use_tls: bool = True):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.use_tls = use_tls
+        self._connection: Optional[smtplib.SMTP] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task = None
+        self._closing = False
+
+    def submit(self, to: str, subject: str, body: str, on_result: Optional[DeliveryCallback] = None):
+        """Queue a mail for delivery"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._worker())
+        self._queue.put_nowait(OutgoingMail(to, subject, body, on_result))
+
+    def close(self):
+        """Stop the worker once the mail already queued has been sent"""
+        self._closing = True
+        if self._task is not None and not self._task.done():
+            self._queue.put_nowait(None)   # wakes an idle worker
+
+    async def _worker(self):
+        try:
+            while not (self._closing and self._queue.empty()):
+                try:
+                    mail = await asyncio.wait_for(self._queue.get(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    await asyncio.to_thread(self._disconnect)
+                    continue
+                if mail is None:
+                    continue
+                ok, detail = await self._deliver(mail)
+                if mail.on_result is not None:
+                    try:
+                        await mail.on_result(ok, detail)
+                    except Exception as e:
+                        logger.error(f"Mail delivery callback failed: {e}")
+        finally:
+            await asyncio.to_thread(self._disconnect)
+
+    async def _deliver(self, mail: OutgoingMail):
+        delay = self.backoff
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await asyncio.to_thread(self._send, mail)
+                logger.info(f"Mail '{mail.subject}' delivered to {mail.to}")
+                return True, 'delivered'
+            except (smtplib.SMTPException, OSError) as e:
+                await asyncio.to_thread(self._disconnect)
+                if isinstance(e, smtplib.SMTPAuthenticationError) or attempt == self.max_attempts:
+                    logger.error(f"Mail '{mail.subject}' to {mail.to} failed after {attempt} attempt(s): {e}")
+                    return False, str(e)
+                logger.warning(f"Mail '{mail.subject}' to {mail.to} failed (attempt {attempt}), retrying: {e}")
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    def _send(self, mail: OutgoingMail):
+        msg = MIMEText(mail.body)
+        msg['Subject'] = mail.subject
+        msg['From'] = self.sender
+        msg['To'] = mail.to
+        self._connect().sendmail(self.sender, mail.to, msg.as_string())
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._connection is not None:
+            try:
+                if self._connection.noop()[0] == 250:
+                    return self._connection
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+        connection = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        try:
+            if self.use_tls:
+                connection.starttls()
+            if self.username:
+                connection.login(self.username, self.password)
+        except Exception:
+            connection.close()
+            raise
+        self._connection = connection
+        return connection
+
+    def _disconnect(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.quit()
+        except (smtplib.SMTPException, OSError):
+            self._connection.close()
+        self._connection = None
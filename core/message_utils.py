@@ -1,52 +1,225 @@
 # core/message_utils.py
 """Message handling utilities"""
 import re
-from typing import List
+import gzip
+import time
+import asyncio
+import logging
+from typing import Iterable, List, Optional, Tuple
 
-TELEGRAM_CHUNK_SIZE = 3500
+from core.outbox import OUTBOX, INTERACTIVE, BULK
+from core.chunker import TELEGRAM_MAX_UNITS, iter_telegram_chunks, utf16_len, utf16_prefix, utf16_suffix
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_CHUNK_SIZE = TELEGRAM_MAX_UNITS
+LIVE_EDIT_INTERVAL = 3.0  # seconds between edits of a streaming message
+DOCUMENT_THRESHOLD = 3 * TELEGRAM_CHUNK_SIZE  # longer output is sent as one file instead
+LIVE_MAX_MESSAGES = 3     # streamed output switches to a file after this many messages
+GZIP_THRESHOLD = 1024 * 1024  # bytes; larger files are gzipped
+CAPTION_MAX_UNITS = 1024  # Telegram's caption limit, in UTF-16 code units
+PREVIEW_UNITS = 400       # of head and of tail shown in a document caption
 
 def chunk_text_for_telegram(text: str, max_len: int = TELEGRAM_CHUNK_SIZE) -> List[str]:
-    """Split text into Telegram-friendly chunks"""
-    if not text:
-        return ["[no text returned]"]
-    
-    chunks = []
-    buffer = []
-    current_len = 0
-    
-    for line in text.splitlines(keepends=True):
-        line_len = len(line)
-        if current_len + line_len <= max_len:
-            buffer.append(line)
-            current_len += line_len
-            continue
-
-        # Flush current buffer
-        if buffer:
-            chunks.append(''.join(buffer).rstrip())
-            buffer = []
-            current_len = 0
-
-        # Hard-split long lines
-        while line_len > max_len:
-            chunks.append(line[:max_len])
-            line = line[max_len:]
-            line_len = len(line)
-
-        if line:
-            buffer.append(line)
-            current_len = len(line)
-
-    if buffer:
-        chunks.append(''.join(buffer).rstrip())
-
-    return chunks or [text[:max_len]]
+    """Split text into Telegram-friendly chunks (max_len in UTF-16 units)"""
+    return list(iter_telegram_chunks(text, max_len))
+
+async def reply(message, text: str, priority: int = INTERACTIVE):
+    """Reply through the outbound queue"""
+    return await OUTBOX.reply(message, text, priority)
 
 async def send_chunked_text(message, text: str, chunk_size: int = TELEGRAM_CHUNK_SIZE):
-    """Send long text in multiple chunks"""
-    for chunk in chunk_text_for_telegram(text, chunk_size):
-        await message.reply_text(chunk)
+    """Send long text in multiple chunks.
+
+    Chunks are queued as they are cut, so the first one can be on its way
+    before the rest of the text has been looked at; they are paced by the
+    outbound queue. Output that needs more than one message is sent as
+    bulk, so short replies elsewhere are not stuck behind it.
+    """
+    await send_chunks(message, iter_telegram_chunks(text, chunk_size))
+
+async def send_chunks(message, chunks: Iterable[str]):
+    """Send already chunked text (see send_chunked_text)"""
+    chunks = iter(chunks)
+    chunk = next(chunks, None)
+    if chunk is None:
+        return
+    following = next(chunks, None)
+    priority = INTERACTIVE if following is None else BULK
+    futures = [OUTBOX.submit('reply', message, chunk, priority)]
+    try:
+        while following is not None:
+            await asyncio.sleep(0)
+            futures.append(OUTBOX.submit('reply', message, following, priority))
+            following = next(chunks, None)
+    except asyncio.CancelledError:
+        for future in futures:
+            future.cancel()
+        raise
+    await asyncio.gather(*futures)
+
+def build_document(text: str, filename: str) -> Tuple[str, bytes]:
+    """Encode text as an in-memory file, gzipped when large"""
+    data = text.encode('utf-8')
+    if len(data) > GZIP_THRESHOLD:
+        return f"{filename}.gz", gzip.compress(data, compresslevel=6)
+    return filename, data
+
+def preview_text(text: str, units: int = PREVIEW_UNITS) -> str:
+    """First and last lines of text, at most units UTF-16 units of each"""
+    if utf16_len(text) <= 2 * units:
+        return text
+    head = text[:utf16_prefix(text, 0, units)]
+    cut = head.rfind('\n')
+    if cut > len(head) // 2:
+        head = head[:cut]
+    tail = text[utf16_suffix(text, units):]
+    cut = tail.find('\n')
+    if 0 <= cut < len(tail) // 2:
+        tail = tail[cut + 1:]
+    omitted = len(text) - len(head) - len(tail)
+    return f"{head.rstrip()}\n[... {omitted} characters ...]\n{tail.strip()}"
+
+async def send_document(message, text: str, filename: str, note: str = '', priority: int = INTERACTIVE):
+    """Send text as one document, with a head/tail preview as caption"""
+    name, data = build_document(text, filename)
+    caption = f"{note}\n\n{preview_text(text)}" if note else preview_text(text)
+    caption = caption[:utf16_prefix(caption, 0, CAPTION_MAX_UNITS)]
+    return await OUTBOX.submit('document', message, caption, priority, coalesce=False,
+                               attachment=(name, data))
+
+async def send_output(message, text: str, filename: str = 'output.txt', threshold: int = DOCUMENT_THRESHOLD):
+    """Send command output inline, or as a document when it would take more than a few messages"""
+    if utf16_len(text) <= threshold:   # threshold is in UTF-16 units, like Telegram's limit
+        await send_chunked_text(message, text)
+        return
+    lines = text.count('\n') + (not text.endswith('\n'))
+    await send_document(message, text, filename, note=f"{lines} lines, {len(text)} characters - full output attached")
+
+class LiveMessage:
+    """A Telegram message that grows in place as output streams in.
+
+    The first write is sent straight away; later writes edit the same
+    message at most once per edit_interval seconds. When the text would
+    exceed max_len the message is finalised and a new one is started, so
+    only the current message is ever held in memory.
+
+    With max_messages set, the whole output is also kept, and once that
+    many messages are full nothing more is posted: close() sends the
+    complete output as one document instead.
+    """
+
+    def __init__(self, message, header: str = '', edit_interval: float = LIVE_EDIT_INTERVAL,
+                 max_len: int = TELEGRAM_CHUNK_SIZE, max_messages: Optional[int] = None,
+                 filename: str = 'output.txt'):
+        self.message = message
+        self.header = header
+        self.edit_interval = edit_interval
+        self.max_len = max_len
+        self.sent = None          # Telegram message currently being edited
+        self.buffer = header
+        self.shown = ''           # text last pushed to Telegram
+        self.last_edit = 0.0
+        self.messages_sent = 0
+        self.max_messages = max_messages
+        self.filename = filename
+        self.transcript = [header] if max_messages is not None else None
+        self.overflowed = False
+        self._flush_task = None
+        self._lock = asyncio.Lock()
+
+    async def write(self, text: str):
+        """Append streamed text"""
+        async with self._lock:
+            if self.transcript is not None:
+                self.transcript.append(text)
+            if self.overflowed:
+                return
+            while text:
+                room = self.max_len - utf16_len(self.buffer)
+                fit = utf16_prefix(text, 0, room)
+                if fit == len(text):
+                    self.buffer += text
+                    break
+                # Prefer breaking at the last newline that still fits; if there
+                # is none, start a fresh message rather than splitting a line
+                cut = text.rfind('\n', 0, fit) + 1
+                if cut == 0 and not self.buffer.strip():
+                    cut = max(fit, 1)
+                self.buffer += text[:cut]
+                text = text[cut:]
+                await self._push()
+                if self.max_messages is not None and self.messages_sent >= self.max_messages:
+                    self.overflowed = True
+                    return
+                self._roll_over()
+
+            if self.sent is None or time.monotonic() - self.last_edit >= self.edit_interval:
+                await self._push()
+            else:
+                self._schedule_flush()
+
+    async def close(self):
+        """Push whatever is still pending"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        async with self._lock:
+            if self.overflowed:
+                await send_document(self.message, ''.join(self.transcript), self.filename,
+                                    note='Output too long for chat - full output attached')
+                return
+            if self.sent is None and not self.buffer.strip():
+                self.buffer = self.header + "[no text returned]"
+            await self._push()
+
+    def _roll_over(self):
+        self.sent = None
+        self.buffer = ''
+        self.shown = ''
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            delay = self.edit_interval - (time.monotonic() - self.last_edit)
+            self._flush_task = asyncio.create_task(self._delayed_flush(max(delay, 0)))
+
+    async def _delayed_flush(self, delay: float):
+        await asyncio.sleep(delay)
+        async with self._lock:
+            await self._push()
+
+    async def _push(self):
+        text = self.buffer.rstrip()
+        if not text or text == self.shown:
+            return
+        try:
+            if self.sent is None:
+                # Not coalesced: this message is edited in place later
+                self.sent = await OUTBOX.reply(self.message, text, BULK, coalesce=False)
+                self.messages_sent += 1
+            else:
+                await OUTBOX.edit(self.sent, text)
+            self.shown = text
+        except Exception as e:
+            logger.warning(f"Failed to update streaming message: {e}")
+        self.last_edit = time.monotonic()
+
+
+_URL_RE = re.compile(r'https?://[^\s<>"\'`]+', re.IGNORECASE)
+_URL_TRAILING = '.,;:!?\'")]}>'
 
 def is_url_like(text: str) -> bool:
     """Check if text looks like a URL"""
     return bool(re.match(r'^\s*https?://', text, re.IGNORECASE))
+
+def extract_urls(text: str) -> List[str]:
+    """Return every distinct http(s) URL in text, in order of appearance"""
+    urls = []
+    for match in _URL_RE.finditer(text):
+        url = match.group(0).rstrip(_URL_TRAILING)
+        # keep a closing bracket that belongs to the URL, e.g. wiki links
+        if match.group(0)[len(url):].startswith(')') and '(' in url:
+            url += ')'
+        if url not in urls:
+            urls.append(url)
+    return urls
@@ -0,0 +1,254 @@
+# core/metrics.py
+"""In-process metrics with Prometheus text exposition"""
+import bisect
+import threading
+import time
+import asyncio
+import logging
+from typing import Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+LOOP_LAG_INTERVAL = 1.0
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _label_str(self, key: Tuple[str, ...], extra: str = '') -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._label_str(k)} {_format_value(v)}" for k, v in sorted(self.values.items())]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], list] = {}   # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def time(self, **labels) -> '_Timer':
+        """Context manager observing the elapsed wall time"""
+        return _Timer(self, labels)
+
+    def summary(self) -> Dict[Tuple[str, ...], Tuple[int, float, float]]:
+        """{labels: (count, mean, approximate p95)}"""
+        result = {}
+        with self._lock:
+            for key, series in self.series.items():
+                counts = series[:-1]
+                total = sum(counts)
+                if not total:
+                    continue
+                target, running, p95 = total * 0.95, 0, float('inf')
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    running += count
+                    if running >= target:
+                        p95 = bound
+                        break
+                result[key] = (total, series[-1] / total, p95)
+        return result
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in sorted(self.series.items()):
+                running = 0
+                for bound, count in zip(self.buckets, series):
+                    running += count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{self.name}_bucket{self._label_str(key, le)} {running}")
+                running += series[len(self.buckets)]
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{self._label_str(key, le)} {running}")
+                lines.append(f"{self.name}_sum{self._label_str(key)} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_count{self._label_str(key)} {running}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.monotonic() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        out = []
+        for metric in self.metrics.values():
+            out.append(f"# HELP {metric.name} {metric.documentation}")
+            out.append(f"# TYPE {metric.name} {metric.kind}")
+            out.extend(metric.render())
+        return '\n'.join(out) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+PROCESS_START = REGISTRY.gauge('telegrambot_start_time_seconds', 'Unix time the bot process started')
+PROCESS_START.set(time.time())
+
+MESSAGES = REGISTRY.counter('telegrambot_messages_total', 'Incoming messages by outcome', ['result'])
+DISPATCH_SECONDS = REGISTRY.histogram('telegrambot_dispatch_seconds', 'Time to resolve a message to a handler',
+                                      ['handler'], buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1))
+HANDLER_SECONDS = REGISTRY.histogram('telegrambot_handler_seconds', 'Handler execution time', ['handler'])
+HANDLER_ERRORS = REGISTRY.counter('telegrambot_handler_errors_total', 'Handler exceptions', ['handler'])
+
+SUBPROCESS_SECONDS = REGISTRY.histogram('telegrambot_subprocess_seconds', 'Subprocess wall time', ['command'])
+SUBPROCESS_EXITS = REGISTRY.counter('telegrambot_subprocess_exits_total', 'Subprocess exit codes',
+                                    ['command', 'code'])
+
+TELEGRAM_API_SECONDS = REGISTRY.histogram('telegrambot_telegram_api_seconds', 'Telegram Bot API call latency',
+                                          ['method'])
+TELEGRAM_API_ERRORS = REGISTRY.counter('telegrambot_telegram_api_errors_total', 'Failed Telegram Bot API calls',
+                                       ['method', 'error'])
+
+WEBHOOK_UPDATES = REGISTRY.counter('telegrambot_webhook_updates_total', 'Webhook calls by outcome', ['result'])
+
+OUTBOX_WAIT_SECONDS = REGISTRY.histogram('telegrambot_outbox_wait_seconds', 'Time replies spend in the send queue',
+                                         ['priority'])
+OUTBOX_RETRIES = REGISTRY.counter('telegrambot_outbox_retries_total', 'Sends retried after flood control or network errors',
+                                  ['reason'])
+OUTBOX_COALESCED = REGISTRY.counter('telegrambot_outbox_coalesced_total', 'Small replies merged into a previous message')
+
+URL_FETCH_BYTES = REGISTRY.counter('telegrambot_url_fetch_bytes_total', 'Response body bytes downloaded')
+URL_FETCH_SECONDS = REGISTRY.histogram('telegrambot_url_fetch_seconds', 'URL download time (headers and body)')
+URL_PARSE_SECONDS = REGISTRY.histogram('telegrambot_url_parse_seconds', 'HTML to text time', ['parser'])
+URL_CACHE_LOOKUPS = REGISTRY.counter('telegrambot_url_cache_lookups_total', 'URL cache lookups', ['result'])
+RESULT_CACHE_LOOKUPS = REGISTRY.counter('telegrambot_result_cache_lookups_total',
+                                      'Read-only command result lookups (hit, miss, coalesced)', ['result'])
+
+AUDIT_RECORDS = REGISTRY.counter('telegrambot_audit_records_total', 'Command history records by outcome', ['result'])
+AUDIT_WRITE_SECONDS = REGISTRY.histogram('telegrambot_audit_write_seconds', 'Time to write one batch of history records')
+
+HEALTH_UP = REGISTRY.gauge('telegrambot_health_up', 'Latest health check result (1 up, 0 down)', ['check'])
+HEALTH_TRANSITIONS = REGISTRY.counter('telegrambot_health_transitions_total', 'Confirmed health state changes',
+                                      ['check', 'state'])
+HEALTH_PROBE_SECONDS = REGISTRY.histogram('telegrambot_health_probe_seconds', 'Health probe duration', ['check'])
+
+STARTUP_SECONDS = REGISTRY.gauge('telegrambot_startup_seconds', 'Seconds from process start to each startup phase',
+                                 ['phase'])
+
+PLUGIN_RELOADS = REGISTRY.counter('telegrambot_plugin_reloads_total', 'Plugin hot reloads by outcome', ['result'])
+PLUGIN_RELOAD_SECONDS = REGISTRY.histogram('telegrambot_plugin_reload_seconds', 'Time to re-import a plugin',
+                                           ['module'])
+
+LOOP_LAG_SECONDS = REGISTRY.gauge('telegrambot_event_loop_lag_seconds', 'Latest event loop scheduling delay')
+LOOP_LAG_HISTOGRAM = REGISTRY.histogram('telegrambot_event_loop_lag', 'Event loop scheduling delay',
+                                        buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+
+
+def command_label(command_list: list) -> str:
+    """Short, low-cardinality label for a command line"""
+    args = [a for a in command_list if a != 'sudo'] or list(command_list) or ['?']
+    return str(args[0]).rsplit('/', 1)[-1]
+
+
+class StartupTimeline:
+    """Record how long each startup phase took to be reached"""
+
+    def __init__(self, start: float = None):
+        self.start = start if start is not None else time.monotonic()
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str, once: bool = False):
+        if once and any(name == phase for name, _ in self.marks):
+            return
+        elapsed = time.monotonic() - self.start
+        self.marks.append((phase, elapsed))
+        STARTUP_SECONDS.set(elapsed, phase=phase)
+        logger.info(f"Startup: {phase} after {elapsed:.3f}s")
+
+    def summary(self) -> str:
+        return ', '.join(f"{name} {elapsed:.2f}s" for name, elapsed in self.marks)
+
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL):
+    """Measure how late the event loop wakes us up, forever"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0.0)
+        LOOP_LAG_SECONDS.set(lag)
+        LOOP_LAG_HISTOGRAM.observe(lag)
@@ -0,0 +1,230 @@
+# core/outbox.py
+"""Outbound message queue that keeps the bot within Telegram's flood limits"""
+import asyncio
+import heapq
+import io
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from core.chunker import TELEGRAM_MAX_UNITS, utf16_len
+from core.metrics import OUTBOX_WAIT_SECONDS, OUTBOX_RETRIES, OUTBOX_COALESCED
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0   # short answers to what the user just typed
+BULK = 1          # long or streamed command output
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BULK: 'bulk'}
+
+DEFAULT_CHAT_INTERVAL = 1.0   # Telegram allows about one message per second per chat...
+DEFAULT_GLOBAL_RATE = 25      # ...and about 30 per second overall
+MAX_NETWORK_RETRIES = 5
+
+
+class ChatTarget(NamedTuple):
+    """A chat to send a new message to, rather than a message to reply to"""
+    bot: object
+    chat_id: int
+
+
+@dataclass(order=True)
+class Outgoing:
+    """One queued send; ordered by priority, then by arrival"""
+    priority: int
+    seq: int
+    kind: str = field(compare=False)        # 'reply', 'document', 'edit' or 'send'
+    target: object = field(compare=False)   # message replied to or being edited, or a ChatTarget
+    text: str = field(compare=False)        # message text, or document caption
+    coalesce: bool = field(compare=False, default=True)
+    futures: List[asyncio.Future] = field(compare=False, default_factory=list)
+    queued_at: float = field(compare=False, default_factory=time.monotonic)
+    attempts: int = field(compare=False, default=0)
+    attachment: Optional[Tuple[str, bytes]] = field(compare=False, default=None)   # (filename, data)
+
+    @property
+    def abandoned(self) -> bool:
+        # every caller waiting for it has been cancelled (e.g. its job was)
+        return all(future.done() for future in self.futures)
+
+
+@dataclass
+class ChatLane:
+    heap: List[Outgoing] = field(default_factory=list)
+    next_at: float = 0.0    # earliest time the next message may go to this chat
+    busy: bool = False      # a send to this chat is in flight
+
+
+class OutboundQueue:
+    """Central queue for everything the bot sends.
+
+    Messages to one chat go out one at a time, at most one per
+    chat_interval seconds; across chats at most global_rate per second.
+    Interactive replies overtake queued bulk output, consecutive small
+    replies to the same message are merged into one, and a RetryAfter from
+    Telegram pauses the chat and resends instead of failing the handler.
+    """
+
+    def __init__(self, chat_interval: float = DEFAULT_CHAT_INTERVAL, global_rate: float = DEFAULT_GLOBAL_RATE):
+        self.chat_interval = chat_interval
+        self.global_rate = global_rate
+        self._lanes: Dict[int, ChatLane] = {}
+        self._pending_edits: Dict[int, Outgoing] = {}
+        self._seq = itertools.count()
+        self._next_global = 0.0
+        self._wakeup = None
+        self._task = None
+
+    def submit(self, kind: str, target, text: str, priority: int = INTERACTIVE,
+               coalesce: bool = True, attachment: Optional[Tuple[str, bytes]] = None) -> asyncio.Future:
+        """Queue a send and return a future for the resulting Message"""
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+
+        if kind == 'edit':
+            pending = self._pending_edits.get(id(target))
+            if pending is not None:
+                # Not sent yet: only the latest text matters
+                pending.text = text
+                pending.futures.append(future)
+                return future
+
+        item = Outgoing(priority, next(self._seq), kind, target, text, coalesce, [future],
+                        attachment=attachment)
+        if kind == 'edit':
+            self._pending_edits[id(target)] = item
+        lane = self._lanes.setdefault(target.chat_id, ChatLane())
+        heapq.heappush(lane.heap, item)
+        self._wakeup.set()
+        return future
+
+    async def reply(self, message, text: str, priority: int = INTERACTIVE, coalesce: bool = True):
+        return await self.submit('reply', message, text, priority, coalesce)
+
+    async def edit(self, sent, text: str, priority: int = BULK):
+        return await self.submit('edit', sent, text, priority)
+
+    async def send(self, bot, chat_id: int, text: str, priority: int = INTERACTIVE):
+        """Send a message that answers nothing (notifications, alerts)"""
+        return await self.submit('send', ChatTarget(bot, chat_id), text, priority)
+
+    def pending(self) -> int:
+        return sum(len(lane.heap) for lane in self._lanes.values())
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            ready = []
+            delay = None
+            for chat_id, lane in list(self._lanes.items()):
+                if lane.busy:
+                    continue
+                if not lane.heap:
+                    if lane.next_at <= now:
+                        del self._lanes[chat_id]
+                    continue
+                wait = max(lane.next_at, self._next_global) - now
+                if wait <= 0:
+                    ready.append((lane.heap[0], chat_id, lane))
+                elif delay is None or wait < delay:
+                    delay = wait
+
+            if ready:
+                # Across chats, the most urgent head of line goes first
+                _, chat_id, lane = min(ready, key=lambda entry: entry[0])
+                item = self._take(lane)
+                if item is not None:
+                    lane.busy = True
+                    self._next_global = now + 1 / self.global_rate
+                    asyncio.create_task(self._send(lane, item))
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _take(self, lane: ChatLane):
+        """Pop the next live item, merging small replies queued behind it"""
+        while lane.heap:
+            item = heapq.heappop(lane.heap)
+            if item.kind == 'edit' and self._pending_edits.get(id(item.target)) is item:
+                del self._pending_edits[id(item.target)]
+            if not item.abandoned:
+                break
+        else:
+            return None
+
+        while (item.kind == 'reply' and item.coalesce and lane.heap):
+            head = lane.heap[0]
+            if (head.kind != 'reply' or not head.coalesce or head.target is not item.target
+                    or head.priority != item.priority
+                    or utf16_len(item.text) + 1 + utf16_len(head.text) > TELEGRAM_MAX_UNITS):
+                break
+            heapq.heappop(lane.heap)
+            if head.abandoned:
+                continue
+            item.text += '\n' + head.text
+            item.futures.extend(head.futures)
+            OUTBOX_COALESCED.inc()
+        return item
+
+    async def _send(self, lane: ChatLane, item: Outgoing):
+        if item.attempts == 0:
+            OUTBOX_WAIT_SECONDS.observe(time.monotonic() - item.queued_at, priority=PRIORITY_NAMES[item.priority])
+        try:
+            if item.kind == 'reply':
+                result = await item.target.reply_text(item.text)
+            elif item.kind == 'document':
+                filename, data = item.attachment
+                result = await item.target.reply_document(document=io.BytesIO(data), filename=filename,
+                                                          caption=item.text or None)
+            elif item.kind == 'send':
+                result = await item.target.bot.send_message(chat_id=item.target.chat_id, text=item.text)
+            else:
+                result = await item.target.edit_text(item.text)
+        except RetryAfter as e:
+            retry_after = getattr(e.retry_after, 'total_seconds', lambda: e.retry_after)()
+            logger.warning(f"Flood control in chat {item.target.chat_id}, resending in {retry_after}s")
+            OUTBOX_RETRIES.inc(reason='retry_after')
+            lane.next_at = time.monotonic() + retry_after
+            heapq.heappush(lane.heap, item)
+        except (BadRequest, Forbidden) as e:
+            self._fail(item, e)
+            lane.next_at = time.monotonic() + self.chat_interval
+        except NetworkError as e:
+            item.attempts += 1
+            if item.attempts >= MAX_NETWORK_RETRIES:
+                self._fail(item, e)
+            else:
+                OUTBOX_RETRIES.inc(reason='network')
+                lane.next_at = time.monotonic() + min(2 ** item.attempts, 30)
+                heapq.heappush(lane.heap, item)
+        except Exception as e:
+            self._fail(item, e)
+        else:
+            for future in item.futures:
+                if not future.done():
+                    future.set_result(result)
+            lane.next_at = time.monotonic() + self.chat_interval
+        finally:
+            lane.busy = False
+            self._wakeup.set()
+
+    @staticmethod
+    def _fail(item: Outgoing, error: Exception):
+        for future in item.futures:
+            if not future.done():
+                future.set_exception(error)
+
+
+OUTBOX = OutboundQueue()
@@ -0,0 +1,62 @@
+# core/result_cache.py
+"""Short-lived cache and single-flight for read-only command results"""
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple
+
+from core.metrics import RESULT_CACHE_LOOKUPS
+
+MAX_ENTRIES = 256
+
+
+class ResultCache:
+    """Share results of identical read-only commands for a few seconds.
+
+    A key that was computed less than ttl seconds ago is answered from the
+    cache. Otherwise the first caller starts the producer as its own task
+    and every caller arriving meanwhile waits for that same task, so a
+    burst of identical requests costs one subprocess. A caller being
+    cancelled does not cancel the shared task.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: Dict[str, Tuple[float, float, object]] = {}   # key -> (stored at, ttl, value)
+        self.inflight: Dict[str, asyncio.Task] = {}
+
+    async def get_or_run(self, key: str, ttl: float, producer: Callable[[], Awaitable]) -> Tuple[object, float]:
+        """Return (value, age in seconds); age is 0 for a fresh result"""
+        now = time.monotonic()
+        entry = self.entries.get(key)
+        if entry is not None and now - entry[0] < ttl:
+            RESULT_CACHE_LOOKUPS.inc(result='hit')
+            return entry[2], now - entry[0]
+
+        task = self.inflight.get(key)
+        if task is not None:
+            RESULT_CACHE_LOOKUPS.inc(result='coalesced')
+        else:
+            RESULT_CACHE_LOOKUPS.inc(result='miss')
+            task = asyncio.create_task(producer())
+            self.inflight[key] = task
+            task.add_done_callback(lambda done: self._store(key, ttl, done))
+        return await asyncio.shield(task), 0.0
+
+    def _store(self, key: str, ttl: float, task: asyncio.Task):
+        self.inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        now = time.monotonic()
+        if len(self.entries) >= self.max_entries:
+            self.entries = {k: v for k, v in self.entries.items() if now - v[0] < v[1]}
+            while len(self.entries) >= self.max_entries:
+                del self.entries[next(iter(self.entries))]
+        self.entries[key] = (now, ttl, task.result())
+
+    def stats(self) -> Dict[str, int]:
+        now = time.monotonic()
+        fresh = sum(1 for stored, ttl, _ in self.entries.values() if now - stored < ttl)
+        return {'entries': fresh, 'in_flight': len(self.inflight)}
+
+
+RESULT_CACHE = ResultCache()
@@ -0,0 +1,160 @@
+# core/scheduler.py
+"""Job queue between incoming messages and command handlers"""
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.audit import CommandUsage, track_usage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT = 3
+RECENT_JOBS_KEPT = 10
+
+
+@dataclass
+class Job:
+    id: int
+    chat_id: int
+    user: str
+    command: str
+    category: str
+    run: Callable[[], Awaitable[None]] = field(repr=False)
+    concurrency_key: Optional[str] = None
+    state: str = 'queued'        # queued, running, done, failed, cancelled
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    usage: Optional[CommandUsage] = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in ('queued', 'running')
+
+
+class JobScheduler:
+    """Run handler work as jobs with ordering and concurrency limits.
+
+    - Jobs from one chat run one after another, in arrival order.
+    - At most max_concurrent jobs run at once across all chats.
+    - Jobs sharing a concurrency key (e.g. "restart:router") never overlap.
+    - A command identical to one still queued/running in the same chat is
+      not queued again; the existing job is returned instead.
+
+    on_finish, if set, is called with every job that has ended, whether it
+    ran or was cancelled while queued.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 on_finish: Optional[Callable[[Job], None]] = None):
+        self.max_concurrent = max_concurrent
+        self.on_finish = on_finish
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._key_locks: Dict[str, asyncio.Lock] = {}
+        self._queues: Dict[int, deque] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._jobs: Dict[int, Job] = {}
+        self._inflight: Dict[Tuple[int, str], Job] = {}
+        self._recent = deque(maxlen=RECENT_JOBS_KEPT)
+        self._next_id = 1
+
+    def submit(self, chat_id: int, user: str, command: str, category: str,
+               run: Callable[[], Awaitable[None]], concurrency_key: Optional[str] = None) -> Tuple[Job, bool]:
+        """Queue a job. Returns (job, created); created is False for a duplicate."""
+        existing = self._inflight.get((chat_id, command))
+        if existing is not None:
+            return existing, False
+
+        job = Job(self._next_id, chat_id, user, command, category, run, concurrency_key)
+        self._next_id += 1
+        self._jobs[job.id] = job
+        self._inflight[(chat_id, command)] = job
+        self._queues.setdefault(chat_id, deque()).append(job)
+
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._chat_worker(chat_id))
+        return job, True
+
+    def position(self, job: Job) -> int:
+        """Number of jobs ahead of this one in its chat queue"""
+        queue = self._queues.get(job.chat_id, ())
+        ahead = sum(1 for queued in queue if queued is not job and queued.id < job.id)
+        running = any(j.state == 'running' and j.chat_id == job.chat_id for j in self._jobs.values())
+        return ahead + int(running)
+
+    def cancel(self, job_id: int) -> Optional[Job]:
+        """Cancel a queued or running job, returning it (None if unknown or finished)"""
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return None
+        if job.task is not None:
+            # Running, or picked up and waiting for a free slot
+            job.task.cancel()
+        else:
+            self._queues[job.chat_id].remove(job)
+            self._finish(job, 'cancelled')
+        return job
+
+    def list_jobs(self) -> List[Job]:
+        """Active jobs followed by the most recently finished ones"""
+        return sorted(self._jobs.values(), key=lambda j: j.id) + list(reversed(self._recent))
+
+    async def _chat_worker(self, chat_id: int):
+        queue = self._queues[chat_id]
+        try:
+            while queue:
+                job = queue.popleft()
+                await self._run(job)
+        finally:
+            del self._workers[chat_id]
+            if not queue:
+                self._queues.pop(chat_id, None)
+
+    async def _run(self, job: Job):
+        key_lock = None
+        if job.concurrency_key:
+            key_lock = self._key_locks.setdefault(job.concurrency_key, asyncio.Lock())
+
+        job.task = asyncio.create_task(self._execute(job, key_lock))
+        # wait() rather than await: a cancelled job must not stop the chat worker
+        await asyncio.wait([job.task])
+
+        if job.task.cancelled():
+            self._finish(job, 'cancelled')
+        elif job.task.exception() is not None:
+            logger.error(f"Job #{job.id} ({job.command}) failed: {job.task.exception()}")
+            self._finish(job, 'failed')
+        else:
+            self._finish(job, 'done')
+
+    async def _execute(self, job: Job, key_lock: Optional[asyncio.Lock]):
+        # Key first: a job waiting for a busy device must not hold a slot
+        if key_lock is not None:
+            await key_lock.acquire()
+        try:
+            async with self._slots:
+                job.state = 'running'
+                job.started_at = time.time()
+                job.usage = track_usage()
+                await job.run()
+        finally:
+            if key_lock is not None:
+                key_lock.release()
+
+    def _finish(self, job: Job, state: str):
+        job.state = state
+        job.finished_at = time.time()
+        job.task = None
+        self._jobs.pop(job.id, None)
+        if self._inflight.get((job.chat_id, job.command)) is job:
+            del self._inflight[(job.chat_id, job.command)]
+        self._recent.append(job)
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                logger.error(f"Job #{job.id} finish hook failed: {e}")
@@ -1,25 +1,171 @@
 # core/shell_utils.py
 """Shell command execution utilities"""
-import subprocess
+import asyncio
+import codecs
+import os
+import signal
+import time
 import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from core.metrics import SUBPROCESS_SECONDS, SUBPROCESS_EXITS, command_label
+from core.audit import note_process
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_OUTPUT = 1_000_000  # bytes of combined stdout/stderr kept per command
+READ_SIZE = 64 * 1024
+KILL_TIMEOUT = 5  # seconds allowed for the kill helper and for a process to exit after it
+KILL_HELPER = '/usr/local/bin/telegrambot-kill'  # root-owned, from extras/ (see README)
+
+
+@dataclass
+class CommandResult:
+    """Outcome of a finished (or killed) command"""
+    output: str
+    returncode: Optional[int]
+    duration: float
+    timed_out: bool = False
+    truncated: bool = False
+
+
+async def kill_process_group(proc) -> bool:
+    """Kill the process and everything it spawned; False if that was not allowed.
+
+    A sudo command's process group belongs to root, so os.killpg() is
+    refused; it is then killed through `sudo -n telegrambot-kill`, which
+    only kills groups this user started (see the sudoers example in the
+    README).
+    """
+    if proc.returncode is not None:
+        return True
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+        return True
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    try:
+        killer = await asyncio.create_subprocess_exec(
+            'sudo', '-n', KILL_HELPER, str(proc.pid),
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL)
+        if await asyncio.wait_for(killer.wait(), KILL_TIMEOUT) == 0:
+            return True
+    except (OSError, asyncio.TimeoutError):
+        pass
+    logger.warning(f"Could not kill process group {proc.pid}: not allowed to run "
+                   f"'sudo -n {KILL_HELPER} {proc.pid}' (see the sudoers example in the README)")
+    return False
+
+
 class ShellExecutor:
     @staticmethod
-    def execute_command(command_list: list) -> str:
-        """Execute a shell command safely"""
+    async def run_command(command_list: list, timeout: float = DEFAULT_TIMEOUT,
+                          max_output: int = DEFAULT_MAX_OUTPUT,
+                          input_data: Optional[bytes] = None,
+                          on_output: Optional[Callable[[str], Awaitable[None]]] = None) -> CommandResult:
+        """Run a command without blocking the event loop.
+
+        The command gets its own process group so that a timeout (or a
+        cancelled task) kills the whole tree, not just the direct child.
+        Output beyond max_output bytes is read and discarded.
+
+        If on_output is given the output is streamed: every piece read from
+        the pipe is decoded and awaited through the callback as it arrives,
+        nothing is buffered, and result.output only carries the
+        truncation/timeout notes.
+        """
+        start = time.monotonic()
         try:
-            result = subprocess.check_output(
-                command_list,
-                stderr=subprocess.STDOUT,
-                timeout=30  # Add timeout for safety
-            ).decode('utf-8', errors='replace')
-        except subprocess.CalledProcessError as e:
-            result = e.output.decode('utf-8', errors='replace')
-        except subprocess.TimeoutExpired:
-            result = "Command timed out after 30 seconds"
+            proc = await asyncio.create_subprocess_exec(
+                *command_list,
+                stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                start_new_session=True,
+            )
         except Exception as e:
-            result = f'Error executing command: {str(e)}'
-        
-        return result
\ No newline at end of file
+            SUBPROCESS_EXITS.inc(command=command_label(command_list), code='spawn_error')
+            return CommandResult(f'Error executing command: {str(e)}', None, time.monotonic() - start)
+
+        chunks = []
+        kept = 0
+        truncated = False
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+        async def feed():
+            if input_data is None:
+                return
+            try:
+                proc.stdin.write(input_data)
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                proc.stdin.close()
+
+        async def collect():
+            nonlocal kept, truncated
+            while True:
+                data = await proc.stdout.read(READ_SIZE)
+                if not data:
+                    break
+                room = max_output - kept
+                if room > 0:
+                    piece = data[:room]
+                    kept += len(piece)
+                    if on_output is None:
+                        chunks.append(piece)
+                    else:
+                        text = decoder.decode(piece)
+                        if text:
+                            await on_output(text)
+                if len(data) > room:
+                    truncated = True
+            if on_output is not None:
+                tail = decoder.decode(b'', final=True)
+                if tail:
+                    await on_output(tail)
+            await proc.wait()
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.gather(feed(), collect()), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            if await kill_process_group(proc):
+                await proc.wait()
+            else:
+                # Still running as root; give it a moment, then report the timeout anyway
+                try:
+                    await asyncio.wait_for(proc.wait(), KILL_TIMEOUT)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            await kill_process_group(proc)
+            raise
+
+        output = b''.join(chunks).decode('utf-8', errors='replace')
+        if truncated:
+            output += f'\n[Output truncated at {max_output} bytes]'
+        if timed_out:
+            output += f'\nCommand timed out after {timeout:g} seconds'
+            logger.warning(f"Command timed out after {timeout:g}s: {command_list}")
+
+        duration = time.monotonic() - start
+        label = command_label(command_list)
+        SUBPROCESS_SECONDS.observe(duration, command=label)
+        SUBPROCESS_EXITS.inc(command=label, code='timeout' if timed_out else proc.returncode)
+        note_process(proc.returncode, kept)
+        return CommandResult(output, proc.returncode, duration, timed_out, truncated)
+
+    @staticmethod
+    async def execute_command(command_list: list, timeout: float = DEFAULT_TIMEOUT,
+                              max_output: int = DEFAULT_MAX_OUTPUT) -> str:
+        """Execute a shell command safely and return its combined output"""
+        result = await ShellExecutor.run_command(command_list, timeout=timeout, max_output=max_output)
+        return result.output
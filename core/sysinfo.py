@@ -0,0 +1,295 @@
+# core/sysinfo.py
+"""System information read straight from /proc, /sys and utmp/wtmp.
+
+Every view is a plain function returning the text to send. They do a few
+small file reads each, so the bot no longer forks a process for them; the
+ones that may touch the disk (df, last) or sleep (cpu) are meant to be run
+with asyncio.to_thread. All of them raise OSError when the files are not
+there (not Linux, restricted container), so the caller can fall back to
+the external command.
+"""
+import os
+import re
+import glob
+import math
+import time
+import struct
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+UTMP_PATH = '/var/run/utmp'
+WTMP_PATH = '/var/log/wtmp'
+
+# struct utmp from <utmp.h>, native alignment: 384 bytes on x86_64 and ARM
+UTMP_STRUCT = struct.Struct('hi32s4s32s256shhiii4i20s')
+RUN_LVL, BOOT_TIME, USER_PROCESS, DEAD_PROCESS = 1, 2, 7, 8
+WTMP_READ_RECORDS = 1024   # records read per block when scanning backwards
+# Past this many wtmp records forking last(1) is quicker than parsing here
+# (benchmarks/sysinfo.py: a few µs per record against ~1.5 ms per fork)
+LAST_INPROCESS_MAX_RECORDS = 300
+
+CPU_SAMPLE_SECONDS = 0.25
+
+_OCTAL_ESCAPE_RE = re.compile(r'\\([0-7]{3})')   # spaces etc. in /proc/self/mounts
+
+
+class UtmpRecord(NamedTuple):
+    type: int
+    pid: int
+    line: str
+    user: str
+    host: str
+    time: int
+
+
+def human_size(size: float) -> str:
+    """Format bytes like df -h: powers of 1024, rounded up, one decimal below 10"""
+    units = ('', 'K', 'M', 'G', 'T', 'P')
+    for index, unit in enumerate(units):
+        if size < 1024 or unit == 'P':
+            break
+        size /= 1024
+    if unit and size < 10:
+        size = math.ceil(size * 10) / 10
+        if size < 10:
+            return f"{size:.1f}{unit}"
+    size = math.ceil(size)
+    if size == 1024 and unit != 'P':
+        return f"1.0{units[index + 1]}"   # 1023.5M rounds up to 1.0G, not 1024M
+    return f"{size:.0f}{unit}"
+
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def _text(field: bytes) -> str:
+    return field.split(b'\0', 1)[0].decode('utf-8', 'replace')
+
+
+def _record(fields: tuple) -> UtmpRecord:
+    return UtmpRecord(fields[0], fields[1], _text(fields[2]), _text(fields[4]), _text(fields[5]), fields[9])
+
+
+def read_utmp(path: str = UTMP_PATH) -> List[UtmpRecord]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    usable = len(data) - len(data) % UTMP_STRUCT.size
+    return [_record(fields) for fields in UTMP_STRUCT.iter_unpack(data[:usable])]
+
+
+def wtmp_records(path: str = WTMP_PATH) -> int:
+    return os.stat(path).st_size // UTMP_STRUCT.size
+
+
+def iter_wtmp_reversed(path: str = WTMP_PATH) -> Iterator[UtmpRecord]:
+    """Records from newest to oldest, read from the end in blocks"""
+    size = UTMP_STRUCT.size
+    with open(path, 'rb') as f:
+        end = os.fstat(f.fileno()).st_size // size * size
+        while end > 0:
+            start = max(0, end - WTMP_READ_RECORDS * size)
+            f.seek(start)
+            block = f.read(end - start)
+            for offset in range(len(block) - size, -1, -size):
+                yield _record(UTMP_STRUCT.unpack_from(block, offset))
+            end = start
+
+
+def uptime() -> str:
+    """Same line as uptime(1)"""
+    seconds = int(float(_read('/proc/uptime').split()[0]))
+    load = _read('/proc/loadavg').split()[:3]
+    days, rest = divmod(seconds, 86400)
+    hours, minutes = divmod(rest // 60, 60)
+    up = f"{days} day{'s' if days != 1 else ''}, " if days else ''
+    up += f"{hours:2d}:{minutes:02d}" if hours else f"{minutes} min"
+    try:
+        users = sum(1 for record in read_utmp() if record.type == USER_PROCESS and record.user)
+    except OSError:
+        users = 0
+    return (f" {time.strftime('%H:%M:%S')} up {up},  {users} user{'s' if users != 1 else ''},  "
+            f"load average: {', '.join(load)}")
+
+
+def _mounts() -> List[Tuple[str, str]]:
+    """(device, mount point) of every mount, the last one winning for a mount point"""
+    mounts: Dict[str, str] = {}
+    for line in _read('/proc/self/mounts').splitlines():
+        fields = line.split()
+        if len(fields) < 2 or fields[0] == 'rootfs':
+            continue
+        device, mount_point = (_OCTAL_ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 8)), field)
+                               for field in fields[:2])
+        mounts.pop(mount_point, None)
+        mounts[mount_point] = device
+    return [(device, mount_point) for mount_point, device in mounts.items()]
+
+
+def df() -> str:
+    """Like df -h: file systems that have blocks, sizes in powers of 1024"""
+    rows = [('Filesystem', 'Size', 'Used', 'Avail', 'Use%', 'Mounted on')]
+    for device, mount_point in _mounts():
+        try:
+            st = os.statvfs(mount_point)
+        except OSError:
+            continue
+        if st.f_blocks == 0:
+            continue
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        avail = st.f_bavail * st.f_frsize
+        percent = f"{math.ceil(used * 100 / (used + avail))}%" if used + avail else '-'
+        rows.append((device, human_size(st.f_blocks * st.f_frsize), human_size(used), human_size(avail),
+                     percent, mount_point))
+    width = max(len(row[0]) for row in rows)
+    return "\n".join(f"{row[0]:<{width}} {row[1]:>5} {row[2]:>5} {row[3]:>5} {row[4]:>4} {row[5]}"
+                     for row in rows)
+
+
+def _duration(seconds: int) -> str:
+    days, rest = divmod(max(seconds, 0) // 60, 1440)
+    hours, minutes = divmod(rest, 60)
+    return f"({days}+{hours:02d}:{minutes:02d})" if days else f"({hours:02d}:{minutes:02d})"
+
+
+def _last_row(user: str, line: str, host: str, start: int, end: str) -> str:
+    when = time.strftime('%a %b %e %H:%M', time.localtime(start))
+    return f"{user:<8.8} {line:<12.12} {host:<16.16} {when} {end}"
+
+
+def last(path: str = WTMP_PATH) -> str:
+    """Logins and reboots from wtmp, newest first, in the layout of last(1)"""
+    rows = []
+    logouts: Dict[str, int] = {}       # tty -> logout time, for sessions older than it
+    newer_boot: Optional[int] = None   # boot after the records being looked at
+    shutdown: Optional[int] = None     # shutdown between those records and newer_boot
+    oldest = None
+    for record in iter_wtmp_reversed(path):
+        oldest = record.time
+        if record.type == RUN_LVL and record.user == 'shutdown':
+            shutdown = record.time
+        elif record.type == BOOT_TIME:
+            if shutdown is not None:
+                end = f"- {time.strftime('%H:%M', time.localtime(shutdown))}  {_duration(shutdown - record.time)}"
+            elif newer_boot is None:
+                end = '  still running'
+            else:
+                end = f"- crash {_duration(newer_boot - record.time)}"
+            rows.append(_last_row('reboot', 'system boot', record.host, record.time, end))
+            newer_boot, shutdown = record.time, None
+            logouts.clear()
+        elif record.type == DEAD_PROCESS and record.line:
+            logouts[record.line] = record.time
+        elif record.type == USER_PROCESS and record.user:
+            logout = logouts.pop(record.line, None)
+            if logout is not None:
+                end = f"- {time.strftime('%H:%M', time.localtime(logout))}  {_duration(logout - record.time)}"
+            elif newer_boot is None:
+                end = '  still logged in'
+            elif shutdown is not None:
+                end = f"- down   {_duration(shutdown - record.time)}"
+            else:
+                end = f"- crash {_duration(newer_boot - record.time)}"
+            rows.append(_last_row(record.user, record.line, record.host, record.time, end))
+    if oldest is None:
+        oldest = int(os.stat(path).st_mtime)
+    if rows:
+        rows.append('')
+    rows.append(f"{os.path.basename(path)} begins {time.strftime('%a %b %e %H:%M:%S %Y', time.localtime(oldest))}")
+    return "\n".join(rows)
+
+
+def _meminfo() -> Dict[str, int]:
+    info = {}
+    for line in _read('/proc/meminfo').splitlines():
+        name, _, value = line.partition(':')
+        fields = value.split()
+        if fields:
+            info[name] = int(fields[0]) * 1024
+    return info
+
+
+def memory() -> str:
+    """Like free -h"""
+    info = _meminfo()
+    total, available = info['MemTotal'], info.get('MemAvailable', info['MemFree'])
+    cache = info.get('Buffers', 0) + info.get('Cached', 0) + info.get('SReclaimable', 0)
+    lines = [f"Memory: {human_size(total - available)} used of {human_size(total)}, "
+             f"{human_size(available)} available ({human_size(cache)} buff/cache)"]
+    if info.get('SwapTotal'):
+        swap_used = info['SwapTotal'] - info.get('SwapFree', 0)
+        lines.append(f"Swap: {human_size(swap_used)} used of {human_size(info['SwapTotal'])}")
+    else:
+        lines.append("Swap: none")
+    return "\n".join(lines)
+
+
+def _cpu_times() -> Dict[str, Tuple[int, int]]:
+    """cpu name -> (busy, total) jiffies"""
+    times = {}
+    for line in _read('/proc/stat').splitlines():
+        if not line.startswith('cpu'):
+            break
+        name, *values = line.split()
+        values = [int(value) for value in values[:8]]
+        idle = values[3] + values[4]   # idle + iowait
+        times[name] = (sum(values) - idle, sum(values))
+    return times
+
+
+def cpu(sample: float = CPU_SAMPLE_SECONDS) -> str:
+    """Usage over a short sample, load, frequency per core (blocks for sample seconds)"""
+    before = _cpu_times()
+    time.sleep(sample)
+    after = _cpu_times()
+
+    def usage(name):
+        busy = after[name][0] - before[name][0]
+        total = after[name][1] - before[name][1]
+        return f"{busy * 100 / total:.0f}%" if total else '-'
+
+    cores = sorted((name for name in after if name != 'cpu'), key=lambda name: int(name[3:]))
+    load = ' '.join(_read('/proc/loadavg').split()[:3])
+    lines = [f"CPU: {usage('cpu')} busy, {len(cores)} cores, load {load}"]
+    for name in cores:
+        line = f"  {name}: {usage(name)}"
+        try:
+            khz = int(_read(f'/sys/devices/system/cpu/{name}/cpufreq/scaling_cur_freq'))
+            line += f" at {khz // 1000} MHz"
+        except (OSError, ValueError):
+            pass
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def temperature() -> str:
+    """Every thermal zone in degrees Celsius"""
+    lines = []
+    for zone in sorted(glob.glob('/sys/class/thermal/thermal_zone*')):
+        try:
+            name = _read(f'{zone}/type').strip()
+            millidegrees = int(_read(f'{zone}/temp'))
+        except (OSError, ValueError):
+            continue
+        lines.append(f"{name}: {millidegrees / 1000:.1f} °C")
+    if not lines:
+        raise OSError("no thermal zones found")
+    return "\n".join(lines)
+
+
+def network() -> str:
+    """Bytes, packets and errors per interface since boot"""
+    lines = []
+    for line in _read('/proc/net/dev').splitlines()[2:]:
+        name, _, counters = line.partition(':')
+        values = [int(value) for value in counters.split()]
+        if len(values) < 16:
+            continue
+        rx_bytes, rx_packets, rx_errors, rx_drops = values[0:4]
+        tx_bytes, tx_packets, tx_errors, tx_drops = values[8:12]
+        line = (f"{name.strip()}: rx {human_size(rx_bytes)} ({rx_packets} pkts), "
+                f"tx {human_size(tx_bytes)} ({tx_packets} pkts)")
+        if rx_errors or tx_errors or rx_drops or tx_drops:
+            line += f", errors {rx_errors}/{tx_errors}, dropped {rx_drops}/{tx_drops}"
+        lines.append(line)
+    return "\n".join(lines)
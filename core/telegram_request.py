@@ -0,0 +1,24 @@
+# core/telegram_request.py
+"""Bot API transport that records call latency and failures"""
+import time
+
+from telegram.request import HTTPXRequest
+
+from core.metrics import TELEGRAM_API_SECONDS, TELEGRAM_API_ERRORS
+
+# ApplicationBuilder's own default; HTTPXRequest alone would allow a single
+# connection, serialising the concurrent sends of the outbound queue
+DEFAULT_POOL_SIZE = 256
+
+
+class InstrumentedRequest(HTTPXRequest):
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        start = time.monotonic()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        except Exception as e:
+            TELEGRAM_API_ERRORS.inc(method=api_method, error=type(e).__name__)
+            raise
+        finally:
+            TELEGRAM_API_SECONDS.observe(time.monotonic() - start, method=api_method)
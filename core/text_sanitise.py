@@ -0,0 +1,51 @@
+# core/text_sanitise.py
+"""Fast clean-up of extracted text before it is sent to Telegram"""
+import re
+import unicodedata
+
+KEEP_CONTROLS = '\n\r\t'   # \r is kept here and turned into a line break by normalise_lines()
+
+_BLANK_RUN_RE = re.compile(r'\n{3,}')
+
+
+class _ControlTable(dict):
+    """str.translate() table deleting control, format and unassigned characters.
+
+    Filled on demand: the first time a character is seen its Unicode
+    category is looked up and the answer stored, so every later lookup of
+    that character is a plain dict hit.
+    """
+
+    def __missing__(self, codepoint: int):
+        char = chr(codepoint)
+        value = codepoint if char in KEEP_CONTROLS or unicodedata.category(char)[0] != 'C' else None
+        self[codepoint] = value
+        return value
+
+
+_CONTROL_TABLE = _ControlTable()
+
+
+def strip_controls(text: str) -> str:
+    """Remove control characters Telegram dislikes, keeping newlines and tabs"""
+    if text.isascii():
+        # translate() has a C fast path for ASCII
+        return text.translate(_CONTROL_TABLE)
+    # Otherwise only look at each distinct character once, and delete the
+    # offending ones (usually none) with a single regex pass
+    doomed = [char for char in set(text) if _CONTROL_TABLE[ord(char)] is None]
+    if not doomed:
+        return text
+    return re.sub('[' + re.escape(''.join(doomed)) + ']', '', text)
+
+
+def normalise_lines(text: str) -> str:
+    """Unify line endings, trim every line and collapse runs of blank lines to one"""
+    # splitlines() already treats \r\n and a lone \r as line breaks
+    text = '\n'.join(map(str.strip, text.splitlines()))
+    return _BLANK_RUN_RE.sub('\n\n', text).strip()
+
+
+def sanitise_text(text: str) -> str:
+    """strip_controls() then normalise_lines()"""
+    return normalise_lines(strip_controls(text))
@@ -0,0 +1,194 @@
+# core/url_cache.py
+"""Two-level (memory + disk) cache of cleaned URL text"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 900                     # seconds an entry is served without revalidation
+DEFAULT_MEMORY_BYTES = 8_000_000
+DEFAULT_DISK_BYTES = 50_000_000
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'telegrambot', 'urls')
+
+
+def normalise_url(url: str) -> str:
+    """Canonical form used for cache keys: lower-case scheme/host, no default port or fragment"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    if parts.username or parts.password:
+        host = f"{parts.username or ''}:{parts.password or ''}@{host}"
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    mode: str
+    text: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    validated_at: float = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self.text.encode('utf-8', errors='replace'))
+
+
+class UrlCache:
+    """LRU cache of cleaned page text keyed by normalised URL and extraction mode.
+
+    The memory tier is bounded by total text size; the optional disk tier
+    (one JSON file per entry) is bounded the same way and survives
+    restarts. Both evict least recently used entries first. Methods are
+    thread-safe so they can be called from the fetch worker pool.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_memory_bytes: int = DEFAULT_MEMORY_BYTES, max_disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._disk_bytes = sum(e.stat().st_size for e in os.scandir(self.cache_dir)
+                                       if e.name.endswith('.json'))
+            except OSError as e:
+                logger.warning(f"URL cache directory unavailable, using memory only: {e}")
+                self.cache_dir = None
+
+    @staticmethod
+    def key(url: str, mode: str) -> str:
+        return hashlib.sha1(f"{mode}|{normalise_url(url)}".encode('utf-8')).hexdigest()
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.validated_at < self.ttl
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Look an entry up in memory, then on disk (promoting it to memory)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._store_memory(key, entry)
+            return entry
+
+    def put(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._store_memory(key, entry)
+            self._write_disk(key, entry)
+
+    def touch(self, key: str, entry: CacheEntry):
+        """Mark an entry as revalidated (304 Not Modified)"""
+        entry.validated_at = time.time()
+        self.put(key, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+                'evictions': self.evictions,
+                'entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes,
+            }
+
+    # -- memory tier --------------------------------------------------
+
+    def _store_memory(self, key: str, entry: CacheEntry):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old.size
+        if entry.size > self.max_memory_bytes:
+            return
+        self._memory[key] = entry
+        self._memory_bytes += entry.size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.size
+            self.evictions += 1
+
+    # -- disk tier ----------------------------------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[CacheEntry]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = CacheEntry(**json.load(f))
+            os.utime(path)  # keeps the LRU order on disk
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Dropping unreadable URL cache entry {key}: {e}")
+            self._remove_disk(path)
+            return None
+
+    def _write_disk(self, key: str, entry: CacheEntry):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(asdict(entry), f)
+            os.replace(tmp_path, path)
+            self._disk_bytes += os.path.getsize(path) - old_size
+        except OSError as e:
+            logger.warning(f"Failed to write URL cache entry {key}: {e}")
+            return
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        try:
+            files = sorted((e for e in os.scandir(self.cache_dir) if e.name.endswith('.json')),
+                           key=lambda e: e.stat().st_mtime)
+        except OSError:
+            return
+        for item in files:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            self._remove_disk(item.path)
+            self.evictions += 1
+
+    def _remove_disk(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self._disk_bytes -= size
+        except OSError:
+            pass
@@ -0,0 +1,402 @@
+# core/url_fetcher.py
+"""
+URL fetch and clean-up service.
+
+Fetches a URL and turns it into cleaned plain text. Used in-process by the
+URL fetch command and wrapped by the standalone utils/fetch_clean_url.py CLI.
+"""
+import re
+import time
+import codecs
+import socket
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.url_cache import UrlCache, CacheEntry
+from core.html_text import html_to_text, PARSERS, DEFAULT_PARSER
+from core.metrics import URL_FETCH_BYTES, URL_FETCH_SECONDS, URL_PARSE_SECONDS, URL_CACHE_LOOKUPS
+
+# Optional dependencies
+try:
+    from readability import Document as ReadabilityDocument
+except Exception:
+    ReadabilityDocument = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (compatible; TelegramAssistantFetcher/1.0; +https://example.invalid)"
+DEFAULT_TIMEOUT = 20
+DEFAULT_MAX_CHARS = 100000
+DEFAULT_CONCURRENCY = 4                # pages fetched at once by fetch_many
+DEFAULT_PER_HOST = 2                   # of which at most this many from one host
+DEFAULT_MAX_BYTES = 5_000_000          # bytes read from the body, the rest is never downloaded
+MAX_CONTENT_LENGTH = 20_000_000        # declared sizes above this are rejected before reading
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DEFAULT_READ_SECONDS = 60              # total time allowed for downloading one body
+ENCODING_SNIFF_BYTES = 4096
+
+_HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+# Exit codes used by the CLI wrapper
+EXIT_USAGE = 1
+EXIT_NETWORK = 2
+EXIT_PARSE = 3
+EXIT_UNSUPPORTED = 4
+
+
+class FetchError(Exception):
+    """Fetch/clean failure carrying the CLI exit code that describes it"""
+
+    def __init__(self, message: str, exit_code: int):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+# ------------------------------------------------------------------
+# Utility functions
+# ------------------------------------------------------------------
+
+def debug(msg: str) -> None:
+    """Debug trace, silent unless the logger is at DEBUG level."""
+    logger.debug(msg)
+
+
+def is_probably_binary(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    ctype = content_type.split(';', 1)[0].strip().lower()
+    # quick filter for non-text
+    if ctype.startswith("text/"):
+        return False
+    if ctype in ("application/xhtml+xml", "application/xml", "application/json"):
+        return False
+    # common binary types
+    if any(ctype.startswith(x) for x in (
+        "image/", "audio/", "video/", "application/pdf", "application/zip", "application/gzip",
+        "application/octet-stream"
+    )):
+        return True
+    return False
+
+
+def validate_url(url: str) -> None:
+    if not re.match(r'^https?://', url, re.IGNORECASE):
+        raise FetchError("Only http and https URLs are allowed", EXIT_USAGE)
+
+
+def extract_main_content(html_text: str, prefer_article: bool = True, parser: str = DEFAULT_PARSER) -> str:
+    """
+    Try to extract just the article body if readability is available and requested.
+    Fall back to whole page clean. parser selects the HTML-to-text backend.
+    """
+    if prefer_article and ReadabilityDocument:
+        try:
+            doc = ReadabilityDocument(html_text)
+            article_html = doc.summary(html_partial=True) or ""
+            if article_html.strip():
+                debug("Using readability extracted article")
+                return html_to_text(article_html, parser)
+        except Exception as e:
+            debug(f"Readability failed: {e}")
+
+    # fallback to full-page clean
+    debug("Falling back to full page clean")
+    return html_to_text(html_text, parser)
+
+
+def fetch(url: str, timeout: int = DEFAULT_TIMEOUT, session: Optional[requests.Session] = None,
+          extra_headers: Optional[dict] = None) -> requests.Response:
+    """
+    Fetch URL returning the Response. Caller handles decoding and content-type.
+    allow_redirects defaults to True. Pass a session to reuse pooled connections.
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if extra_headers:
+        headers.update(extra_headers)
+    getter = session.get if session is not None else requests.get
+    # stream=True: only headers are read here, the body is pulled by decode_body
+    resp = getter(url, headers=headers, timeout=timeout, stream=True)
+    return resp
+
+
+def _abort_read(resp: requests.Response, aborted: threading.Event) -> None:
+    """Make a read blocked on resp's socket fail (called from a timer thread)"""
+    aborted.set()
+    try:
+        # urllib3 response -> http.client response -> socket file -> socket
+        sock = resp.raw._fp.fp.raw._sock
+    except AttributeError:
+        resp.close()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def read_body(resp: requests.Response, max_bytes: int = DEFAULT_MAX_BYTES,
+              max_seconds: float = DEFAULT_READ_SECONDS) -> bytes:
+    """
+    Read at most max_bytes of the body and close the response.
+    Nothing beyond the cap is downloaded or held in memory. The timeout
+    given to fetch() only limits each socket read, so a server dripping
+    bytes is cut off after max_seconds in total. Raises FetchError.
+    """
+    body = bytearray()
+    aborted = threading.Event()
+    timer = threading.Timer(max_seconds, _abort_read, (resp, aborted))
+    timer.daemon = True
+    timer.start()
+    try:
+        for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            body += chunk
+            URL_FETCH_BYTES.inc(len(chunk))
+            if len(body) >= max_bytes:
+                debug(f"Body truncated at {max_bytes} bytes")
+                del body[max_bytes:]
+                break
+    except (requests.RequestException, OSError, ValueError) as e:
+        # ReadTimeout, ChunkedEncodingError, ConnectionError, ContentDecodingError...
+        if not aborted.is_set():
+            raise FetchError(f"Failed to fetch URL: {e}", EXIT_NETWORK)
+    finally:
+        timer.cancel()
+        resp.close()
+    # A body without Content-Length just ends when the socket is shut down,
+    # so the abort is not always seen as an error
+    if aborted.is_set() and len(body) < max_bytes:
+        raise FetchError(f"Failed to fetch URL: download took longer than {max_seconds:g} seconds",
+                         EXIT_NETWORK)
+    return bytes(body)
+
+
+def sniff_encoding(resp: requests.Response, head: bytes) -> str:
+    """
+    Pick a charset from the Content-Type header, a BOM, or a <meta> tag
+    in the first few KB. Never runs detection over the whole body.
+    """
+    candidates = []
+    match = _HEADER_CHARSET_RE.search(resp.headers.get('Content-Type', ''))
+    if match:
+        candidates.append(match.group(1))
+    if head.startswith(codecs.BOM_UTF8):
+        candidates.append('utf-8-sig')
+    elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates.append('utf-16')
+    match = _META_CHARSET_RE.search(head[:ENCODING_SNIFF_BYTES])
+    if match:
+        candidates.append(match.group(1).decode('ascii', errors='ignore'))
+
+    for enc in candidates:
+        try:
+            return codecs.lookup(enc).name
+        except LookupError:
+            continue
+    return 'utf-8'
+
+
+def decode_body(resp: requests.Response, max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+    """
+    Best effort decode of response body to text.
+    Caps at max_bytes to avoid memory surprises.
+    """
+    content = read_body(resp, max_bytes)
+    enc = sniff_encoding(resp, content[:ENCODING_SNIFF_BYTES])
+    try:
+        return content.decode(enc, errors='replace')
+    except Exception:
+        return content.decode('utf-8', errors='replace')
+
+
+def fetch_response(url: str, timeout: int = DEFAULT_TIMEOUT, session: Optional[requests.Session] = None,
+                   extra_headers: Optional[dict] = None) -> requests.Response:
+    """Fetch and validate a response, raising FetchError on failure."""
+    validate_url(url)
+    try:
+        resp = fetch(url, timeout=timeout, session=session, extra_headers=extra_headers)
+    except Exception as e:
+        raise FetchError(f"Failed to fetch URL: {e}", EXIT_NETWORK)
+    try:
+        resp.raise_for_status()
+    except Exception as e:
+        resp.close()
+        raise FetchError(f"Failed to fetch URL: {e}", EXIT_NETWORK)
+
+    if resp.status_code == 304:
+        resp.close()
+        return resp
+
+    ctype = resp.headers.get('Content-Type', '')
+    if is_probably_binary(ctype):
+        resp.close()
+        raise FetchError(f"Unsupported content-type for text extraction: {ctype}", EXIT_UNSUPPORTED)
+
+    length = resp.headers.get('Content-Length', '')
+    if length.isdigit() and int(length) > MAX_CONTENT_LENGTH:
+        resp.close()
+        raise FetchError(f"Response too large for text extraction: {int(length)} bytes", EXIT_UNSUPPORTED)
+    return resp
+
+
+def clean_html(html_text: str, full: bool = False, max_chars: int = DEFAULT_MAX_CHARS,
+               parser: str = DEFAULT_PARSER) -> str:
+    """Extract and cap cleaned text, raising FetchError on parse failure."""
+    try:
+        with URL_PARSE_SECONDS.time(parser=parser):
+            cleaned = extract_main_content(html_text, prefer_article=not full, parser=parser)
+    except Exception as e:
+        raise FetchError(f"Failed to parse HTML: {e}", EXIT_PARSE)
+
+    # Cap output
+    if len(cleaned) > max_chars:
+        cleaned = cleaned[:max_chars].rstrip() + "\n\n[Output truncated]"
+    return cleaned
+
+
+def fetch_clean_text(url: str, timeout: int = DEFAULT_TIMEOUT, max_chars: int = DEFAULT_MAX_CHARS,
+                     full: bool = False, session: Optional[requests.Session] = None,
+                     parser: str = DEFAULT_PARSER) -> str:
+    """Synchronous fetch -> decode -> extract pipeline."""
+    resp = fetch_response(url, timeout=timeout, session=session)
+    return clean_html(decode_body(resp), full=full, max_chars=max_chars, parser=parser)
+
+
+# ------------------------------------------------------------------
+# Async service
+# ------------------------------------------------------------------
+
+class UrlFetchService:
+    """In-process fetcher with a keep-alive connection pool.
+
+    Network I/O runs on a small thread pool sharing one requests.Session,
+    and HTML parsing runs on a separate pool so slow pages never block
+    the event loop or each other's downloads. With a cache, fresh entries
+    are served directly and stale ones are revalidated with a conditional
+    GET, so a 304 skips download and parsing entirely.
+
+    Every fetch holds a slot of a global semaphore (concurrency) and of a
+    per-host one (per_host), so batches stay polite and bounded.
+    """
+
+    def __init__(self, timeout: int = DEFAULT_TIMEOUT, max_chars: int = DEFAULT_MAX_CHARS,
+                 concurrency: int = DEFAULT_CONCURRENCY, per_host: int = DEFAULT_PER_HOST,
+                 parse_workers: int = 2, cache: Optional[UrlCache] = None,
+                 parser: str = DEFAULT_PARSER):
+        if parser not in PARSERS:
+            raise ValueError(f"Unknown parser {parser!r}, choose from: {', '.join(PARSERS)}")
+        self.timeout = timeout
+        self.max_chars = max_chars
+        self.parser = parser
+        self.cache = cache
+        self.per_host = per_host
+        self._slots = asyncio.Semaphore(concurrency)
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        io_workers = concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=io_workers, pool_maxsize=per_host)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='url-io')
+        self._parse_pool = ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix='url-parse')
+
+    async def fetch(self, url: str, extra_headers: Optional[dict] = None) -> requests.Response:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool, fetch_response, url, self.timeout,
+                                          self.session, extra_headers)
+
+    async def decode_body(self, resp: requests.Response, max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool, decode_body, resp, max_bytes)
+
+    async def extract_main_content(self, html_text: str, full: bool = False) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._parse_pool, clean_html, html_text, full,
+                                          self.max_chars, self.parser)
+
+    async def fetch_clean_text(self, url: str, full: bool = False) -> str:
+        """Fetch a URL and return cleaned text, raising FetchError on failure."""
+        host = (urlsplit(url).hostname or '').lower()
+        host_slots = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with self._slots, host_slots:
+            return await self._fetch_clean_text(url, full)
+
+    async def fetch_many(self, urls: List[str], full: bool = False) -> AsyncIterator[Tuple[str, str, bool]]:
+        """Fetch several URLs concurrently, yielding (url, text, ok) as each one finishes."""
+        async def one(url):
+            try:
+                return url, await self.fetch_clean_text(url, full=full), True
+            except FetchError as e:
+                return url, str(e), False
+            except Exception as e:
+                # Anything unexpected only fails this link, not the batch
+                logger.error(f"Fetching {url} failed: {e}")
+                return url, f"Error fetching URL: {e}", False
+
+        tasks = [asyncio.ensure_future(one(url)) for url in urls]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield await done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _fetch_clean_text(self, url: str, full: bool) -> str:
+        if self.cache is None:
+            with URL_FETCH_SECONDS.time():
+                resp = await self.fetch(url)
+                html_text = await self.decode_body(resp)
+            return await self.extract_main_content(html_text, full=full)
+
+        loop = asyncio.get_running_loop()
+        mode = f"{'full' if full else 'article'}:{self.parser}"
+        key = self.cache.key(url, mode)
+        entry = await loop.run_in_executor(self._io_pool, self.cache.get, key)
+
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.hits += 1
+            URL_CACHE_LOOKUPS.inc(result='hit')
+            return entry.text
+
+        conditional = {}
+        if entry is not None:
+            if entry.etag:
+                conditional['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                conditional['If-Modified-Since'] = entry.last_modified
+
+        with URL_FETCH_SECONDS.time():
+            resp = await self.fetch(url, extra_headers=conditional)
+            if resp.status_code == 304 and entry is not None:
+                self.cache.revalidated += 1
+                URL_CACHE_LOOKUPS.inc(result='revalidated')
+                await loop.run_in_executor(self._io_pool, self.cache.touch, key, entry)
+                return entry.text
+
+            self.cache.misses += 1
+            URL_CACHE_LOOKUPS.inc(result='miss')
+            html_text = await self.decode_body(resp)
+        text = await self.extract_main_content(html_text, full=full)
+        entry = CacheEntry(
+            url=url,
+            mode=mode,
+            text=text,
+            etag=resp.headers.get('ETag'),
+            last_modified=resp.headers.get('Last-Modified'),
+            validated_at=time.time(),
+        )
+        await loop.run_in_executor(self._io_pool, self.cache.put, key, entry)
+        return text
+
+    def close(self):
+        self._io_pool.shutdown(wait=False)
+        self._parse_pool.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,72 @@
+# core/webhook.py
+"""Receive updates from Telegram by webhook instead of long polling"""
+import hmac
+import json
+import time
+import logging
+
+from telegram import Update
+
+from core.http_server import HttpServer
+from core.metrics import WEBHOOK_UPDATES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEBHOOK_HOST = '127.0.0.1'
+DEFAULT_WEBHOOK_PORT = 8443
+DEFAULT_WEBHOOK_PATH = '/telegram'
+
+
+class WebhookServer:
+    """Local HTTP listener for Telegram webhook calls.
+
+    Each POST is checked against the secret token Telegram sends in the
+    X-Telegram-Bot-Api-Secret-Token header, parsed and put on the
+    Application's update queue; Telegram gets its 200 straight away and
+    the update is handled like a polled one. Telegram only calls HTTPS
+    URLs, so this is meant to sit behind a TLS-terminating reverse proxy.
+    """
+
+    def __init__(self, app, secret: str, host: str = DEFAULT_WEBHOOK_HOST, port: int = DEFAULT_WEBHOOK_PORT,
+                 path: str = DEFAULT_WEBHOOK_PATH):
+        self.app = app
+        self.secret = secret.encode('utf-8')
+        self.last_update = None
+        self.server = HttpServer(host, port, {path: self.receive, '/healthz': self.health})
+
+    async def start(self):
+        await self.server.start()
+
+    async def stop(self):
+        await self.server.stop()
+
+    async def receive(self, request):
+        if request.method != 'POST':
+            return 405, 'text/plain', b'method not allowed\n'
+        token = request.headers.get('x-telegram-bot-api-secret-token', '').encode('utf-8')
+        if not hmac.compare_digest(token, self.secret):
+            WEBHOOK_UPDATES.inc(result='rejected')
+            logger.warning("Webhook call with a wrong or missing secret token")
+            return 403, 'text/plain', b'forbidden\n'
+        try:
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+            update = Update.de_json(data, self.app.bot)
+            if update is None:
+                raise ValueError("empty update")
+        except (ValueError, TypeError, KeyError) as e:
+            WEBHOOK_UPDATES.inc(result='invalid')
+            logger.warning(f"Invalid webhook payload: {e}")
+            return 400, 'text/plain', b'bad update\n'
+        self.app.update_queue.put_nowait(update)
+        self.last_update = time.time()
+        WEBHOOK_UPDATES.inc(result='accepted')
+        return 200, 'text/plain', b'ok\n'
+
+    async def health(self, request):
+        if not self.app.running:
+            return 503, 'text/plain', b'application not running\n'
+        age = 'never' if self.last_update is None else f"{time.time() - self.last_update:.0f}s ago"
+        body = f"ok\nqueued updates: {self.app.update_queue.qsize()}\nlast update: {age}\n"
+        return 200, 'text/plain', body.encode('utf-8')
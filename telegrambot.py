@@ -2,8 +2,13 @@
 """
 Modular Telegram Bot - Main Application
 """
+import time
+PROCESS_START = time.monotonic()  # before the heavy imports, for the startup timeline
+
 import os
 import logging
+import secrets
+import sqlite3
 from datetime import datetime
 from typing import Dict, List
 import asyncio
@@ -11,10 +16,22 @@ import asyncio
 from telegram import Update
 from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters
 
+import config
 from config import bot_token, id_a, username, log_level
-from core.auth import AuthManager
+from core.auth import AuthManager, DEFAULT_USER_RATE, DEFAULT_USER_BURST
 from core.command_loader import CommandLoader
-from core.message_utils import send_chunked_text
+from core.admin_commands import AdminCommandHandler
+from core.message_utils import send_chunks, reply
+from core.help_index import HelpIndex
+from core.scheduler import JobScheduler, DEFAULT_MAX_CONCURRENT
+from core.audit import AuditLog, DEFAULT_AUDIT_DB, track_usage, note_error, redact_command
+from core.http_server import HttpServer
+from core.outbox import OUTBOX, DEFAULT_CHAT_INTERVAL, DEFAULT_GLOBAL_RATE
+from core.health_monitor import HealthMonitor, build_checks, DEFAULT_INTERVAL, DEFAULT_CONFIRMATIONS
+from core.metrics import (REGISTRY, MESSAGES, DISPATCH_SECONDS, HANDLER_SECONDS, HANDLER_ERRORS,
+                          StartupTimeline, monitor_loop_lag)
+from core.telegram_request import InstrumentedRequest, DEFAULT_POOL_SIZE
+from core.webhook import WebhookServer, DEFAULT_WEBHOOK_HOST, DEFAULT_WEBHOOK_PORT, DEFAULT_WEBHOOK_PATH
 
 # Configure logging
 numeric_level = getattr(logging, log_level.upper(), logging.INFO)
@@ -26,20 +43,69 @@ logger = logging.getLogger(__name__)
 
 class TelegramBot:
     def __init__(self):
-        self.auth_manager = AuthManager(id_a, username)
+        self.auth_manager = AuthManager(
+            id_a, username,
+            user_rate=getattr(config, 'user_rate_limit', DEFAULT_USER_RATE),
+            user_burst=getattr(config, 'user_rate_burst', DEFAULT_USER_BURST),
+        )
         self.command_loader = CommandLoader()
-        self.commands = {}
+        self.scheduler = JobScheduler(getattr(config, 'max_concurrent_jobs', DEFAULT_MAX_CONCURRENT),
+                                      on_finish=self.audit_job)
+        self.audit_log = AuditLog(getattr(config, 'audit_db', DEFAULT_AUDIT_DB) or '')
+        OUTBOX.chat_interval = getattr(config, 'send_chat_interval', DEFAULT_CHAT_INTERVAL)
+        OUTBOX.global_rate = getattr(config, 'send_global_rate', DEFAULT_GLOBAL_RATE)
+        self.health_monitor = HealthMonitor(
+            build_checks(getattr(config, 'health_checks', None) or []),
+            interval=getattr(config, 'health_interval', DEFAULT_INTERVAL),
+            confirmations=getattr(config, 'health_confirmations', DEFAULT_CONFIRMATIONS),
+        )
+        self.metrics_server = None
+        self._help_index = None
+        self._help_version = None
+        self.background_tasks = set()
+        self.startup_timeline = StartupTimeline(PROCESS_START)
+        self.startup_timeline.mark('imports done')
         
     async def startup_message(self, app):
         """Send startup notification"""
         chat_id = id_a[0]
         msg = f"Hey, just woke up man! It is {datetime.now().strftime('%d %B %Y - %I:%M %p')}"
-        await app.bot.send_message(chat_id=chat_id, text=msg)
+        await self.notify(app, chat_id, msg, 'startup message')
+
+    async def health_alert(self, app, checks):
+        """Tell the first configured chat about health checks that changed state"""
+        lines = []
+        for check in checks:
+            if check.up:
+                lines.append(f"OK: {check.name} is up again ({check.probe.describe()}: {check.detail})")
+            else:
+                lines.append(f"ALERT: {check.name} is down ({check.probe.describe()}: {check.detail})")
+        # Not awaited: a flood-control pause must not hold up the next round of checks
+        self.start_background(self.notify(app, id_a[0], "\n".join(lines), 'health alert'))
+
+    async def notify(self, app, chat_id, text: str, what: str):
+        """Send through the outbound queue; it waits out flood control and retries network errors"""
+        try:
+            await OUTBOX.send(app.bot, chat_id, text)
+        except Exception as e:
+            logger.error(f"Could not send {what} to chat {chat_id}: {e}")
     
+    @property
+    def commands(self):
+        # Read through the loader each time: a hot reload swaps the whole map
+        return self.command_loader.handlers
+
     async def load_commands(self):
-        """Load all available commands from plugins"""
-        self.commands = await self.command_loader.load_all_commands()
+        """Index all available commands from plugins (imported lazily)"""
+        await self.command_loader.load_all_commands()
+        self.command_loader.add_handler('admin', AdminCommandHandler(self))
         logger.info(f"Loaded {len(self.commands)} command categories")
+        self.startup_timeline.mark('plugins indexed')
+
+    async def warm_up(self):
+        """Import lazily registered plugins in the background"""
+        await self.command_loader.warm_up()
+        self.startup_timeline.mark('plugins imported')
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Main message handler"""
@@ -49,49 +115,200 @@ class TelegramBot:
         is_bot = message.from_user.is_bot
         command = message.text.strip()
 
-        logger.info(f"Got command: {command}")
+        self.startup_timeline.mark('first update', once=True)
+        logger.info(f"Got command: {redact_command(command)}")
 
         # Authentication check
         if not self.auth_manager.is_authorised(user_id, username_input, is_bot):
-            await message.reply_text('Forbidden access!')
+            MESSAGES.inc(result='forbidden')
+            # Answer once per interval, not every message of a flood
+            if self.auth_manager.first_rejection(user_id):
+                await reply(message, 'Forbidden access!')
             return
 
-        # Process command through loaded handlers
-        handled = False
-        for category, handler in self.commands.items():
-            try:
-                if await handler.can_handle(command):
-                    await handler.execute(message, command)
-                    handled = True
-                    break
-            except Exception as e:
-                logger.error(f"Error in {category} handler: {e}")
-                await message.reply_text(f"Error executing command: {str(e)}")
-                handled = True
-                break
-        
-        if not handled:
-            await self.show_help(message)
+        if not self.auth_manager.allow_message(user_id):
+            MESSAGES.inc(result='throttled')
+            if self.auth_manager.first_throttle(user_id):
+                await reply(message, 'Too many messages, slow down. Ignoring commands for a moment.')
+            return
+
+        # Process command through the dispatch table
+        start = time.monotonic()
+        try:
+            category, handler = await self.command_loader.dispatch_table.resolve(command)
+        except Exception as e:
+            logger.error(f"Error dispatching command: {e}")
+            category, handler = None, None
+        DISPATCH_SECONDS.observe(time.monotonic() - start, handler=category or 'none')
+
+        if handler is None:
+            MESSAGES.inc(result='unknown')
+            await self.show_help(message, command)
+            return
+
+        MESSAGES.inc(result='dispatched')
+
+        try:
+            handler = await handler.load()
+        except Exception as e:
+            logger.error(f"Failed to load {category} handler: {e}")
+            await reply(message, f"Error loading command: {str(e)}")
+            return
+
+        if handler.inline:
+            started_at, usage = time.time(), track_usage()
+            await self.run_handler(category, handler, message, command)
+            self.audit_log.record(started_at, time.time(), message.chat_id, username_input, command,
+                                  category, 'done', usage)
+            return
+
+        job, created = self.scheduler.submit(
+            chat_id=message.chat_id,
+            user=username_input,
+            command=command,
+            category=category,
+            run=lambda: self.run_handler(category, handler, message, command),
+            concurrency_key=handler.get_concurrency_key(command),
+        )
+        if not created:
+            await reply(message, f"Already {job.state}: job #{job.id}")
+        elif self.scheduler.position(job):
+            await reply(message, f"Queued as job #{job.id}")
+
+    async def run_handler(self, category, handler, message, command: str):
+        """Execute a handler, reporting its errors to the user"""
+        try:
+            with HANDLER_SECONDS.time(handler=category):
+                await handler.execute(message, command)
+        except Exception as e:
+            HANDLER_ERRORS.inc(handler=category)
+            note_error(e)
+            logger.error(f"Error in {category} handler: {e}")
+            await reply(message, f"Error executing command: {str(e)}")
     
-    async def show_help(self, message):
-        """Show available commands"""
-        help_text = "Commands available:\n"
-        for category, handler in self.commands.items():
-            commands = await handler.get_help()
-            if commands:
-                help_text += f"\n{commands}"
-        
-        await send_chunked_text(message, help_text)
+    def audit_job(self, job):
+        """Scheduler hook: add a finished job to the command history"""
+        self.audit_log.record(job.started_at or job.created_at, job.finished_at, job.chat_id, job.user,
+                              job.command, job.category, job.state, job.usage)
+
+    async def help_index(self) -> HelpIndex:
+        """Help and suggestions, rebuilt only when the handler set changed"""
+        version = self.command_loader.version
+        if self._help_index is None or self._help_version != version:
+            self._help_index = await HelpIndex.build(self.commands)
+            self._help_version = version
+        return self._help_index
+
+    async def show_help(self, message, command: str = ''):
+        """Show available commands, and the closest ones to what was typed"""
+        index = await self.help_index()
+        suggestions = index.suggest(command) if command else []
+        if suggestions:
+            # Queued together, so the outbound queue sends them as one message when they fit
+            await send_chunks(message, [f"Did you mean: {', '.join(suggestions)}?", *index.chunks])
+        else:
+            await send_chunks(message, index.chunks)
     
+    def start_background(self, coro):
+        """Run a coroutine for the lifetime of the bot"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task):
+        self.background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background task failed: {task.exception()}")
+
+    async def serve_metrics(self, request):
+        return 200, 'text/plain; version=0.0.4; charset=utf-8', REGISTRY.render().encode('utf-8')
+
+    async def serve_health(self, request):
+        return 200, 'text/plain', b'ok\n'
+
+    async def post_init(self, app):
+        """Start background services once the Application is initialised"""
+        self.startup_timeline.mark('bot initialised')
+        if getattr(config, 'audit_db', DEFAULT_AUDIT_DB):
+            try:
+                await asyncio.to_thread(self.audit_log.start)
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"Command history disabled, cannot open {self.audit_log.path}: {e}")
+        self.start_background(monitor_loop_lag())
+        # Neither blocks polling from starting
+        self.start_background(self.warm_up())
+        self.start_background(self.startup_message(app))
+
+        reload_interval = getattr(config, 'plugin_reload_interval', 2)
+        if reload_interval:
+            self.start_background(self.command_loader.watch(reload_interval))
+
+        if self.health_monitor.checks:
+            self.start_background(self.health_monitor.run(lambda checks: self.health_alert(app, checks)))
+
+        port = getattr(config, 'metrics_port', 9464)
+        if port:
+            self.metrics_server = HttpServer(
+                getattr(config, 'metrics_host', '127.0.0.1'), port,
+                {'/metrics': self.serve_metrics, '/healthz': self.serve_health},
+            )
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Could not start metrics endpoint on port {port}: {e}")
+                self.metrics_server = None
+
     async def run(self):
         """Start the bot"""
+        webhook_url = None
+        if getattr(config, 'bot_mode', 'polling') == 'webhook':
+            # Checked before anything starts, so a bad config fails cleanly
+            webhook_url = getattr(config, 'webhook_url', None)
+            if not webhook_url or not str(webhook_url).startswith('https://'):
+                logger.error(f"bot_mode = 'webhook' needs webhook_url set to the public https:// URL "
+                             f"Telegram should call (got {webhook_url!r})")
+                raise SystemExit(1)
         await self.load_commands()
         
-        app = ApplicationBuilder().token(bot_token).build()
+        # Handlers no longer block the loop, so let updates from different
+        # chats be processed at the same time
+        app = (ApplicationBuilder()
+               .token(bot_token)
+               .request(InstrumentedRequest(
+                   connection_pool_size=getattr(config, 'telegram_pool_size', DEFAULT_POOL_SIZE)))
+               .concurrent_updates(True)
+               .post_init(self.post_init)
+               .build())
         app.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), self.handle_message))
         
-        await self.startup_message(app)
-        await app.run_polling()
+        if webhook_url:
+            await self.run_webhook(app, webhook_url)
+        else:
+            await app.run_polling()
+
+    async def run_webhook(self, app, webhook_url: str):
+        """Serve updates pushed by Telegram to our own HTTP listener"""
+        secret = getattr(config, 'webhook_secret', None) or secrets.token_urlsafe(32)
+        webhook = WebhookServer(
+            app, secret,
+            host=getattr(config, 'webhook_host', DEFAULT_WEBHOOK_HOST),
+            port=getattr(config, 'webhook_port', DEFAULT_WEBHOOK_PORT),
+            path=getattr(config, 'webhook_path', DEFAULT_WEBHOOK_PATH),
+        )
+        # run_polling() does all of this itself, including calling post_init
+        async with app:
+            await self.post_init(app)
+            await app.start()
+            await webhook.start()
+            try:
+                await app.bot.set_webhook(webhook_url, secret_token=secret,
+                                          allowed_updates=Update.ALL_TYPES)
+                logger.info(f"Webhook registered at {webhook_url}")
+                await asyncio.Event().wait()
+            finally:
+                await webhook.stop()
+                await app.stop()
 
 async def main():
     bot = TelegramBot()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+"""Make the bot's packages importable when pytest is run from the repo root"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,32 @@
+# tests/test_audit.py
+"""Command history database"""
+import sqlite3
+
+from core.audit import AuditLog, redact_command
+
+
+def stored_commands(tmp_path, *commands):
+    log = AuditLog(str(tmp_path / 'audit.db'))
+    log.start()
+    for command in commands:
+        log.record(1.0, 2.0, 42, 'alice', command, 'ExecCommandHandler', 'done')
+    log.close()
+    connection = sqlite3.connect(log.path)
+    try:
+        return [row[0] for row in connection.execute('SELECT command FROM commands ORDER BY id')]
+    finally:
+        connection.close()
+
+
+def test_password_is_never_stored(tmp_path):
+    stored = stored_commands(tmp_path, 'PASSWORD: x7Kq9vTz', 'PASSWORD x7Kq9vTz', 'PASSWORD:x7Kq9vTz')
+    assert stored == ['PASSWORD: ***'] * 3
+    assert not any('x7Kq9vTz' in command for command in stored)
+    with open(tmp_path / 'audit.db', 'rb') as f:
+        assert b'x7Kq9vTz' not in f.read()
+
+
+def test_exec_script_keeps_first_line_only():
+    assert redact_command('exec apt update\nexport TOKEN=abc\napt upgrade -y') == 'exec apt update (+2 lines)'
+    assert redact_command('uptime') == 'uptime'
+    assert len(redact_command('exec ' + 'x' * 1000)) == 201
@@ -0,0 +1,31 @@
+# tests/test_auth.py
+"""Access control and rejection logging"""
+import time
+
+from core.auth import AuthManager, REJECTION_LOG_INTERVAL
+
+
+def test_stranger_is_answered_when_the_summary_is_due():
+    auth = AuthManager([1], ['alice'])
+    auth._summary_due = time.monotonic() - 1   # a quiet bot: the interval ran out long ago
+    assert not auth.is_authorised(999, 'mallory', False)
+    assert auth.first_rejection(999)
+    assert auth._summary_due > time.monotonic()
+
+
+def test_stranger_is_answered_once_per_interval():
+    auth = AuthManager([1], ['alice'])
+    assert not auth.is_authorised(999, 'mallory', False)
+    assert auth.first_rejection(999)
+    assert not auth.is_authorised(999, 'mallory', False)
+    assert not auth.first_rejection(999)
+    auth.log_rejections(time.monotonic() + REJECTION_LOG_INTERVAL)
+    assert not auth.is_authorised(999, 'mallory', False)
+    assert auth.first_rejection(999)
+
+
+def test_authorised_user():
+    auth = AuthManager([1], ['alice'])
+    assert auth.is_authorised(1, 'alice', False)
+    assert not auth.is_authorised(1, 'alice', True)
+    assert not auth.is_authorised(1, 'eve', False)
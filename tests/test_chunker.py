@@ -0,0 +1,103 @@
+# tests/test_chunker.py
+"""Splitting text into Telegram-sized messages"""
+import time
+
+from core.chunker import (EMPTY_TEXT, TELEGRAM_MAX_UNITS, iter_telegram_chunks, utf16_len, utf16_prefix,
+                          utf16_suffix)
+
+
+def chunks(text, max_units=TELEGRAM_MAX_UNITS):
+    return list(iter_telegram_chunks(text, max_units))
+
+
+def test_utf16_len_counts_astral_characters_twice():
+    assert utf16_len('abc') == 3
+    assert utf16_len('😀') == 2
+    assert utf16_len('é東') == 2
+
+
+def test_utf16_prefix_and_suffix_stop_before_the_limit():
+    text = 'a😀b😀c'
+    end = utf16_prefix(text, 0, 4)
+    assert text[:end] == 'a😀b'
+    assert utf16_len(text[utf16_suffix(text, 3):]) <= 3
+    assert text[utf16_suffix(text, 3):] == '😀c'
+
+
+def test_chunks_fit_in_utf16_units():
+    text = '😀' * 10000   # 10000 characters, 20000 units
+    parts = chunks(text)
+    assert all(utf16_len(part) <= TELEGRAM_MAX_UNITS for part in parts)
+    assert ''.join(parts) == text
+    assert len(parts) == 5
+
+
+def test_odd_limit_never_splits_a_surrogate_pair():
+    text = 'x' + '😀' * 50
+    parts = chunks(text, 5)
+    assert ''.join(parts) == text
+    for part in parts:
+        assert utf16_len(part) <= 5
+        part.encode('utf-16-le')   # no lone surrogates
+
+
+def test_lone_surrogates_from_surrogateescape_stay_together():
+    text = ('ab' + '\ud83d\ude00') * 20   # a pair as two code points, e.g. from surrogatepass decoding
+    parts = chunks(text, 3)
+    assert ''.join(parts) == text
+    assert not any('\ud800' <= part[-1] <= '\udbff' for part in parts)
+
+
+def test_prefers_paragraph_then_line_then_word_boundaries():
+    paragraph = 'first paragraph line\nsecond line'
+    assert chunks(f"{paragraph}\n\nnext paragraph", 40) == [paragraph, 'next paragraph']
+    assert chunks('one line here\nanother line here', 24) == ['one line here', 'another line here']
+    assert chunks('alpha beta gamma delta', 12) == ['alpha beta', 'gamma delta']
+
+
+def test_boundary_in_the_first_half_is_not_used():
+    # The only space is early: cutting there would leave a tiny chunk
+    parts = chunks('ab ' + 'x' * 30, 20)
+    assert parts[0] == 'ab ' + 'x' * 17
+    assert ''.join(parts) == 'ab ' + 'x' * 30
+
+
+def test_html_entities_and_tags_are_not_cut():
+    text = 'x' * 18 + '&amp;' + 'y' * 10
+    parts = chunks(text, 20)
+    assert parts == ['x' * 18, '&amp;' + 'y' * 10]
+    parts = chunks('z' * 15 + '<b>bold</b>', 17)
+    assert parts[0] == 'z' * 15 and parts[1].startswith('<b>')
+
+
+def test_markdown_links_and_code_spans_are_not_cut():
+    link = '[docs](https://example.com/a/b)'
+    parts = chunks('w' * 20 + link, 40)
+    assert link in parts
+    code = '`sudo apt full-upgrade`'
+    parts = chunks('v' * 20 + code, 40)
+    assert code in parts
+
+
+def test_empty_text_gives_placeholder():
+    assert chunks('') == [EMPTY_TEXT]
+    assert chunks('\n\n  \n') == [EMPTY_TEXT]
+
+
+def test_lazy():
+    parts = iter_telegram_chunks('a' * 10 ** 6 + ' tail', 100)
+    assert next(parts) == 'a' * 100
+
+
+def test_linear_time_on_a_single_10mb_line():
+    def seconds(text):
+        start = time.perf_counter()
+        count = sum(1 for _ in iter_telegram_chunks(text))
+        return time.perf_counter() - start, count
+
+    small, small_count = seconds('x' * 1_000_000)
+    large, large_count = seconds('x' * 10_000_000)
+    assert abs(large_count - small_count * 10) <= 10
+    # Ten times the input, about ten times the time (quadratic would be a hundred)
+    assert large < 30 * max(small, 0.001)
+    assert large < 5
@@ -0,0 +1,87 @@
+# tests/test_dispatch.py
+"""Dispatch table lookup order"""
+import asyncio
+
+import pytest
+
+from core.command_loader import CommandTriggers
+from core.dispatch import DispatchTable
+
+
+class Handler:
+    def __init__(self, triggers: CommandTriggers = CommandTriggers(), handles=()):
+        self.triggers = triggers
+        self.handles = handles
+        self.asked = 0
+
+    def get_triggers(self) -> CommandTriggers:
+        return self.triggers
+
+    async def can_handle(self, command: str) -> bool:
+        self.asked += 1
+        return command in self.handles
+
+
+def resolve(table: DispatchTable, command: str):
+    return asyncio.run(table.resolve(command))[0]
+
+
+@pytest.fixture
+def table():
+    return DispatchTable.build({
+        'system': Handler(CommandTriggers(exact=('uptime', 'restart router status'))),
+        'restart': Handler(CommandTriggers(prefixes=('restart ',))),
+        'restart_router': Handler(CommandTriggers(prefixes=('restart router',))),
+        'url': Handler(CommandTriggers(patterns=(r'(?i:url )', r'(?is:.*?https?://)'))),
+        'catchall': Handler(CommandTriggers(patterns=(r'.*restart',))),
+        'legacy': Handler(handles=('hello', 'restart')),
+    })
+
+
+def test_exact_match_beats_prefix(table):
+    assert resolve(table, 'restart router status') == 'system'
+    assert resolve(table, 'uptime') == 'system'
+
+
+def test_longest_prefix_wins(table):
+    assert resolve(table, 'restart router now') == 'restart_router'
+    assert resolve(table, 'restart kodi') == 'restart'
+
+
+def test_prefix_beats_regex(table):
+    # 'catchall' matches too, but prefixes are looked at first
+    assert resolve(table, 'restart https://example.com') == 'restart'
+
+
+def test_regex_in_registration_order(table):
+    assert resolve(table, 'URL example.com') == 'url'
+    assert resolve(table, 'see https://example.com') == 'url'
+    assert resolve(table, 'please restart') == 'catchall'
+
+
+def test_fallback_only_after_everything_else(table):
+    legacy = table.handlers['legacy']
+    assert resolve(table, 'uptime') == 'system'
+    assert legacy.asked == 0
+    assert resolve(table, 'hello') == 'legacy'
+    assert resolve(table, 'nothing at all') is None
+
+
+def test_numbered_backreference_still_works():
+    table = DispatchTable.build({
+        'first': Handler(CommandTriggers(patterns=(r'(ab)c',))),
+        'echo': Handler(CommandTriggers(patterns=(r'(x+)-\1$',))),
+        'named': Handler(CommandTriggers(patterns=(r'(?P<word>\w+)=(?P=word)$',))),
+        'last': Handler(CommandTriggers(patterns=(r'z',))),
+    })
+    assert resolve(table, 'xx-xx') == 'echo'
+    assert resolve(table, 'xx-x') is None
+    assert resolve(table, 'a=a') == 'named'
+    assert resolve(table, 'abc') == 'first'
+    assert resolve(table, 'zz') == 'last'
+
+
+def test_escaped_backslash_is_not_a_backreference():
+    table = DispatchTable.build({'path': Handler(CommandTriggers(patterns=(r'c:\\1',)))})
+    assert len(table.patterns) == 1 and table.patterns[0][1] == {'h0': 'path'}
+    assert resolve(table, 'c:\\1') == 'path'
@@ -0,0 +1,139 @@
+# tests/test_health_monitor.py
+"""Health checks: confirmation before a state change, and the TCP probe"""
+import asyncio
+import socket
+
+import pytest
+
+from core.health_monitor import Check, HealthMonitor, TcpProbe, build_checks
+
+
+class ScriptedProbe:
+    """Returns the given results in turn; an exception instance is raised"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+
+    def describe(self) -> str:
+        return 'scripted'
+
+    async def check(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+UP, DOWN = (True, 'ok'), (False, 'nope')
+
+
+def transitions(*results, confirmations: int = 2):
+    """Run one check through the results; what each round reported, and the check"""
+    check = Check('router', ScriptedProbe(*results))
+    monitor = HealthMonitor([check], confirmations=confirmations)
+
+    async def rounds():
+        return [bool(await monitor.check_all()) for _ in results]
+
+    return asyncio.run(rounds()), check
+
+
+def test_first_result_up_is_not_reported():
+    reported, check = transitions(UP, UP)
+    assert reported == [False, False]
+    assert check.up is True
+
+
+def test_first_result_down_is_reported_once_confirmed():
+    reported, check = transitions(DOWN, DOWN, DOWN)
+    assert reported == [False, True, False]
+    assert check.up is False and check.detail == 'nope'
+
+
+def test_single_failures_do_not_flap():
+    reported, check = transitions(UP, DOWN, UP, DOWN, UP)
+    assert reported == [False] * 5
+    assert check.up is True
+    assert [state for _, state in check.history] == [True, False, True, False, True]
+
+
+def test_down_and_back_up_each_need_confirmation():
+    reported, check = transitions(UP, DOWN, DOWN, UP, UP, UP)
+    assert reported == [False, False, True, False, True, False]
+    assert check.up is True
+
+
+def test_one_confirmation_reports_every_change():
+    reported, _ = transitions(UP, DOWN, UP, confirmations=1)
+    assert reported == [False, True, True]
+
+
+def test_probe_exception_counts_as_down():
+    reported, check = transitions(UP, RuntimeError('boom'), RuntimeError('boom'))
+    assert reported == [False, False, True]
+    assert check.detail == 'probe failed: boom'
+
+
+def test_check_all_returns_only_the_checks_that_changed():
+    stable = Check('stable', ScriptedProbe(UP, UP))
+    failing = Check('failing', ScriptedProbe(UP, DOWN, DOWN))
+    monitor = HealthMonitor([stable, failing], confirmations=1)
+
+    async def scenario():
+        assert await monitor.check_all() == []
+        assert await monitor.check_all() == [failing]
+
+    asyncio.run(scenario())
+    assert monitor.rounds == 2
+
+
+def test_run_survives_a_failing_alert():
+    check = Check('router', ScriptedProbe(DOWN, UP, DOWN, DOWN, DOWN))
+    monitor = HealthMonitor([check], interval=0, confirmations=1)
+    alerts = []
+
+    async def on_change(changed):
+        alerts.append(changed[0].up)
+        if len(alerts) == 1:
+            raise RuntimeError('telegram unreachable')
+
+    async def scenario():
+        task = asyncio.create_task(monitor.run(on_change))
+        while monitor.rounds < 4:
+            await asyncio.sleep(0.001)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert alerts == [False, True, False]
+
+
+def test_tcp_probe_against_local_listener():
+    async def scenario():
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            assert await TcpProbe('127.0.0.1', port, timeout=1).check() == (True, 'open')
+        finally:
+            server.close()
+            await server.wait_closed()
+        up, detail = await TcpProbe('127.0.0.1', port, timeout=1).check()
+        assert not up and 'refused' in detail.lower()
+
+    asyncio.run(scenario())
+
+
+def test_tcp_probe_on_a_port_nobody_listens_on():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]   # bound but not listening: connections are refused
+        up, _ = asyncio.run(TcpProbe('127.0.0.1', port, timeout=1).check())
+    assert not up
+
+
+def test_build_checks_rejects_bad_entries():
+    checks = build_checks([{'name': 'ssh', 'type': 'tcp', 'host': 'pi', 'port': '22'}])
+    assert checks[0].probe.describe() == 'tcp pi:22'
+    with pytest.raises(ValueError, match='type must be one of'):
+        build_checks([{'name': 'x', 'type': 'http'}])
+    with pytest.raises(ValueError, match="needs 'host'"):
+        build_checks([{'name': 'x', 'type': 'ping'}])
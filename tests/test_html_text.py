@@ -0,0 +1,70 @@
+# tests/test_html_text.py
+"""HTML-to-text backends"""
+import os
+
+import pytest
+
+from core.html_text import PARSERS, html_to_text
+
+XHTML_PAGE = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head><title>Router notes</title><script>var tracking = 1;</script></head>
+<body><nav>Home | About</nav><p>Firmware updated to 1.2.3</p></body>
+</html>
+"""
+
+
+@pytest.mark.parametrize('parser', sorted(PARSERS))
+def test_xhtml_with_encoding_declaration(parser):
+    if parser in ('lxml', 'bs4'):
+        pytest.importorskip('lxml' if parser == 'lxml' else 'bs4')
+    text = html_to_text(XHTML_PAGE, parser=parser)
+    assert 'Firmware updated to 1.2.3' in text
+    assert 'tracking' not in text
+    assert 'Home | About' not in text
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'html_corpus')
+CORPUS = sorted(name for name in os.listdir(CORPUS_DIR) if name.endswith('.html'))
+
+# Text of skipped elements (script, style, nav, header, footer, form, aside, ...)
+CRUFT = ('analytics', 'font-family', 'Downloads', 'Related:', 'Search', 'Example Ltd', 'Enable JavaScript',
+         'a comment', 'document.write', 'Ad fallback', 'Menu A', 'Sidebar', 'inner nav', 'Footer')
+
+
+def read_corpus(name):
+    with open(os.path.join(CORPUS_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('name', CORPUS)
+@pytest.mark.parametrize('parser', sorted(set(PARSERS) - {'bs4'}))
+def test_backends_match_bs4_reference(parser, name):
+    pytest.importorskip('bs4')
+    if parser == 'lxml':
+        pytest.importorskip('lxml')
+    html = read_corpus(name)
+    reference = html_to_text(html, parser='bs4')
+    text = html_to_text(html, parser=parser)
+    # Same content; where lines break around inline markup may differ
+    assert ''.join(text.split()) == ''.join(reference.split())
+
+
+@pytest.mark.parametrize('name', CORPUS)
+@pytest.mark.parametrize('parser', sorted(PARSERS))
+def test_cruft_is_dropped(parser, name):
+    if parser in ('lxml', 'bs4'):
+        pytest.importorskip('lxml' if parser == 'lxml' else 'bs4')
+    text = html_to_text(read_corpus(name), parser=parser)
+    assert text.strip()
+    assert not [cruft for cruft in CRUFT if cruft in text]
+    assert '\r' not in text and '\n\n\n' not in text
+
+
+def test_lxml_keeps_text_nested_deeper_than_libxml2_allows():
+    pytest.importorskip('lxml')
+    html = '<html><body>' + ''.join(f'<div>line {i}\n' for i in range(1000)) + '</body></html>'
+    text = html_to_text(html, parser='lxml')
+    assert 'line 0' in text and 'line 999' in text
+    assert ''.join(text.split()) == ''.join(html_to_text(html, parser='stream').split())
@@ -0,0 +1,189 @@
+# tests/test_mailer.py
+"""Mailer against a local SMTP stub: connection reuse, idle timeout, retries"""
+import asyncio
+import socketserver
+import threading
+
+import pytest
+
+from core.mailer import Mailer
+
+
+class SmtpStub(socketserver.ThreadingTCPServer):
+    """Plain SMTP (no TLS, no AUTH) that records what it was sent"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, fail_data: int = 0):
+        super().__init__(('127.0.0.1', 0), SmtpSession)
+        self.fail_data = fail_data   # DATA commands answered 451 before accepting any
+        self.connections = 0
+        self.quits = 0
+        self.data_commands = 0
+        self.messages = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+class SmtpSession(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 stub ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode().strip().split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.reply('250-stub')
+                self.reply('250 8BITMIME')
+            elif verb in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 ok')
+            elif verb == 'DATA':
+                with server.lock:
+                    server.data_commands += 1
+                    refuse = server.fail_data > 0
+                    server.fail_data -= refuse
+                if refuse:
+                    self.reply('451 try again later')
+                    continue
+                self.reply('354 go ahead')
+                lines = []
+                while (line := self.rfile.readline()) not in (b'.\r\n', b''):
+                    lines.append(line)
+                with server.lock:
+                    server.messages.append(b''.join(lines).decode())
+                self.reply('250 queued')
+            elif verb == 'QUIT':
+                with server.lock:
+                    server.quits += 1
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 not implemented')
+
+
+@pytest.fixture
+def smtp():
+    servers = []
+
+    def start(**kwargs) -> SmtpStub:
+        server = SmtpStub(**kwargs)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_mailer(server: SmtpStub, **kwargs) -> Mailer:
+    kwargs.setdefault('backoff', 0.01)
+    return Mailer('127.0.0.1', server.port, '', '', sender='bot@example.org', use_tls=False, **kwargs)
+
+
+async def send(mailer: Mailer, subject: str):
+    result = asyncio.get_running_loop().create_future()
+
+    async def on_result(ok, detail):
+        result.set_result((ok, detail))
+
+    mailer.submit('admin@example.org', subject, f'body of {subject}', on_result)
+    return await asyncio.wait_for(result, 5)
+
+
+async def wait_for(condition, timeout: float = 2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_mails_share_one_connection(smtp):
+    server = smtp()
+
+    async def scenario():
+        mailer = make_mailer(server)
+        assert await send(mailer, 'first') == (True, 'delivered')
+        assert await send(mailer, 'second') == (True, 'delivered')
+        mailer.close()
+        await mailer._task
+
+    asyncio.run(scenario())
+    assert server.connections == 1
+    assert len(server.messages) == 2
+    assert 'Subject: first' in server.messages[0] and 'Subject: second' in server.messages[1]
+    assert server.quits == 1   # close() ends the session politely
+
+
+def test_idle_connection_is_closed_and_reopened(smtp):
+    server = smtp()
+
+    async def scenario():
+        mailer = make_mailer(server, idle_timeout=0.1)
+        await send(mailer, 'before')
+        await wait_for(lambda: server.quits == 1)
+        assert mailer._connection is None
+        await send(mailer, 'after')
+        mailer.close()
+        await mailer._task
+
+    asyncio.run(scenario())
+    assert server.connections == 2
+    assert len(server.messages) == 2
+
+
+def test_transient_failures_are_retried(smtp):
+    server = smtp(fail_data=2)
+
+    async def scenario():
+        mailer = make_mailer(server, max_attempts=3)
+        assert await send(mailer, 'flaky') == (True, 'delivered')
+        mailer.close()
+        await mailer._task
+
+    asyncio.run(scenario())
+    assert server.data_commands == 3
+    assert server.connections == 3   # a failed send drops the connection
+    assert len(server.messages) == 1
+
+
+def test_gives_up_after_max_attempts(smtp):
+    server = smtp(fail_data=100)
+
+    async def scenario():
+        mailer = make_mailer(server, max_attempts=3)
+        ok, detail = await send(mailer, 'doomed')
+        assert not ok and 'try again later' in detail
+        # the worker carries on with the next mail
+        server.fail_data = 0
+        assert await send(mailer, 'next') == (True, 'delivered')
+        mailer.close()
+        await mailer._task
+
+    asyncio.run(scenario())
+    assert server.data_commands == 4
+    assert len(server.messages) == 1
+
+
+def test_unreachable_server_reports_failure():
+    async def scenario():
+        mailer = Mailer('127.0.0.1', 1, '', '', sender='bot@example.org', use_tls=False,
+                        max_attempts=2, backoff=0.01)
+        ok, _ = await send(mailer, 'nowhere')
+        mailer.close()
+        await mailer._task
+        return ok
+
+    assert asyncio.run(scenario()) is False
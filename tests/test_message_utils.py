@@ -0,0 +1,54 @@
+# tests/test_message_utils.py
+"""Sending command output"""
+import asyncio
+
+import pytest
+
+pytest.importorskip('telegram')
+
+from core import message_utils  # noqa: E402
+from core.message_utils import send_chunks  # noqa: E402
+from core.chunker import utf16_len  # noqa: E402
+
+
+def test_send_chunks_with_nothing_to_send():
+    asyncio.run(send_chunks(None, []))
+
+
+class Recorder:
+    """Stands in for the outbound queue, recording what would be sent"""
+
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, kind, target, text, priority=0, coalesce=True, attachment=None):
+        self.sent.append((kind, text))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(message_utils, 'OUTBOX', recorder)
+    return recorder
+
+
+def test_send_output_threshold_counts_utf16_units(outbox):
+    # 100 emoji are 100 characters but 200 UTF-16 units
+    asyncio.run(message_utils.send_output(None, '😀' * 100, threshold=150))
+    assert [kind for kind, _ in outbox.sent] == ['document']
+
+
+def test_send_output_does_not_count_a_trailing_newline_as_a_line(outbox):
+    asyncio.run(message_utils.send_output(None, 'line\n' * 5000))
+    assert outbox.sent[0][1].startswith('5000 lines, ')
+
+
+def test_document_caption_fits_telegram_limit_in_utf16_units(outbox):
+    asyncio.run(message_utils.send_output(None, ('😀' * 60 + '\n') * 300))
+    kind, caption = outbox.sent[0]
+    assert kind == 'document'
+    assert utf16_len(caption) <= message_utils.CAPTION_MAX_UNITS
+    assert caption.encode('utf-16-le')   # no lone surrogates
@@ -0,0 +1,53 @@
+# tests/test_scheduler.py
+"""Job ordering and concurrency limits"""
+import asyncio
+
+from core.scheduler import JobScheduler
+
+
+def test_job_waiting_for_a_busy_key_does_not_hold_a_slot():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrent=2)
+        restart_done = asyncio.Event()
+        finished = []
+
+        async def restart():
+            await restart_done.wait()
+            finished.append('restart')
+
+        async def uptime():
+            finished.append('uptime')
+
+        scheduler.submit(1, 'alice', 'restart router', 'restart', restart, 'restart:router')
+        scheduler.submit(2, 'bob', 'restart router', 'restart', restart, 'restart:router')
+        await asyncio.sleep(0.01)
+        scheduler.submit(3, 'carol', 'uptime', 'system', uptime)
+        await asyncio.sleep(0.01)
+        assert finished == ['uptime']
+        restart_done.set()
+        await asyncio.sleep(0.01)
+        assert finished == ['uptime', 'restart', 'restart']
+
+    asyncio.run(scenario())
+
+
+def test_chat_jobs_run_in_order_and_duplicates_are_merged():
+    async def scenario():
+        scheduler = JobScheduler()
+        order = []
+
+        def job(name):
+            async def run():
+                await asyncio.sleep(0)
+                order.append(name)
+            return run
+
+        first, created = scheduler.submit(1, 'alice', 'df', 'system', job('df'))
+        again, created_again = scheduler.submit(1, 'alice', 'df', 'system', job('df again'))
+        scheduler.submit(1, 'alice', 'uptime', 'system', job('uptime'))
+        assert created and not created_again and again is first
+        await asyncio.sleep(0.05)
+        assert order == ['df', 'uptime']
+        assert [j.state for j in scheduler.list_jobs()] == ['done', 'done']
+
+    asyncio.run(scenario())
@@ -0,0 +1,173 @@
+# tests/test_sysinfo.py
+"""wtmp parsing and last(1) layout from fixture files, and df-style sizes"""
+import asyncio
+import calendar
+import time
+
+import pytest
+
+from core import sysinfo
+from core.sysinfo import BOOT_TIME, DEAD_PROCESS, RUN_LVL, USER_PROCESS, UTMP_STRUCT
+
+T0 = calendar.timegm((2026, 1, 5, 8, 0, 0))   # Mon Jan  5 08:00 UTC
+MIN, HOUR, DAY = 60, 3600, 86400
+
+
+@pytest.fixture(autouse=True)
+def utc(monkeypatch):
+    monkeypatch.setenv('TZ', 'UTC')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def record(type_: int, when: int, line: str = '', user: str = '', host: str = '', pid: int = 0) -> bytes:
+    return UTMP_STRUCT.pack(type_, pid, line.encode(), b'', user.encode(), host.encode(),
+                            0, 0, 0, when, 0, 0, 0, 0, 0, b'')
+
+
+def boot(when: int) -> bytes:
+    return record(BOOT_TIME, when, '~', 'reboot', '6.1.0')
+
+
+def write_wtmp(tmp_path, *records: bytes) -> str:
+    path = tmp_path / 'wtmp'
+    path.write_bytes(b''.join(records))
+    return str(path)
+
+
+def rows(output: str) -> dict:
+    """user/tty -> how the session ended, for each line of last(1) output"""
+    ended = {}
+    for line in output.splitlines():
+        if line and not line.startswith('wtmp begins'):
+            ended[(line[:8].strip(), line[9:21].strip())] = line[56:].strip()
+    return ended
+
+
+def test_record_layout_matches_glibc():
+    assert UTMP_STRUCT.size == 384
+
+
+def test_logout_crash_and_still_logged_in(tmp_path):
+    second_boot = T0 + DAY + 5 * HOUR
+    path = write_wtmp(
+        tmp_path,
+        boot(T0),
+        record(USER_PROCESS, T0 + 10 * MIN, 'pts/0', 'alice', '10.0.0.1'),
+        record(DEAD_PROCESS, T0 + 70 * MIN, 'pts/0'),
+        record(USER_PROCESS, T0 + 2 * HOUR, 'tty1', 'bob'),
+        boot(second_boot),                      # no shutdown record: the first boot crashed
+        record(USER_PROCESS, second_boot + HOUR, 'pts/1', 'carol', '10.0.0.2'),
+    )
+    output = sysinfo.last(path)
+    lines = output.splitlines()
+
+    assert lines[0] == 'carol    pts/1        10.0.0.2         Tue Jan  6 14:00   still logged in'
+    ended = [line[56:].strip() for line in lines if line and not line.startswith('wtmp')]
+    assert ended == ['still logged in', 'still running', '- crash (1+03:00)',
+                     '- 09:10  (01:00)', '- crash (1+05:00)']
+    assert lines[-1] == 'wtmp begins Mon Jan  5 08:00:00 2026'
+
+
+def test_clean_shutdown(tmp_path):
+    path = write_wtmp(
+        tmp_path,
+        boot(T0),
+        record(USER_PROCESS, T0 + 5 * MIN, 'tty1', 'dave'),
+        record(RUN_LVL, T0 + 3 * HOUR, '~', 'shutdown', '6.1.0'),
+        boot(T0 + 3 * HOUR + 2 * MIN),
+    )
+    ended = rows(sysinfo.last(path))
+    assert ended[('dave', 'tty1')] == '- down   (02:55)'
+    # the newer boot is still running; the older one ended with the shutdown
+    boots = [line[56:].strip() for line in sysinfo.last(path).splitlines() if line.startswith('reboot')]
+    assert boots == ['still running', '- 11:00  (03:00)']
+
+
+def test_tty_reused_after_logout(tmp_path):
+    path = write_wtmp(
+        tmp_path,
+        boot(T0),
+        record(USER_PROCESS, T0 + HOUR, 'pts/0', 'alice'),
+        record(DEAD_PROCESS, T0 + 2 * HOUR, 'pts/0'),
+        record(USER_PROCESS, T0 + 3 * HOUR, 'pts/0', 'bob'),
+    )
+    ended = rows(sysinfo.last(path))
+    assert ended[('bob', 'pts/0')] == 'still logged in'
+    assert ended[('alice', 'pts/0')] == '- 10:00  (01:00)'
+
+
+def test_blocks_and_trailing_partial_record(tmp_path, monkeypatch):
+    records = [boot(T0)]
+    for i in range(7):
+        records.append(record(USER_PROCESS, T0 + i * HOUR, f'pts/{i}', f'user{i}'))
+        records.append(record(DEAD_PROCESS, T0 + i * HOUR + 30 * MIN, f'pts/{i}'))
+    path = write_wtmp(tmp_path, *records)
+    whole = sysinfo.last(path)
+
+    monkeypatch.setattr(sysinfo, 'WTMP_READ_RECORDS', 3)
+    with open(path, 'ab') as f:
+        f.write(b'\0' * 100)                 # a record being written when we read
+    assert sysinfo.last(path) == whole
+    assert whole.count('(00:30)') == 7
+
+
+def test_empty_wtmp(tmp_path):
+    path = write_wtmp(tmp_path)
+    output = sysinfo.last(path)
+    assert output.startswith('wtmp begins ')
+    assert len(output.splitlines()) == 1
+
+
+def test_read_utmp_counts_logged_in_users(tmp_path):
+    path = write_wtmp(
+        tmp_path,
+        boot(T0),
+        record(USER_PROCESS, T0, 'pts/0', 'alice'),
+        record(DEAD_PROCESS, T0, 'pts/1'),
+        record(USER_PROCESS, T0, 'pts/2', 'b' * 32),  # fills the field, no NUL terminator
+    )
+    users = [r.user for r in sysinfo.read_utmp(path) if r.type == USER_PROCESS]
+    assert users == ['alice', 'b' * 32]
+
+
+@pytest.mark.parametrize('size, expected', [
+    (0, '0'),
+    (1023, '1023'),
+    (1024, '1.0K'),
+    (1025, '1.1K'),               # rounded up, like df -h
+    (1536, '1.5K'),
+    (10 * 1024 - 1, '10K'),
+    (10 * 1024, '10K'),
+    (10 * 1024 + 1, '11K'),
+    (int(5.5 * 1024 ** 2), '5.5M'),
+    (1024 ** 2 - 512, '1.0M'),    # rounding up reaches the next unit
+    (1024 ** 3 - 1, '1.0G'),
+    (3 * 1024 ** 4, '3.0T'),
+    (2048 * 1024 ** 5, '2048P'),  # no unit past P
+])
+def test_human_size(size, expected):
+    assert sysinfo.human_size(size) == expected
+
+
+def test_large_wtmp_is_left_to_last_command(monkeypatch):
+    pytest.importorskip('telegram')
+    from commands import system_commands
+
+    forked = []
+
+    async def execute_command(command_list, **kwargs):
+        forked.append(command_list)
+        return 'from last(1)'
+
+    monkeypatch.setattr(system_commands.ShellExecutor, 'execute_command', staticmethod(execute_command))
+    handler = system_commands.SystemCommandHandler()
+    handler.views['last'] = lambda: 'parsed here'
+
+    monkeypatch.setattr(sysinfo, 'wtmp_records', lambda: sysinfo.LAST_INPROCESS_MAX_RECORDS)
+    assert asyncio.run(handler._collect('last')) == 'parsed here'
+    monkeypatch.setattr(sysinfo, 'wtmp_records', lambda: sysinfo.LAST_INPROCESS_MAX_RECORDS + 1)
+    assert asyncio.run(handler._collect('last')) == 'from last(1)'
+    assert forked == [['last']]
@@ -0,0 +1,90 @@
+# tests/test_url_fetcher.py
+"""Body download limits, against a local HTTP server"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('requests')
+
+import requests  # noqa: E402
+
+from core.url_fetcher import EXIT_NETWORK, FetchError, fetch, read_body  # noqa: E402
+
+BIG_BODY = 100 * 1024 * 1024   # what the server would send if nobody stopped reading
+MAX_BYTES = 1024 * 1024
+BLOCK = b'<p>' + b'x' * (64 * 1024 - 7) + b'</p>\n'
+
+
+class Handler(BaseHTTPRequestHandler):
+    sent = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        if self.path == '/cut':
+            self.send_header('Content-Length', '100000')
+            self.end_headers()
+            self.wfile.write(b'<p>only the start')
+            return
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        sent = 0
+        try:
+            if self.path == '/drip':
+                for _ in range(100):
+                    self.wfile.write(b'x')
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            while sent < BIG_BODY:
+                self.wfile.write(BLOCK)
+                sent += len(BLOCK)
+        except OSError:
+            pass   # the client stopped reading
+        finally:
+            Handler.sent[self.path] = sent
+
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def wait_for_server(path):
+    deadline = time.monotonic() + 5
+    while path not in Handler.sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return Handler.sent.get(path)
+
+
+def test_body_larger_than_max_bytes_is_cut_off(server):
+    with requests.Session() as session:
+        body = read_body(fetch(f"{server}/big", session=session), max_bytes=MAX_BYTES)
+    assert len(body) == MAX_BYTES
+    sent = wait_for_server('/big')
+    # The server gave up long before the end: only socket buffers' worth past the cap went out
+    assert sent is not None and sent < BIG_BODY // 4
+
+
+def test_dripping_server_is_cut_off_after_max_seconds(server):
+    start = time.monotonic()
+    with pytest.raises(FetchError) as raised:
+        read_body(fetch(f"{server}/drip", timeout=5), max_bytes=MAX_BYTES, max_seconds=0.3)
+    assert raised.value.exit_code == EXIT_NETWORK
+    assert 'longer than 0.3 seconds' in str(raised.value)
+    assert time.monotonic() - start < 3
+
+
+def test_connection_closed_mid_body_is_a_network_error(server):
+    with pytest.raises(FetchError) as raised:
+        read_body(fetch(f"{server}/cut"), max_bytes=MAX_BYTES)
+    assert raised.value.exit_code == EXIT_NETWORK
@@ -0,0 +1,78 @@
+# tests/test_webhook.py
+"""Webhook receiver: secret check, payload validation and the round trip over HTTP"""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('telegram')
+
+from telegram import Update  # noqa: E402
+
+from core.http_server import Request  # noqa: E402
+from core.webhook import WebhookServer  # noqa: E402
+
+SECRET = 's3cret'
+
+
+class FakeApp:
+    bot = None
+    running = True
+
+    def __init__(self):
+        self.update_queue = asyncio.Queue()
+
+
+def post(body: bytes, secret: str = SECRET) -> Request:
+    return Request('POST', '/telegram', {'x-telegram-bot-api-secret-token': secret}, body)
+
+
+def receive(app, request):
+    return asyncio.run(WebhookServer(app, SECRET).receive(request))
+
+
+@pytest.mark.parametrize('body', [b'{}', b'[]', b'null', b'0', b'"x"', b'not json', b'{"message": {}}'])
+def test_payloads_that_are_not_updates_are_rejected(body):
+    app = FakeApp()
+    status, _, _ = receive(app, post(body))
+    assert status == 400
+    assert app.update_queue.empty()
+
+
+def test_wrong_secret_and_wrong_method_are_refused():
+    app = FakeApp()
+    assert receive(app, post(b'{"update_id": 1}', secret='nope'))[0] == 403
+    assert receive(app, Request('GET', '/telegram', {}, b''))[0] == 405
+    assert app.update_queue.empty()
+
+
+def test_valid_update_is_queued():
+    app = FakeApp()
+    status, _, _ = receive(app, post(b'{"update_id": 7}'))
+    assert status == 200
+    update = app.update_queue.get_nowait()
+    assert isinstance(update, Update) and update.update_id == 7
+
+
+def test_round_trip_over_http():
+    async def scenario():
+        app = FakeApp()
+        server = WebhookServer(app, SECRET, port=0)
+        await server.start()
+        try:
+            port = server.server.server.sockets[0].getsockname()[1]
+            body = json.dumps({'update_id': 42}).encode()
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'POST /telegram HTTP/1.1\r\nHost: localhost\r\n'
+                         b'X-Telegram-Bot-Api-Secret-Token: ' + SECRET.encode() + b'\r\n'
+                         b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+            await writer.drain()
+            status_line = await reader.readline()
+            writer.close()
+            assert b' 200 ' in status_line
+            update = await asyncio.wait_for(app.update_queue.get(), 1)
+            assert update.update_id == 42
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())